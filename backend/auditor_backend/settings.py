@@ -145,4 +145,39 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:8080",
 ]
 
-CORS_ALLOW_ALL_ORIGINS = True 
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True 
+
+# Nombre d'issues insérées par requête (bulk_create) lors de la réception d'un rapport.
+ISSUE_INGESTION_BATCH_SIZE = 1000
+
+# Durée (en secondes) au-delà de laquelle une analyse en cours de traitement est
+# considérée abandonnée (worker arrêté) et remise en attente.
+ANALYSIS_RUN_TIMEOUT = 1800
+
+# Durée (en heures) au-delà de laquelle une soumission en plusieurs requêtes
+# jamais finalisée est abandonnée (analyse FAILED, lots supprimés).
+SUBMISSION_EXPIRY_HOURS = 24
+
+# Rapports bruts en attente de traitement par le worker (`manage.py process_analyses`).
+MEDIA_ROOT = BASE_DIR / 'media'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Cache des clés d'API des agents (clé -> projet). Le cache local-memory
+    # évince les entrées les moins récemment utilisées au-delà de MAX_ENTRIES.
+    'api_keys': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-keys',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+API_KEY_CACHE_ALIAS = 'api_keys'
+# Durée (en secondes) de mise en cache d'une clé valide, puis d'une clé inconnue.
+API_KEY_CACHE_TIMEOUT = 300
+API_KEY_NEGATIVE_CACHE_TIMEOUT = 30
+
+# Durée (en secondes) de mise en cache des représentations des analyses terminées.
+ANALYSIS_CACHE_TIMEOUT = 3600
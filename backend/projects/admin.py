@@ -4,10 +4,12 @@ from django.contrib import admin
 # projects/admin.py
 
 from django.contrib import admin
-from .models import Project, AnalysisRun,  Issue
+from .models import Project, AnalysisRun,  Issue, IssueType, CodeSnippet
 
 # Pour ces modèles, on n'a pas besoin de configuration complexe pour l'instant.
 # On les enregistre simplement. Django leur créera une interface par défaut.
 admin.site.register(Project)
 admin.site.register(AnalysisRun)
-admin.site.register(Issue)
\ No newline at end of file
+admin.site.register(Issue)
+admin.site.register(IssueType)
+admin.site.register(CodeSnippet)
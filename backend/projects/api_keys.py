@@ -0,0 +1,63 @@
+# projects/api_keys.py
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Project
+
+# Marqueur mis en cache pour une clé inconnue (le cache ne distingue pas None d'une absence).
+_UNKNOWN_KEY = 'unknown'
+
+
+def _get_cache():
+    return caches[getattr(settings, 'API_KEY_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(api_key):
+    return f"api-key:{api_key.hex}"
+
+
+def _parse_key(api_key):
+    if isinstance(api_key, uuid.UUID):
+        return api_key
+    try:
+        return uuid.UUID(str(api_key))
+    except ValueError:
+        return None
+
+
+def get_project_for_api_key(api_key):
+    """
+    Retourne le projet associé à une clé d'API, ou None si la clé est invalide.
+
+    Les résultats sont mis en cache (`API_KEY_CACHE_TIMEOUT`), y compris les
+    échecs, pour une durée plus courte (`API_KEY_NEGATIVE_CACHE_TIMEOUT`) :
+    les requêtes répétées avec une clé inconnue ne touchent pas la base.
+    """
+    api_key = _parse_key(api_key)
+    if api_key is None:
+        # Clé mal formée : inutile d'interroger la base (ni de la mettre en cache).
+        return None
+
+    cache = _get_cache()
+    key = _cache_key(api_key)
+    cached = cache.get(key)
+    if cached == _UNKNOWN_KEY:
+        return None
+    if cached is not None:
+        return cached
+
+    project = Project.objects.filter(api_key=api_key).first()
+    if project is None:
+        cache.set(key, _UNKNOWN_KEY, getattr(settings, 'API_KEY_NEGATIVE_CACHE_TIMEOUT', 30))
+    else:
+        cache.set(key, project, getattr(settings, 'API_KEY_CACHE_TIMEOUT', 300))
+    return project
+
+
+def invalidate_api_key(*api_keys):
+    """Retire immédiatement ces clés du cache (rotation ou suppression d'un projet)."""
+    keys = [_cache_key(k) for k in map(_parse_key, api_keys) if k is not None]
+    if keys:
+        _get_cache().delete_many(keys)
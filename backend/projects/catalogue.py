@@ -0,0 +1,92 @@
+# projects/catalogue.py
+import hashlib
+
+from django.db import transaction
+
+from .models import CodeSnippet, Issue, IssueType
+
+
+def snippet_digest(content):
+    """Adresse d'un extrait de code : le hash SHA-256 de son contenu."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def store_snippets(contents):
+    """
+    Enregistre des extraits de code, chacun une seule fois.
+
+    Les extraits déjà connus ne sont pas réinsérés (`ignore_conflicts`).
+
+    Returns:
+        Un dictionnaire contenu -> id du `CodeSnippet`.
+    """
+    by_digest = {snippet_digest(content): content for content in set(contents) if content}
+    if not by_digest:
+        return {}
+    CodeSnippet.objects.bulk_create(
+        [CodeSnippet(digest=digest, content=content) for digest, content in by_digest.items()],
+        ignore_conflicts=True,
+    )
+    rows = CodeSnippet.objects.filter(digest__in=list(by_digest)).values_list('digest', 'id')
+    return {by_digest[digest]: snippet_id for digest, snippet_id in rows}
+
+
+class IssueTypeRegistry:
+    """
+    Types de problèmes connus pendant une ingestion, chargés ou créés à la demande.
+
+    Un code encore absent du catalogue y est ajouté à partir de la première
+    issue rencontrée (sévérité et description). `load_issue_types` permet
+    ensuite de le compléter avec les métadonnées exactes de la règle.
+    """
+
+    def __init__(self):
+        self._descriptions = {}
+
+    def description_for(self, issue_code, severity, description):
+        """Retourne la description du catalogue pour ce code, en l'y ajoutant au besoin."""
+        if not issue_code:
+            return None
+        if issue_code not in self._descriptions:
+            defaults = {'description': description}
+            if severity:
+                defaults['default_severity'] = severity
+            issue_type, _ = IssueType.objects.get_or_create(code=issue_code, defaults=defaults)
+            self._descriptions[issue_code] = issue_type.description
+        return self._descriptions[issue_code]
+
+
+def load_issue_types(rules):
+    """
+    Met à jour le catalogue à partir des métadonnées des règles de l'agent
+    (sortie de `auditor rules --format json`).
+
+    Quand la description d'un type change, les issues déjà enregistrées qui
+    s'appuyaient sur l'ancienne la reçoivent en propre : le texte des
+    analyses passées ne change pas.
+
+    Returns:
+        Le nombre de types créés et mis à jour.
+    """
+    created = updated = 0
+    descriptions = dict(IssueType.objects.values_list('code', 'description'))
+    with transaction.atomic():
+        for rule in rules:
+            code = rule['issue_code']
+            if code in descriptions and descriptions[code] != rule['description']:
+                Issue.objects.filter(issue_type_id=code, description_override__isnull=True).update(
+                    description_override=descriptions[code]
+                )
+            _, was_created = IssueType.objects.update_or_create(
+                code=code,
+                defaults={
+                    'default_severity': rule['severity'],
+                    'description': rule['description'],
+                    'checker_version': rule.get('version'),
+                },
+            )
+            if was_created:
+                created += 1
+            else:
+                updated += 1
+    return created, updated
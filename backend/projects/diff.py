@@ -0,0 +1,41 @@
+# projects/diff.py
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import Issue
+
+DIFF_SETS = ('new', 'fixed', 'persisting')
+
+
+def _in_run(analysis_run):
+    """Vrai si une issue de même empreinte existe dans `analysis_run` (sous-requête sur l'index run/empreinte)."""
+    return Exists(Issue.objects.filter(analysis_run=analysis_run, fingerprint=OuterRef('fingerprint')))
+
+
+def diff_issue_sets(base_run, target_run):
+    """
+    Compare deux analyses à partir des empreintes de leurs issues.
+
+    Returns:
+        Un dictionnaire de querysets :
+        - `new` : issues de `target_run` absentes de `base_run` ;
+        - `fixed` : issues de `base_run` absentes de `target_run` ;
+        - `persisting` : issues de `target_run` déjà présentes dans `base_run`.
+    """
+    return {
+        'new': Issue.objects.filter(analysis_run=target_run).filter(~_in_run(base_run)),
+        'fixed': Issue.objects.filter(analysis_run=base_run).filter(~_in_run(target_run)),
+        'persisting': Issue.objects.filter(analysis_run=target_run).filter(_in_run(base_run)),
+    }
+
+
+def diff_counts(base_run, target_run):
+    """Compte les issues nouvelles, corrigées et persistantes en deux requêtes d'agrégation."""
+    in_base = _in_run(base_run)
+    target = Issue.objects.filter(analysis_run=target_run).aggregate(
+        new=Count('id', filter=~Q(in_base)),
+        persisting=Count('id', filter=Q(in_base)),
+    )
+    base = Issue.objects.filter(analysis_run=base_run).aggregate(
+        fixed=Count('id', filter=~Q(_in_run(target_run))),
+    )
+    return {'new': target['new'], 'fixed': base['fixed'], 'persisting': target['persisting']}
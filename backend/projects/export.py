@@ -0,0 +1,85 @@
+# projects/export.py
+import csv
+import io
+import json
+import zlib
+
+# Colonnes exportées, dans l'ordre et avec les noms de l'API (`IssueSerializer`).
+EXPORT_FIELDS = [
+    'id', 'issue_code', 'severity', 'module_name', 'file_path',
+    'line_number', 'description', 'code_snippet', 'fingerprint', 'migration_hop',
+]
+
+# Taille (en caractères) des blocs envoyés au client : on regroupe les lignes
+# pour ne pas produire un morceau de réponse par issue.
+STREAM_BLOCK_SIZE = 64 * 1024
+EXPORT_CHUNK_SIZE = 2000
+
+
+def iter_issue_rows(issues, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Produit les issues sous forme de tuples, dans l'ordre de `EXPORT_FIELDS`.
+
+    On lit directement les colonnes (`values_list` + `iterator`) : ni instance
+    de modèle ni serializer par ligne, et seul un lot est en mémoire.
+    """
+    rows = issues.order_by('id').values_list(
+        'id', 'issue_type_id', 'severity', 'module_name', 'file_path', 'line_number',
+        'description_override', 'issue_type__description', 'snippet__content', 'fingerprint', 'migration_hop',
+    )
+    for (issue_id, issue_code, severity, module_name, file_path, line_number,
+         description, type_description, code_snippet, fingerprint, migration_hop) in rows.iterator(chunk_size=chunk_size):
+        if description is None:
+            description = type_description
+        yield (
+            issue_id, issue_code, severity, module_name, file_path, line_number,
+            description or '', code_snippet or '', fingerprint, migration_hop,
+        )
+
+
+def _blocks(lines):
+    """Regroupe des lignes en blocs d'environ `STREAM_BLOCK_SIZE` caractères."""
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= STREAM_BLOCK_SIZE:
+            yield ''.join(block)
+            block, size = [], 0
+    if block:
+        yield ''.join(block)
+
+
+def iter_ndjson(rows):
+    """Une issue par ligne, au format JSON."""
+    return _blocks(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n' for row in rows
+    )
+
+
+def iter_csv(rows):
+    """Une ligne d'en-tête, puis une ligne par issue."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def lines():
+        writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            # On vide le tampon à chaque ligne pour qu'il ne grossisse pas.
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _blocks(lines())
+
+
+def gzip_stream(blocks):
+    """Compresse à la volée (format gzip) une suite de blocs de texte."""
+    compressor = zlib.compressobj(wbits=31)
+    for block in blocks:
+        data = compressor.compress(block.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
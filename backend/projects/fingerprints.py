@@ -0,0 +1,42 @@
+# projects/fingerprints.py
+import hashlib
+import re
+from collections import Counter
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalise_snippet(code_snippet):
+    """Réduit un extrait de code à son contenu : les différences d'espacement ou d'indentation sont ignorées."""
+    return _WHITESPACE_RE.sub(' ', code_snippet or '').strip()
+
+
+def issue_fingerprint(issue_code, file_path, code_snippet, occurrence=0):
+    """
+    Empreinte stable d'une issue, indépendante de son numéro de ligne.
+
+    Elle ne dépend que du code de l'issue, du fichier et de l'extrait
+    normalisé : une issue qui se déplace dans le fichier garde la même
+    empreinte d'une analyse à l'autre. `occurrence` distingue les issues
+    identiques d'un même fichier (première, deuxième...).
+    """
+    payload = '\x1f'.join([issue_code or '', file_path, normalise_snippet(code_snippet), str(occurrence)])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class Fingerprinter:
+    """
+    Calcule les empreintes des issues d'une analyse, dans l'ordre du rapport.
+
+    Garde le compte des issues identiques déjà vues pour leur attribuer
+    chacune une empreinte différente.
+    """
+
+    def __init__(self):
+        self._seen = Counter()
+
+    def __call__(self, issue_code, file_path, code_snippet):
+        key = (issue_code or '', file_path, normalise_snippet(code_snippet))
+        occurrence = self._seen[key]
+        self._seen[key] += 1
+        return issue_fingerprint(issue_code, file_path, code_snippet, occurrence)
@@ -0,0 +1,60 @@
+# projects/http_cache.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .models import AnalysisRun
+
+
+def _timeout():
+    return getattr(settings, 'ANALYSIS_CACHE_TIMEOUT', 3600)
+
+
+def _run_key(run_id, kind):
+    return f"analysis-run:{run_id}:{kind}"
+
+
+def cached_run_data(analysis_run, kind, build):
+    """
+    Retourne la représentation `kind` d'une analyse, construite par `build()`.
+
+    Une analyse terminée ne change plus : sa représentation est alors gardée
+    en cache côté serveur. Les autres sont reconstruites à chaque appel.
+    La clé ne dépend que de l'analyse : elle n'a jamais à être invalidée, ce
+    qui reste vrai avec un cache propre à chaque processus.
+    """
+    if analysis_run.status != AnalysisRun.StatusChoices.COMPLETED:
+        return build()
+    return cache.get_or_set(_run_key(analysis_run.pk, kind), build, _timeout())
+
+
+def conditional_run_response(request, data):
+    """
+    Renvoie `data` avec les en-têtes `ETag` et `Last-Modified`, ou une réponse
+    `304 Not Modified` si le client a déjà cette version.
+
+    Les validateurs ne dépendent que de l'id, du statut et de la date de fin de
+    l'analyse : ils changent dès que l'analyse avance ou se termine. Seule une
+    analyse terminée a un `Last-Modified` : la date de création ne change pas
+    quand l'analyse avance, elle ferait répondre 304 à tort.
+    """
+    version = f"{data['id']}:{data['status']}:{data['completed_at']}"
+    etag = '"%s"' % hashlib.sha1(version.encode('utf-8')).hexdigest()
+    modified = parse_datetime(data['completed_at']) if data['completed_at'] else None
+    # Précision de l'en-tête HTTP : la seconde.
+    last_modified = int(modified.timestamp()) if modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = Response(data)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
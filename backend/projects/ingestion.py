@@ -0,0 +1,108 @@
+# projects/ingestion.py
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .catalogue import IssueTypeRegistry, store_snippets
+from .fingerprints import Fingerprinter
+from .models import Issue
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def get_batch_size():
+    """Taille des lots d'INSERT, configurable via `ISSUE_INGESTION_BATCH_SIZE`."""
+    return getattr(settings, 'ISSUE_INGESTION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def ingest_issues(analysis_run, validated_issues, batch_size=None):
+    """
+    Enregistre des issues déjà validées par lots (`bulk_create`) dans une seule transaction.
+
+    Les descriptions et extraits de code sont dédupliqués (voir `catalogue`).
+    L'empreinte de chaque issue (voir `fingerprints`) est calculée au passage,
+    à partir des données en mémoire. Le score d'effort ne l'est pas : il est
+    agrégé par la base avec le reste du résumé (`summary.refresh_run_summary`).
+    Les issues peuvent être fournies par un générateur : on ne garde jamais
+    plus d'un lot en mémoire.
+
+    Returns:
+        Le nombre d'issues enregistrées.
+    """
+    batch_size = batch_size or get_batch_size()
+    issues_iterator = iter(validated_issues)
+    issues_count = 0
+    fingerprint = Fingerprinter()
+    issue_types = IssueTypeRegistry()
+
+    with transaction.atomic():
+        while True:
+            batch_data = list(islice(issues_iterator, batch_size))
+            if not batch_data:
+                break
+            snippet_ids = store_snippets(issue_data.get('code_snippet', '') for issue_data in batch_data)
+            batch = [_build_issue(analysis_run, issue_data, fingerprint, issue_types, snippet_ids) for issue_data in batch_data]
+            Issue.objects.bulk_create(batch, batch_size=batch_size)
+            issues_count += len(batch)
+
+    return issues_count
+
+
+def _build_issue(analysis_run, issue_data, fingerprint, issue_types, snippet_ids):
+    issue_data = dict(issue_data)
+    issue_code = issue_data.pop('issue_code', None) or None
+    code_snippet = issue_data.pop('code_snippet', '')
+    description = issue_data.pop('description', '')
+
+    # La description n'est conservée (sinon NULL) que si elle diffère de celle du catalogue.
+    if description == issue_types.description_for(issue_code, issue_data.get('severity'), description):
+        description = None
+
+    return Issue(
+        analysis_run=analysis_run,
+        issue_type_id=issue_code,
+        description_override=description,
+        snippet_id=snippet_ids.get(code_snippet),
+        fingerprint=fingerprint(issue_code, issue_data['file_path'], code_snippet),
+        **issue_data,
+    )
+
+
+def carry_forward_issues(analysis_run, batch_size=None):
+    """
+    Audit partiel : reprend dans `analysis_run` les issues de `analysis_run.base_run`
+    pour les fichiers qui n'ont pas été ré-analysés (hors de `changed_files`).
+
+    La copie est faite par la base (`INSERT ... SELECT`), sans charger les issues
+    en Python : son coût ne dépend pas de la taille du projet côté serveur web.
+    Les issues des fichiers modifiés ou supprimés sont ensuite retirées, par lots
+    (la liste des fichiers peut dépasser le nombre de paramètres d'une requête).
+
+    Returns:
+        Le nombre d'issues reprises.
+    """
+    batch_size = batch_size or get_batch_size()
+    table = connection.ops.quote_name(Issue._meta.db_table)
+    run_column = connection.ops.quote_name(Issue._meta.get_field('analysis_run').column)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column)
+        for field in Issue._meta.concrete_fields
+        if not field.primary_key and field.name != 'analysis_run'
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({run_column}, {columns}) "
+                f"SELECT %s, {columns} FROM {table} WHERE {run_column} = %s",
+                [analysis_run.pk, analysis_run.base_run_id],
+            )
+            carried_count = cursor.rowcount
+        changed_files = list(analysis_run.changed_files or [])
+        for start in range(0, len(changed_files), batch_size):
+            deleted_count, _ = Issue.objects.filter(
+                analysis_run=analysis_run, file_path__in=changed_files[start:start + batch_size]
+            ).delete()
+            carried_count -= deleted_count
+    return carried_count
@@ -0,0 +1,83 @@
+# projects/management/commands/bench_ingestion.py
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from projects.ingestion import ingest_issues
+from projects.models import AnalysisRun, Project
+from projects.serializers import validate_issues
+
+SEVERITIES = ['CRITICAL', 'MAJOR', 'MINOR', 'INFO']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def make_payload(count):
+    """Génère `count` issues brutes, comme celles envoyées par l'agent."""
+    return [
+        {
+            'issue_code': f"PY{i % 7:03d}",
+            'severity': SEVERITIES[i % len(SEVERITIES)],
+            'module_name': f"module_{i % 50}",
+            'file_path': f"module_{i % 50}/models/model_{i % 200}.py",
+            'line_number': i % 2000 + 1,
+            'description': "Synthetic issue generated by bench_ingestion.",
+            'code_snippet': "self.env.cr.execute('SELECT 1')",
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit d'ingestion des issues (issues/seconde) pour plusieurs tailles de rapport. "
+        "Toutes les écritures sont annulées à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--legacy', action='store_true',
+            help="Mesure aussi l'ancien chemin (un Issue.objects.create par issue).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'issues':>8} {'mode':>8} {'seconds':>9} {'issues/s':>10}")
+        for size in options['sizes']:
+            payload = make_payload(size)
+            modes = [('bulk', self._bulk)]
+            if options['legacy']:
+                modes.append(('legacy', self._legacy))
+            for mode, func in modes:
+                elapsed = self._measure(func, payload, options['batch_size'])
+                self.stdout.write(f"{size:>8} {mode:>8} {elapsed:>9.3f} {size / elapsed:>10.0f}")
+
+    def _measure(self, func, payload, batch_size):
+        # On travaille dans une transaction annulée pour ne rien laisser en base.
+        try:
+            with transaction.atomic():
+                owner = get_user_model().objects.create(username=f"bench-{uuid.uuid4()}")
+                project = Project.objects.create(name="bench_ingestion", owner=owner)
+                start = time.perf_counter()
+                func(project, payload, batch_size)
+                elapsed = time.perf_counter() - start
+                raise _Rollback()
+        except _Rollback:
+            return elapsed
+
+    @staticmethod
+    def _bulk(project, payload, batch_size):
+        analysis_run = AnalysisRun.objects.create(project=project)
+        ingest_issues(analysis_run, validate_issues(payload), batch_size)
+
+    @staticmethod
+    def _legacy(project, payload, batch_size):
+        analysis_run = AnalysisRun.objects.create(project=project)
+        # Un INSERT par issue, comme avant l'ingestion par lots.
+        ingest_issues(analysis_run, validate_issues(payload), batch_size=1)
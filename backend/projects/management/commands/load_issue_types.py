@@ -0,0 +1,31 @@
+# projects/management/commands/load_issue_types.py
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.catalogue import load_issue_types
+
+
+class Command(BaseCommand):
+    help = (
+        "Met à jour le catalogue des types d'issues à partir des métadonnées des règles de l'agent "
+        "(sortie de `auditor rules --format json`)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('rules_file', help="Fichier JSON des règles, ou '-' pour l'entrée standard.")
+
+    def handle(self, *args, **options):
+        path = options['rules_file']
+        try:
+            if path == '-':
+                rules = json.load(sys.stdin)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    rules = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read rules from {path}: {exc}")
+
+        created, updated = load_issue_types(rules)
+        self.stdout.write(self.style.SUCCESS(f"{created} issue type(s) created, {updated} updated."))
@@ -0,0 +1,58 @@
+# projects/management/commands/process_analyses.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from projects.tasks import claim_next_run, expire_open_submissions, process_analysis_run
+
+# Délai (en secondes) entre deux recherches de soumissions abandonnées.
+EXPIRY_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker qui traite les analyses soumises par l'agent (statut PENDING) : "
+        "validation, insertion des issues, calcul du score."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Traite les analyses en attente puis s'arrête, au lieu d'attendre les suivantes.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Délai (en secondes) entre deux vérifications quand la file est vide.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Waiting for pending analyses...")
+        next_expiry_check = 0.0
+        try:
+            while True:
+                if time.monotonic() >= next_expiry_check:
+                    expired = expire_open_submissions()
+                    if expired:
+                        self.stdout.write(f"Expired {expired} submission(s) that were never finalized.")
+                    next_expiry_check = time.monotonic() + EXPIRY_CHECK_INTERVAL
+
+                analysis_run = claim_next_run()
+                if analysis_run is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                process_analysis_run(analysis_run)
+                elapsed = time.perf_counter() - started
+                if analysis_run.status == analysis_run.StatusChoices.COMPLETED:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Analysis #{analysis_run.id} completed in {elapsed:.2f}s (score {analysis_run.effort_score})."
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(
+                        f"Analysis #{analysis_run.id} failed: {analysis_run.error_message}"
+                    ))
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped.")
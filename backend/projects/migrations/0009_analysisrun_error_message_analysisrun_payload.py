@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_alter_issue_issue_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='error_message',
+            field=models.TextField(blank=True, help_text="Raison de l'échec si le traitement de l'analyse a échoué."),
+        ),
+        migrations.AddField(
+            model_name='analysisrun',
+            name='payload',
+            field=models.FileField(blank=True, upload_to='analysis_payloads/'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_analysisrun_error_message_analysisrun_payload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['analysis_run', 'id'], name='issue_run_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['analysis_run', 'severity', 'id'], name='issue_run_severity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['analysis_run', 'issue_code', 'id'], name='issue_run_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['analysis_run', 'module_name', 'id'], name='issue_run_module_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['analysis_run', 'file_path', 'id'], name='issue_run_path_idx'),
+        ),
+    ]
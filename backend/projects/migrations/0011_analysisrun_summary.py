@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:00
+
+from django.db import migrations, models
+from django.db.models import Case, Count, FloatField, Q, Sum, Value, When
+
+# Copie figée de `scoring` et de `summary.compute_run_summary` à la date de la
+# migration : l'état du modèle et le format du résumé ne doivent pas suivre le code de l'application.
+SEVERITIES = ['CRITICAL', 'MAJOR', 'MINOR', 'INFO']
+SEVERITY_COSTS = {'CRITICAL': 5.0, 'MAJOR': 2.0, 'MINOR': 0.5, 'INFO': 0.1}
+ISSUE_CODE_OVERRIDE_COSTS = {'PY002': 8.0, 'XML001': 0.1}
+
+
+def compute_run_summary(issues):
+    whens = [When(issue_code=code, then=Value(cost)) for code, cost in ISSUE_CODE_OVERRIDE_COSTS.items()]
+    whens += [When(severity=severity, then=Value(cost)) for severity, cost in SEVERITY_COSTS.items()]
+    cost = Case(*whens, default=Value(0.0), output_field=FloatField())
+
+    totals = issues.aggregate(
+        issues_count=Count('id'),
+        effort_score=Sum(cost),
+        **{severity: Count('id', filter=Q(severity=severity)) for severity in SEVERITIES},
+    )
+    by_issue_code = issues.order_by().values('issue_code').annotate(issues_count=Count('id'))
+    by_module = issues.order_by().values('module_name').annotate(issues_count=Count('id'), effort_score=Sum(cost))
+    return {
+        'issues_count': totals['issues_count'],
+        'effort_score': totals['effort_score'] or 0.0,
+        'by_severity': {severity: totals[severity] for severity in SEVERITIES},
+        'by_issue_code': {row['issue_code'] or '': row['issues_count'] for row in by_issue_code},
+        'by_module': {
+            row['module_name']: {'issues_count': row['issues_count'], 'effort_score': row['effort_score'] or 0.0}
+            for row in by_module
+        },
+    }
+
+
+def backfill_summaries(apps, schema_editor):
+    """Matérialise le résumé des analyses existantes (et recalcule leur score de la même façon)."""
+    AnalysisRun = apps.get_model('projects', 'AnalysisRun')
+    Issue = apps.get_model('projects', 'Issue')
+    for analysis_run in AnalysisRun.objects.only('id').iterator():
+        summary = compute_run_summary(Issue.objects.filter(analysis_run_id=analysis_run.pk))
+        AnalysisRun.objects.filter(pk=analysis_run.pk).update(
+            summary=summary, effort_score=summary['effort_score']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_issue_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='summary',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
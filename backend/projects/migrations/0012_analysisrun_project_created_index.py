@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_analysisrun_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysisrun',
+            index=models.Index(fields=['project', '-created_at', '-id'], name='run_project_created_idx'),
+        ),
+    ]
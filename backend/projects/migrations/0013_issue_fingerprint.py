@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:40
+
+import hashlib
+import re
+from collections import Counter
+
+from django.db import migrations, models
+
+# Copie figée de `fingerprints.Fingerprinter` à la date de la migration : les
+# empreintes calculées ici ne doivent pas suivre les évolutions du code de l'application.
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class Fingerprinter:
+    def __init__(self):
+        self._seen = Counter()
+
+    def __call__(self, issue_code, file_path, code_snippet):
+        snippet = _WHITESPACE_RE.sub(' ', code_snippet or '').strip()
+        key = (issue_code or '', file_path, snippet)
+        occurrence = self._seen[key]
+        self._seen[key] += 1
+        payload = '\x1f'.join([issue_code or '', file_path, snippet, str(occurrence)])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """Calcule l'empreinte des issues existantes, analyse par analyse, dans l'ordre d'insertion."""
+    AnalysisRun = apps.get_model('projects', 'AnalysisRun')
+    Issue = apps.get_model('projects', 'Issue')
+    for run_id in AnalysisRun.objects.values_list('id', flat=True).iterator():
+        fingerprint = Fingerprinter()
+        batch = []
+        issues = Issue.objects.filter(analysis_run_id=run_id).order_by('id').only(
+            'id', 'issue_code', 'file_path', 'code_snippet'
+        )
+        for issue in issues.iterator(chunk_size=1000):
+            issue.fingerprint = fingerprint(issue.issue_code, issue.file_path, issue.code_snippet)
+            batch.append(issue)
+            if len(batch) >= 1000:
+                Issue.objects.bulk_update(batch, ['fingerprint'])
+                batch = []
+        Issue.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_analysisrun_project_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['analysis_run', 'fingerprint'], name='issue_run_fingerprint_idx'),
+        ),
+    ]
@@ -0,0 +1,175 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:10
+
+import hashlib
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Length
+
+BATCH_SIZE = 10000
+
+
+def _text_bytes(queryset, field):
+    return queryset.aggregate(total=Sum(Length(field)))['total'] or 0
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def convert_issues(apps, schema_editor):
+    """
+    Remplit le catalogue des types et des extraits à partir des issues existantes,
+    puis vide les colonnes devenues redondantes. Affiche l'espace texte économisé.
+
+    Tout est fait en quelques requêtes ensemblistes : les extraits distincts sont
+    insérés par lots, puis les issues sont mises à jour par des UPDATE avec
+    sous-requête, par plages d'id.
+    """
+    Issue = apps.get_model('projects', 'Issue')
+    IssueType = apps.get_model('projects', 'IssueType')
+    CodeSnippet = apps.get_model('projects', 'CodeSnippet')
+
+    bytes_before = _text_bytes(Issue.objects, 'description') + _text_bytes(Issue.objects, 'code_snippet')
+
+    # Un code vide devient NULL : la colonne va référencer le catalogue.
+    Issue.objects.filter(issue_code='').update(issue_code=None)
+
+    # Un type par code, décrit par sa première issue.
+    first_ids = (
+        Issue.objects.exclude(issue_code__isnull=True).order_by()
+        .values('issue_code').annotate(first_id=Min('id')).values_list('first_id', flat=True)
+    )
+    IssueType.objects.bulk_create(
+        IssueType(code=code, default_severity=severity, description=description)
+        for code, severity, description in Issue.objects.filter(id__in=first_ids).values_list(
+            'issue_code', 'severity', 'description'
+        )
+    )
+
+    # Un extrait par contenu distinct.
+    contents = Issue.objects.exclude(code_snippet='').order_by().values_list('code_snippet', flat=True).distinct()
+    snippets = (
+        CodeSnippet(digest=hashlib.sha256(content.encode('utf-8')).hexdigest(), content=content)
+        for content in contents.iterator(chunk_size=BATCH_SIZE)
+    )
+    while True:
+        batch = list(islice(snippets, BATCH_SIZE))
+        if not batch:
+            break
+        CodeSnippet.objects.bulk_create(batch)
+
+    # Index temporaire : la sous-requête retrouve chaque extrait par son contenu.
+    content_index = models.Index(fields=['content'], name='snippet_content_tmp_idx')
+    schema_editor.add_index(CodeSnippet, content_index)
+    snippet_id = Subquery(CodeSnippet.objects.filter(content=OuterRef('code_snippet')).values('id')[:1])
+    # Une description identique à celle du catalogue n'est plus stockée (NULL).
+    type_description = Subquery(IssueType.objects.filter(code=OuterRef('issue_code')).values('description')[:1])
+    bounds = Issue.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is not None:
+        for low in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+            issues = Issue.objects.filter(id__gte=low, id__lt=low + BATCH_SIZE)
+            issues.exclude(code_snippet='').update(snippet_id=snippet_id, code_snippet='')
+            issues.exclude(issue_code__isnull=True).filter(description=type_description).update(description=None)
+    schema_editor.remove_index(CodeSnippet, content_index)
+
+    bytes_after = (
+        _text_bytes(Issue.objects, 'description')
+        + _text_bytes(IssueType.objects, 'description')
+        + _text_bytes(CodeSnippet.objects, 'content')
+    )
+    if bytes_before:
+        print(
+            f"\n  Issue descriptions and snippets: {_format_size(bytes_before)} -> {_format_size(bytes_after)} "
+            f"(saved {_format_size(bytes_before - bytes_after)}, {IssueType.objects.count()} issue types, "
+            f"{CodeSnippet.objects.count()} distinct snippets)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_issue_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('default_severity', models.CharField(choices=[('CRITICAL', 'Critical'), ('MAJOR', 'Major'), ('MINOR', 'Minor'), ('INFO', 'Info')], default='INFO', max_length=10)),
+                ('description', models.TextField(blank=True)),
+                ('checker_version', models.PositiveIntegerField(blank=True, help_text='Version de la règle (VERSION du checker).', null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CodeSnippet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('content', models.TextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='snippet',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='projects.codesnippet'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(convert_issues, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='issue',
+            name='code_snippet',
+        ),
+        # Les colonnes `description` et `issue_code` sont conservées telles quelles :
+        # seuls les champs du modèle changent de nom, et `issue_code` devient une clé étrangère.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='issue',
+                    name='issue_code',
+                    field=models.ForeignKey(blank=True, db_column='issue_code', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='issues', to='projects.issuetype', to_field='code'),
+                ),
+            ],
+            state_operations=[
+                migrations.RenameField(
+                    model_name='issue',
+                    old_name='description',
+                    new_name='description_override',
+                ),
+                migrations.AlterField(
+                    model_name='issue',
+                    name='description_override',
+                    field=models.TextField(blank=True, db_column='description', null=True),
+                ),
+                migrations.RemoveIndex(
+                    model_name='issue',
+                    name='issue_run_code_idx',
+                ),
+                migrations.RemoveField(
+                    model_name='issue',
+                    name='issue_code',
+                ),
+                migrations.AddField(
+                    model_name='issue',
+                    name='issue_type',
+                    field=models.ForeignKey(blank=True, db_column='issue_code', help_text='Code unique identifiant le type de problème', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='issues', to='projects.issuetype', to_field='code'),
+                ),
+                migrations.AddIndex(
+                    model_name='issue',
+                    index=models.Index(fields=['analysis_run', 'issue_type', 'id'], name='issue_run_code_idx'),
+                ),
+            ],
+        ),
+    ]
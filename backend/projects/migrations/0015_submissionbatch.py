@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_issue_catalogue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('payload', models.FileField(upload_to='analysis_batches/')),
+                ('received_at', models.DateTimeField(auto_now=True)),
+                ('analysis_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_batches', to='projects.analysisrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('analysis_run', 'number'), name='unique_submission_batch')],
+            },
+        ),
+    ]
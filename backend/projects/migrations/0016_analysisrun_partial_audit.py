@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_submissionbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='base_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.analysisrun'),
+        ),
+        migrations.AddField(
+            model_name='analysisrun',
+            name='changed_files',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+def backfill_hop_breakdown(apps, schema_editor):
+    """
+    Les issues existantes n'ont pas d'étape de migration : leur total est
+    reporté tel quel sous l'étape '', sans relire les issues.
+    """
+    AnalysisRun = apps.get_model('projects', 'AnalysisRun')
+    for analysis_run in AnalysisRun.objects.only('id', 'summary').iterator():
+        summary = analysis_run.summary
+        if not summary or 'by_migration_hop' in summary:
+            continue
+        summary['by_migration_hop'] = {} if not summary.get('issues_count') else {
+            '': {'issues_count': summary['issues_count'], 'effort_score': summary.get('effort_score', 0.0)}
+        }
+        AnalysisRun.objects.filter(pk=analysis_run.pk).update(summary=summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_analysisrun_partial_audit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='migration_hop',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.RunPython(backfill_hop_breakdown, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_started_at(apps, schema_editor):
+    """
+    Les analyses déjà en cours de traitement sont datées de la migration : si leur
+    worker s'est arrêté, elles seront remises en attente après `ANALYSIS_RUN_TIMEOUT`.
+    """
+    AnalysisRun = apps.get_model('projects', 'AnalysisRun')
+    AnalysisRun.objects.filter(status='RUNNING').exclude(payload='').update(started_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_issue_migration_hop'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_started_at, migrations.RunPython.noop),
+    ]
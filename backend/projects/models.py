@@ -3,14 +3,44 @@ from django.db import models
 # Create your models here.
 import uuid
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
+class ProjectQuerySet(models.QuerySet):
+    def with_run_stats(self):
+        """
+        Annote chaque projet avec les statistiques de ses analyses, en une seule requête.
+
+        `runs_count`, puis l'id, le statut et le score de la dernière analyse,
+        et l'écart de score avec l'analyse précédente (`effort_score_delta`,
+        nul s'il n'y en a qu'une). Le coût ne dépend pas de l'historique des analyses.
+        """
+        runs = AnalysisRun.objects.filter(project=OuterRef('pk')).order_by('-created_at', '-id')
+        runs_count = (
+            AnalysisRun.objects.filter(project=OuterRef('pk'))
+            .order_by().values('project').annotate(count=Count('id')).values('count')
+        )
+        return self.annotate(
+            runs_count=Coalesce(Subquery(runs_count), 0),
+            latest_run_id=Subquery(runs.values('id')[:1]),
+            latest_run_status=Subquery(runs.values('status')[:1]),
+            latest_run_effort_score=Subquery(runs.values('effort_score')[:1]),
+            previous_run_effort_score=Subquery(runs.values('effort_score')[1:2]),
+        ).annotate(
+            effort_score_delta=F('latest_run_effort_score') - F('previous_run_effort_score'),
+        )
+
+
 class Project(models.Model):
     name = models.CharField(max_length=200)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='projects')
     git_url = models.URLField(max_length=200, blank=True, null=True)
     api_key = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ProjectQuerySet.as_manager()
+
     def __str__(self): return self.name
 
 class AnalysisRun(models.Model):
@@ -24,11 +54,60 @@ class AnalysisRun(models.Model):
     effort_score = models.FloatField(default=0.0, help_text="Score d'effort calculé basé sur les issues trouvées.")
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Prise en charge par un worker (voir `tasks.claim_next_run`) : une analyse restée
+    # RUNNING au-delà de `ANALYSIS_RUN_TIMEOUT` est remise en attente.
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Rapport brut (NDJSON gzip) en attente de traitement par le worker (`manage.py process_analyses`).
+    payload = models.FileField(upload_to='analysis_payloads/', blank=True)
+    error_message = models.TextField(blank=True, help_text="Raison de l'échec si le traitement de l'analyse a échoué.")
+    # Résumé matérialisé à l'ingestion (voir `summary.compute_run_summary`) :
+    # compteurs par sévérité, par code et par module, effort par module et total.
+    summary = models.JSONField(default=dict, blank=True)
+    # Audit partiel (`odoo-auditor audit --changed-since`) : seuls les fichiers de
+    # `changed_files` ont été ré-analysés ; les issues des autres fichiers sont
+    # reprises de `base_run` au traitement (voir `ingestion.carry_forward_issues`).
+    # `changed_files` est nul pour un audit complet.
+    base_run = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    changed_files = models.JSONField(null=True, blank=True)
+    # Commit git analysé (HEAD d'un dépôt sans modification locale), s'il est connu :
+    # un audit partiel part de l'analyse du commit de base de sa comparaison git.
+    git_commit = models.CharField(max_length=64, blank=True)
+    # Clé envoyée par l'agent à l'ouverture d'une soumission (empreinte du rapport) :
+    # une ouverture retentée retrouve la soumission déjà ouverte au lieu d'en créer une autre.
+    idempotency_key = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [
+            # Historique d'un projet et dernières analyses (voir `ProjectQuerySet.with_run_stats`).
+            models.Index(fields=['project', '-created_at', '-id'], name='run_project_created_idx'),
+            models.Index(fields=['project', 'idempotency_key'], name='run_project_idempotency_idx'),
+            models.Index(fields=['project', 'git_commit'], name='run_project_commit_idx'),
+        ]
 
     def __str__(self):
         return f"Analysis for {self.project.name} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class SubmissionBatch(models.Model):
+    """
+    Lot d'issues reçu pendant une soumission en plusieurs requêtes
+    (`/api/submissions/`). Les lots sont regroupés en un seul rapport brut à la finalisation.
+    """
+    analysis_run = models.ForeignKey(AnalysisRun, on_delete=models.CASCADE, related_name='submission_batches')
+    number = models.PositiveIntegerField()
+    # Lot brut (NDJSON gzip), tel qu'envoyé par l'agent.
+    payload = models.FileField(upload_to='analysis_batches/')
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['analysis_run', 'number'], name='unique_submission_batch'),
+        ]
+
+    def __str__(self):
+        return f"Batch {self.number} of analysis #{self.analysis_run_id}"
+
+
 class Issue(models.Model):
     class SeverityChoices(models.TextChoices):
         CRITICAL = 'CRITICAL', 'Critical'
@@ -49,9 +128,83 @@ class Issue(models.Model):
     module_name = models.CharField(max_length=100)
     file_path = models.CharField(max_length=255)
     line_number = models.PositiveIntegerField(null=True, blank=True)
-    description = models.TextField()
-    code_snippet = models.TextField(blank=True)
-    issue_code = models.CharField(max_length=20, blank=True, null=True, help_text="Code unique identifiant le type de problème")
+    # La description est celle du catalogue (`IssueType`) : elle n'est stockée ici
+    # (NULL sinon) que si elle en diffère. Les extraits de code sont dédupliqués (`CodeSnippet`).
+    description_override = models.TextField(null=True, blank=True, db_column='description')
+    snippet = models.ForeignKey('CodeSnippet', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    # La colonne reste `issue_code` : elle contient le code du type de problème.
+    issue_type = models.ForeignKey(
+        'IssueType',
+        on_delete=models.PROTECT,
+        to_field='code',
+        db_column='issue_code',
+        null=True,
+        blank=True,
+        related_name='issues',
+        help_text="Code unique identifiant le type de problème"
+    )
+    # Empreinte stable (code, fichier, extrait normalisé), calculée à l'ingestion :
+    # elle permet de suivre une issue d'une analyse à l'autre (voir `fingerprints`).
+    fingerprint = models.CharField(max_length=40, blank=True)
+    # Étape de migration (ex: '16.0-17.0') à laquelle l'issue est imputée, pour un
+    # audit sur plusieurs versions : la première étape où sa règle s'applique.
+    migration_hop = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        # Index composites pour la liste paginée des issues d'une analyse
+        # (`/api/analyses/{id}/issues/`) : filtre éventuel puis tri par id (curseur).
+        indexes = [
+            models.Index(fields=['analysis_run', 'id'], name='issue_run_id_idx'),
+            models.Index(fields=['analysis_run', 'severity', 'id'], name='issue_run_severity_idx'),
+            models.Index(fields=['analysis_run', 'issue_type', 'id'], name='issue_run_code_idx'),
+            models.Index(fields=['analysis_run', 'module_name', 'id'], name='issue_run_module_idx'),
+            models.Index(fields=['analysis_run', 'file_path', 'id'], name='issue_run_path_idx'),
+            # Comparaison de deux analyses (`/api/analyses/{a}/diff/{b}/`).
+            models.Index(fields=['analysis_run', 'fingerprint'], name='issue_run_fingerprint_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.severity} in {self.file_path} (L{self.line_number})"
\ No newline at end of file
+        return f"{self.severity} in {self.file_path} (L{self.line_number})"
+
+    @property
+    def issue_code(self):
+        return self.issue_type_id
+
+    @property
+    def description(self):
+        """La description propre à l'issue, ou à défaut celle de son type."""
+        if self.description_override is not None or self.issue_type_id is None:
+            return self.description_override or ''
+        return self.issue_type.description
+
+    @property
+    def code_snippet(self):
+        return self.snippet.content if self.snippet_id else ''
+
+
+class IssueType(models.Model):
+    """
+    Catalogue des types de problèmes, alimenté par les métadonnées des règles de l'agent.
+    """
+    code = models.CharField(max_length=20, unique=True)
+    default_severity = models.CharField(
+        max_length=10,
+        choices=Issue.SeverityChoices.choices,
+        default=Issue.SeverityChoices.INFO
+    )
+    description = models.TextField(blank=True)
+    checker_version = models.PositiveIntegerField(null=True, blank=True, help_text="Version de la règle (VERSION du checker).")
+
+    def __str__(self):
+        return self.code
+
+
+class CodeSnippet(models.Model):
+    """
+    Extrait de code stocké une seule fois, adressé par le hash SHA-256 de son contenu.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    content = models.TextField()
+
+    def __str__(self):
+        return self.content[:50]
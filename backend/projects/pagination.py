@@ -0,0 +1,25 @@
+# projects/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class IssueCursorPagination(CursorPagination):
+    """
+    Pagination par curseur des issues d'une analyse.
+
+    Contrairement à une pagination par numéro de page, le coût d'une page ne
+    dépend pas de sa position (pas d'OFFSET), même sur des millions de lignes.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class AnalysisRunCursorPagination(CursorPagination):
+    """
+    Pagination par curseur de l'historique des analyses d'un projet, de la plus récente à la plus ancienne.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
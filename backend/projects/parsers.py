@@ -0,0 +1,52 @@
+# projects/parsers.py
+import gzip
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser pour les rapports envoyés en NDJSON (un objet JSON par ligne),
+    éventuellement compressés (en-tête `Content-Encoding: gzip`).
+
+    Le corps de la requête n'est jamais chargé en entier : on renvoie un
+    générateur qui décompresse et décode le flux ligne par ligne, au fur et
+    à mesure que la vue le consomme.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context.get('request')
+        encoding = request.headers.get('Content-Encoding', '').lower() if request is not None else ''
+
+        if encoding == 'gzip':
+            stream = gzip.GzipFile(fileobj=stream, mode='rb')
+        elif encoding not in ('', 'identity'):
+            raise ParseError(f"Unsupported Content-Encoding: {encoding}")
+
+        return iter_ndjson(stream)
+
+
+def iter_ndjson(stream):
+    """
+    Décode un flux NDJSON (déjà décompressé) ligne par ligne.
+
+    Lève `ParseError` sur une ligne invalide ou un flux gzip corrompu.
+    """
+    if stream is None:
+        return
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {line_number}: {exc}")
+    except (OSError, EOFError) as exc:
+        # Flux gzip corrompu ou tronqué.
+        raise ParseError(f"Could not decompress the request body: {exc}")
@@ -1,6 +1,7 @@
 # projects/permissions.py
 from .models import Project, AnalysisRun
 from rest_framework.permissions import BasePermission
+from .api_keys import get_project_for_api_key
 
 class IsProjectOwner(BasePermission):
     """
@@ -38,13 +39,12 @@ class HasValidAPIKey(BasePermission):
         # On extrait la clé elle-même
         api_key = auth_header.split(' ')[1]
 
-        try:
-            # On cherche si un projet correspond à cette clé
-            project = Project.objects.get(api_key=api_key)
-            
-            # C'est l'astuce : on attache le projet trouvé directement à l'objet 'request'.
-            # Ça nous évitera de le chercher à nouveau dans la vue.
-            request.project = project
-            return True
-        except Project.DoesNotExist:
-            return False
\ No newline at end of file
+        # On cherche le projet correspondant à cette clé (via le cache, voir `api_keys`).
+        project = get_project_for_api_key(api_key)
+        if project is None:
+            return False
+
+        # C'est l'astuce : on attache le projet trouvé directement à l'objet 'request'.
+        # Ça nous évitera de le chercher à nouveau dans la vue.
+        request.project = project
+        return True
@@ -0,0 +1,37 @@
+# projects/renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+def _render_error(data):
+    # Seules les réponses d'erreur (404, 403...) passent par le renderer : on les renvoie en JSON.
+    if data is None:
+        return b''
+    return json.dumps(data).encode('utf-8')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Déclare le format NDJSON auprès de la négociation de contenu de DRF
+    (`?format=ndjson`). Le corps est produit en streaming par la vue (voir `export`).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _render_error(data)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Déclare le format CSV auprès de la négociation de contenu de DRF
+    (`?format=csv`). Le corps est produit en streaming par la vue (voir `export`).
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _render_error(data)
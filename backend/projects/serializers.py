@@ -6,47 +6,114 @@ from .models import Project, AnalysisRun, Issue
 
 
 class AnalysisRunListSerializer(serializers.ModelSerializer):
+    # Lu dans le résumé matérialisé : la vue d'ensemble d'un projet coûte O(analyses), pas O(issues).
+    issues_count = serializers.SerializerMethodField()
+
     class Meta:
         model = AnalysisRun
-        fields = ['id', 'status', 'created_at', 'effort_score']
+        fields = ['id', 'status', 'created_at', 'effort_score', 'issues_count']
+
+    def get_issues_count(self, obj):
+        return obj.summary.get('issues_count', 0)
 
 
 class ProjectSerializer(serializers.ModelSerializer):
-    analysis_runs = AnalysisRunListSerializer(many=True, read_only=True)
-    
+    # L'historique complet des analyses n'est plus imbriqué : il est paginé
+    # via `/api/projects/{id}/runs/`. Les statistiques viennent des
+    # annotations de `Project.objects.with_run_stats()`.
+    runs_count = serializers.SerializerMethodField()
+    latest_run = serializers.SerializerMethodField()
+    effort_score_delta = serializers.SerializerMethodField()
+
     class Meta:
         model = Project
-        # On ne change que cette ligne
-        fields = ['id', 'name', 'owner', 'git_url', 'api_key', 'created_at', 'analysis_runs']
+        fields = [
+            'id', 'name', 'owner', 'git_url', 'api_key', 'created_at',
+            'runs_count', 'latest_run', 'effort_score_delta'
+        ]
         read_only_fields = ['owner']
 
+    def get_runs_count(self, obj):
+        # Un projet tout juste créé n'est pas annoté (et n'a pas d'analyse).
+        return getattr(obj, 'runs_count', 0)
+
+    def get_latest_run(self, obj):
+        if getattr(obj, 'latest_run_id', None) is None:
+            return None
+        return {
+            'id': obj.latest_run_id,
+            'status': obj.latest_run_status,
+            'effort_score': obj.latest_run_effort_score,
+        }
+
+    def get_effort_score_delta(self, obj):
+        return getattr(obj, 'effort_score_delta', None)
+
 class IssueSerializer(serializers.ModelSerializer):
+    # Ces champs sont reconstitués à partir du catalogue (`IssueType`) et des
+    # extraits dédupliqués (`CodeSnippet`) : la forme de l'API ne change pas.
+    issue_code = serializers.CharField(max_length=20, required=False, allow_null=True, allow_blank=True)
+    description = serializers.CharField()
+    code_snippet = serializers.CharField(required=False, allow_blank=True)
+
     class Meta:
         model = Issue
         fields = [
             'id', 'issue_code', 'severity', 'module_name', 'file_path', 
-            'line_number', 'description', 'code_snippet'
+            'line_number', 'description', 'code_snippet', 'fingerprint', 'migration_hop'
         ]
+        # L'empreinte est calculée à l'ingestion, jamais fournie par l'agent.
+        read_only_fields = ['fingerprint']
+
+
+def validate_issues(issues_data):
+    """
+    Valide paresseusement des issues brutes (dictionnaires issus du JSON).
+
+    Une seule instance de serializer est réutilisée pour toutes les issues,
+    comme le fait `ListSerializer`, plutôt qu'une instance par issue.
+    """
+    validator = IssueSerializer()
+    for issue_data in issues_data:
+        yield validator.run_validation(issue_data)
 
 
 class AnalysisRunDetailSerializer(serializers.ModelSerializer):
-    # C'est ici que la magie opère.
-    # On déclare un champ 'issues' qui utilisera notre IssueSerializer.
-    # many=True indique qu'il s'agit d'une liste de plusieurs objets.
-    # read_only=True signifie que ce champ sera seulement lu, pas écrit via ce serializer.
-    issues = IssueSerializer(many=True, read_only=True)
+    # Les issues ne sont plus imbriquées (une analyse peut en contenir des
+    # centaines de milliers) : on ne renvoie que des compteurs, lus dans le
+    # résumé matérialisé, et la liste paginée est disponible via
+    # `/api/analyses/{id}/issues/`.
+    issues_count = serializers.SerializerMethodField()
+    severity_counts = serializers.SerializerMethodField()
 
     class Meta:
         model = AnalysisRun
         fields = [
             'id', 'project', 'status', 'created_at', 
-            'completed_at','effort_score', 'issues' 
+            'completed_at','effort_score', 'error_message', 'issues_count', 'severity_counts', 'base_run',
+            'git_commit',
         ]
 
+    def get_issues_count(self, obj):
+        return obj.summary.get('issues_count', 0)
+
+    def get_severity_counts(self, obj):
+        by_severity = obj.summary.get('by_severity', {})
+        return {severity: by_severity.get(severity, 0) for severity in Issue.SeverityChoices.values}
 
 
+class AnalysisRunSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisRun
+        fields = ['id', 'project', 'status', 'created_at', 'completed_at', 'effort_score', 'summary']
+
 
 class AnalysisRunCreateSerializer(serializers.ModelSerializer):
+    """
+    Format historique d'une soumission (`{"issues": [...]}`), pour l'API navigable.
+    Il ne crée rien : `AnalysisRunCreateView` enregistre le rapport brut et
+    c'est le worker qui l'ingère (`tasks.process_analysis_run`).
+    """
     # On redéfinit 'issues' pour qu'il soit inscriptible (writeable).
     # On utilise le 'slug' du serializer d'Issue que nous avons déjà, 
     # mais on enlève 'read_only=True'.
@@ -57,21 +124,3 @@ class AnalysisRunCreateSerializer(serializers.ModelSerializer):
         # On ne demande que le project_id et la liste des issues à l'agent.
         # Le statut et les dates seront gérés automatiquement.
         fields = [ 'issues']
-
-    def create(self, validated_data):
-        """
-        On surcharge la méthode create pour gérer la création imbriquée.
-        """
-        # On extrait les données des 'issues' du dictionnaire validé.
-        issues_data = validated_data.pop('issues')
-        
-        # On crée d'abord l'objet parent 'AnalysisRun'.
-        # On passe directement le reste des données validées (ici, juste 'project').
-        analysis_run = AnalysisRun.objects.create(**validated_data)
-        
-        # Ensuite, on boucle sur chaque 'issue' reçue...
-        for issue_data in issues_data:
-            # ...et on crée l'objet Issue en le liant à l'AnalysisRun parent.
-            Issue.objects.create(analysis_run=analysis_run, **issue_data)
-            
-        return analysis_run
\ No newline at end of file
@@ -0,0 +1,66 @@
+# projects/summary.py
+from django.db.models import Case, Count, FloatField, Q, Sum, Value, When
+
+from .scoring import ISSUE_CODE_OVERRIDE_COSTS, SEVERITY_COSTS
+
+SEVERITIES = ['CRITICAL', 'MAJOR', 'MINOR', 'INFO']
+
+
+def issue_cost_expression():
+    """
+    Le coût d'une issue, calculé par la base à partir des tables de `scoring`.
+
+    Un coût d'override spécifique au code de l'issue passe avant le coût par
+    défaut de sa sévérité (0 si la sévérité est inconnue).
+    """
+    whens = [When(issue_type=code, then=Value(cost)) for code, cost in ISSUE_CODE_OVERRIDE_COSTS.items()]
+    whens += [When(severity=severity, then=Value(cost)) for severity, cost in SEVERITY_COSTS.items()]
+    return Case(*whens, default=Value(0.0), output_field=FloatField())
+
+
+def compute_run_summary(issues):
+    """
+    Calcule le résumé d'une analyse à partir du queryset de ses issues.
+
+    Tout est agrégé par la base (GROUP BY et agrégation conditionnelle) :
+    aucune issue n'est chargée en mémoire.
+    """
+    cost = issue_cost_expression()
+
+    totals = issues.aggregate(
+        issues_count=Count('id'),
+        effort_score=Sum(cost),
+        **{severity: Count('id', filter=Q(severity=severity)) for severity in SEVERITIES},
+    )
+    by_issue_code = issues.order_by().values('issue_type').annotate(issues_count=Count('id'))
+    by_module = issues.order_by().values('module_name').annotate(issues_count=Count('id'), effort_score=Sum(cost))
+    # Audit sur plusieurs versions : effort imputé à chaque étape de la migration
+    # ('' pour les issues sans étape, envoyées par un ancien agent).
+    by_migration_hop = (
+        issues.order_by().values('migration_hop').annotate(issues_count=Count('id'), effort_score=Sum(cost))
+    )
+
+    return {
+        'issues_count': totals['issues_count'],
+        'effort_score': totals['effort_score'] or 0.0,
+        'by_severity': {severity: totals[severity] for severity in SEVERITIES},
+        'by_issue_code': {row['issue_type'] or '': row['issues_count'] for row in by_issue_code},
+        'by_module': {
+            row['module_name']: {'issues_count': row['issues_count'], 'effort_score': row['effort_score'] or 0.0}
+            for row in by_module
+        },
+        'by_migration_hop': {
+            row['migration_hop']: {'issues_count': row['issues_count'], 'effort_score': row['effort_score'] or 0.0}
+            for row in by_migration_hop
+        },
+    }
+
+
+def refresh_run_summary(analysis_run):
+    """
+    Recalcule et enregistre le résumé de l'analyse, ainsi que son score d'effort.
+    """
+    analysis_run.summary = compute_run_summary(analysis_run.issues.all())
+    analysis_run.effort_score = analysis_run.summary['effort_score']
+    analysis_run.save(update_fields=['summary', 'effort_score'])
+    return analysis_run.summary
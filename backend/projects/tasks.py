@@ -0,0 +1,217 @@
+# projects/tasks.py
+import gzip
+import json
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .ingestion import carry_forward_issues, ingest_issues
+from .models import AnalysisRun, SubmissionBatch
+from .parsers import iter_ndjson
+from .serializers import validate_issues
+from .summary import refresh_run_summary
+
+
+def store_payload(analysis_run, payload_file):
+    """
+    Attache le rapport brut (un fichier NDJSON gzip) à l'analyse et l'enregistre.
+
+    L'analyse reste en PENDING : c'est le worker qui la traitera.
+    """
+    analysis_run.payload.save(f"run_{uuid.uuid4().hex}.ndjson.gz", File(payload_file), save=False)
+    analysis_run.save()
+    return analysis_run
+
+
+def store_batch(analysis_run, number, payload_file):
+    """
+    Enregistre (ou remplace) le lot numéro `number` d'une soumission en plusieurs requêtes.
+
+    Renvoyer un lot déjà reçu le remplace : l'envoi d'un lot est idempotent.
+    """
+    batch = SubmissionBatch.objects.filter(analysis_run=analysis_run, number=number).first()
+    if batch is None:
+        batch = SubmissionBatch(analysis_run=analysis_run, number=number)
+    else:
+        batch.payload.delete(save=False)
+    batch.payload.save(f"run_{analysis_run.pk}_batch_{number}.ndjson.gz", File(payload_file), save=True)
+    return batch
+
+
+def missing_batches(analysis_run, batch_count):
+    """Numéros des lots (de 1 à `batch_count`) qui n'ont pas encore été reçus."""
+    received = set(analysis_run.submission_batches.values_list('number', flat=True))
+    return [number for number in range(1, batch_count + 1) if number not in received]
+
+
+def assemble_batches(analysis_run, batch_count):
+    """
+    Regroupe les lots reçus en un seul rapport brut et met l'analyse en file (PENDING).
+
+    Des membres gzip concaténés forment un flux gzip valide : les lots sont
+    simplement mis bout à bout, sans être décompressés.
+    """
+    batches = list(analysis_run.submission_batches.filter(number__lte=batch_count).order_by('number'))
+    with tempfile.TemporaryFile() as spool:
+        for batch in batches:
+            with batch.payload.open('rb') as batch_file:
+                shutil.copyfileobj(batch_file, spool)
+        spool.seek(0)
+        analysis_run.status = AnalysisRun.StatusChoices.PENDING
+        store_payload(analysis_run, spool)
+
+    _delete_batches(analysis_run)
+    return analysis_run
+
+
+def _delete_batches(analysis_run):
+    for batch in analysis_run.submission_batches.all():
+        batch.payload.delete(save=False)
+    analysis_run.submission_batches.all().delete()
+
+
+def expire_open_submissions():
+    """
+    Abandonne les soumissions ouvertes (RUNNING sans rapport) depuis plus de
+    `SUBMISSION_EXPIRY_HOURS` heures sans avoir été finalisées : l'analyse passe
+    en FAILED et ses lots sont supprimés.
+
+    Returns:
+        Le nombre de soumissions expirées.
+    """
+    deadline = timezone.now() - timedelta(hours=settings.SUBMISSION_EXPIRY_HOURS)
+    open_runs = AnalysisRun.objects.filter(status=AnalysisRun.StatusChoices.RUNNING, payload='')
+    expired = 0
+    for analysis_run in open_runs.filter(created_at__lt=deadline):
+        # Mise à jour conditionnelle : une finalisation concurrente l'emporte.
+        if not open_runs.filter(pk=analysis_run.pk).update(
+            status=AnalysisRun.StatusChoices.FAILED,
+            error_message="The submission was not finalized in time.",
+            completed_at=timezone.now(),
+        ):
+            continue
+        _delete_batches(analysis_run)
+        expired += 1
+    return expired
+
+
+def spool_ndjson_stream(stream, content_encoding=''):
+    """
+    Copie un flux NDJSON reçu dans un fichier temporaire gzip, par blocs.
+
+    Un flux déjà compressé est recopié tel quel, sans être décodé : il sera
+    validé par le worker.
+    """
+    spool = tempfile.TemporaryFile()
+    if content_encoding == 'gzip':
+        shutil.copyfileobj(stream, spool)
+    else:
+        with gzip.GzipFile(fileobj=spool, mode='wb') as writer:
+            shutil.copyfileobj(stream, writer)
+    spool.seek(0)
+    return spool
+
+
+def spool_issues(issues_data):
+    """Écrit une liste d'issues (format JSON historique) dans un fichier temporaire NDJSON gzip."""
+    spool = tempfile.TemporaryFile()
+    with gzip.GzipFile(fileobj=spool, mode='wb') as writer:
+        for issue_data in issues_data:
+            writer.write(json.dumps(issue_data).encode('utf-8') + b'\n')
+    spool.seek(0)
+    return spool
+
+
+def reclaim_stale_runs():
+    """
+    Remet en PENDING les analyses en cours de traitement (RUNNING, rapport reçu)
+    depuis plus de `ANALYSIS_RUN_TIMEOUT` secondes : leur worker s'est arrêté sans
+    les terminer. Le traitement étant transactionnel, aucune issue n'a été conservée ;
+    le délai doit donc dépasser la durée du plus long traitement.
+
+    Les soumissions encore ouvertes (RUNNING sans rapport) ne sont pas concernées.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.ANALYSIS_RUN_TIMEOUT)
+    stale = (
+        AnalysisRun.objects
+        .filter(status=AnalysisRun.StatusChoices.RUNNING)
+        .exclude(payload='')
+        .filter(started_at__lt=deadline)
+    )
+    return stale.update(status=AnalysisRun.StatusChoices.PENDING, started_at=None)
+
+
+def claim_next_run():
+    """
+    Réserve la plus ancienne analyse en attente en la passant en RUNNING.
+
+    La réservation est un UPDATE conditionnel : si plusieurs workers tournent,
+    un seul d'entre eux obtient chaque analyse. Un audit partiel attend que son
+    analyse de base soit traitée. Les analyses abandonnées par un worker arrêté
+    sont d'abord remises en attente (voir `reclaim_stale_runs`).
+    """
+    reclaim_stale_runs()
+    pending_ids = (
+        AnalysisRun.objects
+        .filter(status=AnalysisRun.StatusChoices.PENDING)
+        .exclude(payload='')
+        .exclude(base_run__status__in=[AnalysisRun.StatusChoices.PENDING, AnalysisRun.StatusChoices.RUNNING])
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for run_id in pending_ids:
+        claimed = (
+            AnalysisRun.objects
+            .filter(id=run_id, status=AnalysisRun.StatusChoices.PENDING)
+            .update(status=AnalysisRun.StatusChoices.RUNNING, started_at=timezone.now())
+        )
+        if claimed:
+            return AnalysisRun.objects.get(id=run_id)
+    return None
+
+
+def process_analysis_run(analysis_run):
+    """
+    Valide et enregistre les issues du rapport brut, calcule le résumé et le score puis
+    termine l'analyse (COMPLETED, ou FAILED avec la raison de l'échec).
+
+    Pour un audit partiel, les issues des fichiers non modifiés sont d'abord
+    reprises de l'analyse de base (voir `ingestion.carry_forward_issues`).
+    """
+    try:
+        with analysis_run.payload.open('rb') as raw, gzip.GzipFile(fileobj=raw, mode='rb') as stream:
+            with transaction.atomic():
+                if analysis_run.changed_files is not None:
+                    if analysis_run.base_run_id is None:
+                        raise ValueError("The base analysis of this partial audit was deleted: run a full audit.")
+                    if analysis_run.base_run.status != AnalysisRun.StatusChoices.COMPLETED:
+                        raise ValueError(
+                            f"The base analysis #{analysis_run.base_run_id} of this partial audit did not complete: run a full audit."
+                        )
+                    carry_forward_issues(analysis_run)
+                ingest_issues(analysis_run, validate_issues(iter_ndjson(stream)))
+                # Résumé (et score) calculés par la base, dans la même transaction.
+                refresh_run_summary(analysis_run)
+                analysis_run.status = AnalysisRun.StatusChoices.COMPLETED
+                analysis_run.completed_at = timezone.now()
+                analysis_run.save(update_fields=['status', 'completed_at'])
+    except Exception as exc:
+        # Rapport invalide (APIException) ou erreur inattendue : les issues éventuellement insérées ont été annulées avec la transaction.
+        # On garde le rapport brut pour pouvoir analyser l'échec.
+        analysis_run.status = AnalysisRun.StatusChoices.FAILED
+        detail = getattr(exc, 'detail', None)
+        analysis_run.error_message = json.dumps(detail) if detail is not None else str(exc)
+        analysis_run.completed_at = timezone.now()
+        analysis_run.save(update_fields=['status', 'error_message', 'completed_at'])
+        return analysis_run
+
+    # Le rapport brut n'est plus utile une fois les issues en base.
+    analysis_run.payload.delete(save=False)
+    analysis_run.save(update_fields=['payload'])
+    return analysis_run
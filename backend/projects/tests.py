@@ -1,3 +1,794 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import tempfile
+import uuid
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from .api_keys import get_project_for_api_key
+from .catalogue import load_issue_types
+from .export import EXPORT_FIELDS, iter_issue_rows
+from .fingerprints import issue_fingerprint
+from .ingestion import ingest_issues
+from .models import Project, AnalysisRun, IssueType, SubmissionBatch
+from .serializers import validate_issues
+from .summary import refresh_run_summary
+from .tasks import claim_next_run, expire_open_submissions, process_analysis_run
+
+
+class ProjectListQueryCountTests(TestCase):
+    """
+    La liste des projets doit coûter un nombre constant de requêtes,
+    quel que soit le nombre de projets et d'analyses.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create_projects(self, projects_count, runs_per_project):
+        for i in range(projects_count):
+            project = Project.objects.create(name=f'project-{i}', owner=self.user)
+            AnalysisRun.objects.bulk_create(
+                AnalysisRun(project=project, effort_score=float(n)) for n in range(runs_per_project)
+            )
+
+    def test_list_uses_constant_number_of_queries(self):
+        self._create_projects(2, 2)
+        with self.assertNumQueries(1):
+            self.client.get('/api/projects/')
+
+        self._create_projects(10, 20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/projects/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 12)
+
+    def test_list_exposes_latest_run_and_delta(self):
+        project = Project.objects.create(name='project', owner=self.user)
+        first = AnalysisRun.objects.create(project=project, effort_score=10.0)
+        latest = AnalysisRun.objects.create(project=project, effort_score=4.0)
+        AnalysisRun.objects.filter(pk=first.pk).update(created_at=latest.created_at.replace(year=2000))
+
+        data = self.client.get('/api/projects/').data[0]
+
+        self.assertEqual(data['runs_count'], 2)
+        self.assertEqual(data['latest_run'], {'id': latest.id, 'status': 'PENDING', 'effort_score': 4.0})
+        self.assertEqual(data['effort_score_delta'], -6.0)
+
+
+class ClaimNextRunTests(TestCase):
+    """
+    Une analyse abandonnée par un worker arrêté doit être reprise par un autre.
+    """
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='project', owner=user)
+
+    def _create_run(self, status, started_at=None):
+        run = AnalysisRun.objects.create(project=self.project, status=status, started_at=started_at)
+        # Seul le nom du fichier compte pour la réservation.
+        AnalysisRun.objects.filter(pk=run.pk).update(payload='analysis_payloads/run.ndjson.gz')
+        return run
+
+    def test_stale_running_run_is_reclaimed(self):
+        stale = self._create_run(AnalysisRun.StatusChoices.RUNNING, timezone.now() - timedelta(days=1))
+
+        claimed = claim_next_run()
+
+        self.assertEqual(claimed.id, stale.id)
+        self.assertEqual(claimed.status, AnalysisRun.StatusChoices.RUNNING)
+        self.assertGreater(claimed.started_at, timezone.now() - timedelta(minutes=1))
+
+    def test_running_run_and_open_submission_are_left_alone(self):
+        self._create_run(AnalysisRun.StatusChoices.RUNNING, timezone.now())
+        AnalysisRun.objects.create(
+            project=self.project, status=AnalysisRun.StatusChoices.RUNNING,
+            started_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertIsNone(claim_next_run())
+
+
+class AnalysisRunConditionalTests(TestCase):
+    """
+    Une analyse qui avance ne doit jamais être servie en 304 sur la foi de sa date.
+    """
+
+    def setUp(self):
+        # Les ids des analyses sont réutilisés d'un test à l'autre : pas de représentation en cache d'un test précédent.
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='project', owner=self.user)
+
+    def test_unfinished_run_has_no_last_modified(self):
+        run = AnalysisRun.objects.create(project=self.project)
+        url = f'/api/analyses/{run.id}/'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        AnalysisRun.objects.filter(pk=run.pk).update(status=AnalysisRun.StatusChoices.RUNNING)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'RUNNING')
+
+    def test_finished_run_is_not_modified(self):
+        run = AnalysisRun.objects.create(
+            project=self.project, status=AnalysisRun.StatusChoices.COMPLETED, completed_at=timezone.now()
+        )
+        url = f'/api/analyses/{run.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_latest_analysis_follows_new_runs_without_invalidation(self):
+        url = f'/api/projects/{self.project.id}/latest-analysis/'
+        first = AnalysisRun.objects.create(
+            project=self.project, status=AnalysisRun.StatusChoices.COMPLETED, completed_at=timezone.now()
+        )
+        self.assertEqual(self.client.get(url).data['id'], first.id)
+
+        # Une analyse créée ailleurs (autre processus, autre cache local) est vue tout de suite.
+        second = AnalysisRun.objects.create(project=self.project)
+        self.assertEqual(self.client.get(url).data['id'], second.id)
+
+        AnalysisRun.objects.filter(pk=second.pk).update(
+            status=AnalysisRun.StatusChoices.COMPLETED, completed_at=timezone.now()
+        )
+        self.assertEqual(self.client.get(url).data['status'], 'COMPLETED')
+        # Analyse terminée en cache : projet, propriétaire et dernière analyse, sans sérialisation.
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url).data['id'], second.id)
+
+
+class SubmissionLifecycleTests(TestCase):
+    """
+    Ouverture idempotente et expiration des soumissions en plusieurs requêtes.
+    """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='project', owner=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Api-Key {self.project.api_key}')
+
+    def test_retried_create_reuses_the_open_submission(self):
+        first = self.client.post('/api/submissions/', format='json', HTTP_IDEMPOTENCY_KEY='digest')
+        retried = self.client.post('/api/submissions/', format='json', HTTP_IDEMPOTENCY_KEY='digest')
+        other = self.client.post('/api/submissions/', format='json', HTTP_IDEMPOTENCY_KEY='other')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retried.status_code, 200)
+        self.assertEqual(retried.data['id'], first.data['id'])
+        self.assertNotEqual(other.data['id'], first.data['id'])
+
+    def test_stale_open_submission_expires(self):
+        run_id = self.client.post('/api/submissions/', format='json').data['id']
+        self.client.put(
+            f'/api/submissions/{run_id}/batches/1/', data=b'{}\n', content_type='application/x-ndjson'
+        )
+        self.assertEqual(expire_open_submissions(), 0)
+
+        AnalysisRun.objects.filter(pk=run_id).update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(expire_open_submissions(), 1)
+
+        analysis_run = AnalysisRun.objects.get(pk=run_id)
+        self.assertEqual(analysis_run.status, AnalysisRun.StatusChoices.FAILED)
+        self.assertFalse(SubmissionBatch.objects.filter(analysis_run=analysis_run).exists())
+        response = self.client.post(f'/api/submissions/{run_id}/finalize/', {'batches': 1}, format='json')
+        self.assertEqual(response.data['status'], 'FAILED')
+        # L'agent qui reprend cet envoi doit le recommencer : rien n'a été reçu.
+        state = self.client.get(f'/api/submissions/{run_id}/').data
+        self.assertEqual((state['status'], state['finalized']), ('FAILED', False))
+
+
+
+class PartialAuditTests(TestCase):
+    """
+    Protocole de soumission en plusieurs requêtes et audits partiels : les issues
+    des fichiers non ré-analysés sont reprises de l'analyse de base.
+    """
+    BASE_COMMIT = '1' * 40
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='project', owner=self.user)
+        self.agent = APIClient()
+        self.agent.credentials(HTTP_AUTHORIZATION=f'Api-Key {self.project.api_key}')
+
+    def _issue(self, file_path, issue_code, severity, line_number=1):
+        return {
+            'issue_code': issue_code, 'severity': severity, 'module_name': file_path.split('/')[0],
+            'file_path': file_path, 'line_number': line_number, 'description': f'{issue_code} description',
+            'code_snippet': f'line {line_number}',
+        }
+
+    def _open(self, **opening):
+        return self.agent.post('/api/submissions/', opening, format='json')
+
+    def _put_batch(self, run_id, number, issues):
+        body = ''.join(json.dumps(issue) + '\n' for issue in issues)
+        return self.agent.put(
+            f'/api/submissions/{run_id}/batches/{number}/', data=body.encode('utf-8'),
+            content_type='application/x-ndjson',
+        )
+
+    def _finalize(self, run_id, batches):
+        return self.agent.post(f'/api/submissions/{run_id}/finalize/', {'batches': batches}, format='json')
+
+    def _submit(self, issues, **opening):
+        response = self._open(**opening)
+        self.assertEqual(response.status_code, 201, response.data)
+        run_id = response.data['id']
+        if issues:
+            self._put_batch(run_id, 1, issues)
+        self.assertEqual(self._finalize(run_id, 1 if issues else 0).status_code, 202)
+        return run_id
+
+    def _process_all(self):
+        analysis_run = claim_next_run()
+        while analysis_run is not None:
+            process_analysis_run(analysis_run)
+            analysis_run = claim_next_run()
+
+    def _submit_full_run(self):
+        run_id = self._submit([
+            self._issue('mod_a/a.py', 'PY002', 'CRITICAL', 1),
+            self._issue('mod_a/a.py', 'PY002', 'CRITICAL', 2),
+            self._issue('mod_b/b.xml', 'XML001', 'MINOR'),
+            self._issue('mod_c/c.py', 'PY010', 'MAJOR'),
+        ], git_commit=self.BASE_COMMIT)
+        self._process_all()
+        return run_id
+
+    def test_submission_protocol(self):
+        run_id = self._open().data['id']
+        self._put_batch(run_id, 2, [self._issue('mod_a/a.py', 'PY002', 'CRITICAL')])
+
+        state = self.agent.get(f'/api/submissions/{run_id}/').data
+        self.assertEqual((state['status'], state['received_batches'], state['finalized']), ('RUNNING', [2], False))
+        response = self._finalize(run_id, 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing batches: 1.', str(response.data))
+
+        self._put_batch(run_id, 1, [self._issue('mod_b/b.xml', 'XML001', 'MINOR')])
+        self.assertEqual(self._finalize(run_id, 2).data['status'], 'PENDING')
+        # Une finalisation répétée renvoie l'état courant ; un lot de plus est refusé.
+        self.assertEqual(self._finalize(run_id, 2).status_code, 202)
+        self.assertEqual(self._put_batch(run_id, 3, []).status_code, 409)
+        self.assertTrue(self.agent.get(f'/api/submissions/{run_id}/').data['finalized'])
+
+        self._process_all()
+        analysis_run = AnalysisRun.objects.get(pk=run_id)
+        self.assertEqual(analysis_run.status, AnalysisRun.StatusChoices.COMPLETED)
+        self.assertEqual(analysis_run.issues.count(), 2)
+
+    def test_partial_audit_carries_unchanged_files_forward(self):
+        full_id = self._submit_full_run()
+
+        # b.xml est ré-analysé, c.py a été supprimé, a.py n'a pas changé.
+        partial_id = self._submit(
+            [self._issue('mod_b/b.xml', 'PY002', 'CRITICAL')],
+            changed_files=['mod_b/b.xml', 'mod_c/c.py'], base_commit=self.BASE_COMMIT,
+        )
+        self._process_all()
+
+        partial = AnalysisRun.objects.get(pk=partial_id)
+        self.assertEqual(partial.status, AnalysisRun.StatusChoices.COMPLETED, partial.error_message)
+        self.assertEqual(partial.base_run_id, full_id)
+        self.assertEqual(
+            sorted(partial.issues.values_list('file_path', 'issue_type', 'line_number')),
+            [('mod_a/a.py', 'PY002', 1), ('mod_a/a.py', 'PY002', 2), ('mod_b/b.xml', 'PY002', 1)],
+        )
+        self.assertEqual(partial.summary['issues_count'], 3)
+        self.assertEqual(partial.summary['effort_score'], 24.0)
+        self.assertEqual(partial.summary['by_issue_code'], {'PY002': 3})
+        self.assertEqual(set(partial.summary['by_module']), {'mod_a', 'mod_b'})
+
+        # Les empreintes des issues reprises sont celles de la base : elles persistent.
+        owner = APIClient()
+        owner.force_authenticate(self.user)
+        response = owner.get(f'/api/analyses/{full_id}/diff/{partial_id}/')
+        self.assertEqual(response.data['counts'], {'new': 1, 'fixed': 2, 'persisting': 2})
+        fixed = owner.get(f'/api/analyses/{full_id}/diff/{partial_id}/', {'set': 'fixed'}).data['results']
+        self.assertEqual(sorted(issue['file_path'] for issue in fixed), ['mod_b/b.xml', 'mod_c/c.py'])
+
+    def test_chained_partial_audits_with_explicit_base_run(self):
+        self._submit_full_run()
+        first_id = self._submit(
+            [self._issue('mod_b/b.xml', 'PY002', 'CRITICAL')],
+            changed_files=['mod_b/b.xml'], base_commit=self.BASE_COMMIT,
+        )
+        # Le second envoi part du premier, avant même que le worker l'ait traité.
+        second_id = self._submit([], changed_files=['mod_a/a.py'], base_run=first_id)
+        self._process_all()
+
+        second = AnalysisRun.objects.get(pk=second_id)
+        self.assertEqual(second.status, AnalysisRun.StatusChoices.COMPLETED, second.error_message)
+        self.assertEqual(
+            sorted(second.issues.values_list('file_path', 'issue_type')),
+            [('mod_b/b.xml', 'PY002'), ('mod_c/c.py', 'PY010')],
+        )
+        self.assertEqual(second.summary['effort_score'], 10.0)
+
+    def test_partial_audit_without_base_is_refused(self):
+        self.assertEqual(self._open(changed_files=['mod_a/a.py']).status_code, 400)
+        response = self._open(changed_files=['mod_a/a.py'], base_commit=self.BASE_COMMIT)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('base_commit', response.data)
+
+        failed = AnalysisRun.objects.create(
+            project=self.project, status=AnalysisRun.StatusChoices.FAILED, git_commit=self.BASE_COMMIT
+        )
+        self.assertEqual(self._open(changed_files=['mod_a/a.py'], base_commit=self.BASE_COMMIT).status_code, 400)
+        self.assertEqual(self._open(changed_files=['mod_a/a.py'], base_run=failed.id).status_code, 400)
+        self.assertEqual(self._open(changed_files='mod_a/a.py', base_run=failed.id).status_code, 400)
+        self.assertEqual(self._open(git_commit='HEAD').status_code, 400)
+
+    def test_partial_audit_fails_when_its_base_failed(self):
+        self._submit_full_run()
+        first_id = self._submit(
+            [self._issue('mod_b/b.xml', 'PY002', 'CRITICAL')],
+            changed_files=['mod_b/b.xml'], base_commit=self.BASE_COMMIT,
+        )
+        second_id = self._submit([], changed_files=['mod_a/a.py'], base_run=first_id)
+        AnalysisRun.objects.filter(pk=first_id).update(status=AnalysisRun.StatusChoices.FAILED)
+
+        self._process_all()
+
+        second = AnalysisRun.objects.get(pk=second_id)
+        self.assertEqual(second.status, AnalysisRun.StatusChoices.FAILED)
+        self.assertIn(f'#{first_id}', second.error_message)
+        self.assertFalse(second.issues.exists())
+
+
+class IssueCatalogueTests(TestCase):
+    """
+    Une description identique à celle du catalogue n'est pas stockée sur l'issue,
+    et un rechargement du catalogue ne change pas le texte des analyses passées.
+    """
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.analysis_run = AnalysisRun.objects.create(project=Project.objects.create(name='project', owner=user))
+
+    def _issue(self, description):
+        return {
+            'issue_code': 'PY002', 'severity': 'CRITICAL', 'module_name': 'mod_a', 'file_path': 'mod_a/a.py',
+            'line_number': 1, 'description': description, 'code_snippet': 'cr.execute(query)',
+        }
+
+    def test_only_differing_descriptions_are_stored(self):
+        ingest_issues(self.analysis_run, validate_issues([self._issue('Raw SQL'), self._issue('Raw SQL in a loop')]))
+
+        issues = list(self.analysis_run.issues.order_by('id'))
+        self.assertEqual([issue.description_override for issue in issues], [None, 'Raw SQL in a loop'])
+        self.assertEqual([issue.description for issue in issues], ['Raw SQL', 'Raw SQL in a loop'])
+
+    def test_catalogue_reload_keeps_past_descriptions(self):
+        ingest_issues(self.analysis_run, validate_issues([self._issue('Raw SQL')]))
+
+        load_issue_types([{'issue_code': 'PY002', 'severity': 'CRITICAL', 'description': 'Use the ORM', 'version': 2}])
+
+        self.assertEqual(IssueType.objects.get(code='PY002').description, 'Use the ORM')
+        self.assertEqual(self.analysis_run.issues.get().description, 'Raw SQL')
+        rows = list(iter_issue_rows(self.analysis_run.issues.all()))
+        self.assertEqual(rows[0][EXPORT_FIELDS.index('description')], 'Raw SQL')
+
+
+def issue_data(file_path, issue_code, severity, line_number=1, **extra):
+    """Une issue brute, telle que l'agent l'envoie."""
+    return {
+        'issue_code': issue_code, 'severity': severity, 'module_name': file_path.split('/')[0],
+        'file_path': file_path, 'line_number': line_number, 'description': f'{issue_code} found',
+        'code_snippet': f'{issue_code} at {file_path}:{line_number}', **extra,
+    }
+
+
+class IssueListingTests(TestCase):
+    """
+    Liste paginée (curseur) et filtrable des issues d'une analyse ; le détail
+    d'une analyse ne contient que des compteurs, quel que soit son nombre d'issues.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='project', owner=self.user)
+        self.analysis_run = self._run([
+            issue_data('sale_ext/models/sale.py', 'PY002', 'CRITICAL', 1),
+            issue_data('sale_ext/models/sale.py', 'PY001', 'MAJOR', 2),
+            issue_data('sale_ext/views/sale.xml', 'XML001', 'MINOR', 3),
+            issue_data('stock_ext/models/stock.py', 'PY002', 'CRITICAL', 4),
+            issue_data('stock_ext/models/stock.py', 'PY010', 'INFO', 5),
+        ])
+
+    def _run(self, issues):
+        analysis_run = AnalysisRun.objects.create(project=self.project)
+        ingest_issues(analysis_run, validate_issues(issues))
+        refresh_run_summary(analysis_run)
+        return analysis_run
+
+    def _lines(self, analysis_run=None, **params):
+        analysis_run = analysis_run or self.analysis_run
+        response = self.client.get(f'/api/analyses/{analysis_run.id}/issues/', params)
+        self.assertEqual(response.status_code, 200)
+        return [issue['line_number'] for issue in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self._lines(), [1, 2, 3, 4, 5])
+        self.assertEqual(self._lines(severity='CRITICAL,INFO'), [1, 4, 5])
+        self.assertEqual(self._lines(issue_code='PY002'), [1, 4])
+        self.assertEqual(self._lines(module_name='stock_ext'), [4, 5])
+        self.assertEqual(self._lines(file_path='sale_ext/models/'), [1, 2])
+        self.assertEqual(self._lines(severity='CRITICAL', module_name='sale_ext'), [1])
+        self.assertEqual(self._lines(module_name='sale'), [])
+
+    def test_issue_payload(self):
+        response = self.client.get(f'/api/analyses/{self.analysis_run.id}/issues/', {'issue_code': 'XML001'})
+        issue = response.data['results'][0]
+        self.assertEqual(
+            {key: issue[key] for key in ('issue_code', 'severity', 'file_path', 'description', 'code_snippet')},
+            {'issue_code': 'XML001', 'severity': 'MINOR', 'file_path': 'sale_ext/views/sale.xml',
+             'description': 'XML001 found', 'code_snippet': 'XML001 at sale_ext/views/sale.xml:3'},
+        )
+
+    def test_cursor_pagination_walks_every_issue_once(self):
+        analysis_run = self._run([issue_data('mod/a.py', 'PY002', 'CRITICAL', n) for n in range(1, 24)])
+        url, lines, pages = f'/api/analyses/{analysis_run.id}/issues/?page_size=5', [], 0
+        while url:
+            data = self.client.get(url).data
+            self.assertNotIn('count', data)
+            lines += [issue['line_number'] for issue in data['results']]
+            url, pages = data['next'], pages + 1
+        self.assertEqual(lines, list(range(1, 24)))
+        self.assertEqual(pages, 5)
+
+        data = self.client.get(f'/api/analyses/{analysis_run.id}/issues/', {'page_size': 5000}).data
+        self.assertEqual(len(data['results']), 23)
+
+    def test_page_cost_does_not_depend_on_run_size(self):
+        large_run = self._run([issue_data(f'mod/f{n % 7}.py', 'PY002', 'CRITICAL', n) for n in range(1, 301)])
+        # Analyse, projet et propriétaire (permission), puis la page des issues avec leur type et leur extrait.
+        for analysis_run in (self.analysis_run, large_run):
+            with self.assertNumQueries(4):
+                self.client.get(f'/api/analyses/{analysis_run.id}/issues/', {'page_size': 50})
+            with self.assertNumQueries(4):
+                self.client.get(f'/api/analyses/{analysis_run.id}/issues/', {'page_size': 50, 'severity': 'CRITICAL'})
+
+    def test_detail_returns_counts_only(self):
+        response = self.client.get(f'/api/analyses/{self.analysis_run.id}/')
+        self.assertNotIn('issues', response.data)
+        self.assertEqual(response.data['issues_count'], 5)
+        self.assertEqual(response.data['severity_counts'], {'CRITICAL': 2, 'MAJOR': 1, 'MINOR': 1, 'INFO': 1})
+
+        # Les compteurs viennent du résumé matérialisé : ni issue chargée, ni COUNT.
+        large_run = self._run([issue_data('mod/a.py', 'PY002', 'CRITICAL', n) for n in range(1, 301)])
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/analyses/{large_run.id}/')
+        self.assertEqual(response.data['issues_count'], 300)
+
+
+class RunSummaryTests(TestCase):
+    """
+    Résumé d'une analyse agrégé par la base : compteurs par sévérité, par code et
+    par module, effort par module et par étape, score total.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='project', owner=self.user)
+
+    def _run(self, issues):
+        analysis_run = AnalysisRun.objects.create(project=self.project)
+        ingest_issues(analysis_run, validate_issues(issues))
+        return analysis_run
+
+    def test_aggregates(self):
+        analysis_run = self._run([
+            issue_data('mod_a/a.py', 'PY002', 'CRITICAL', 1, migration_hop='15.0-16.0'),
+            issue_data('mod_a/a.py', 'PY002', 'CRITICAL', 2, migration_hop='15.0-16.0'),
+            issue_data('mod_a/a.py', 'PY001', 'MAJOR', 3, migration_hop='16.0-17.0'),
+            issue_data('mod_b/b.xml', 'XML001', 'MINOR', 4, migration_hop='16.0-17.0'),
+            issue_data('mod_b/b.py', 'PY010', 'INFO', 5),
+        ])
+        summary = refresh_run_summary(analysis_run)
+
+        # PY002 et XML001 ont un coût propre ; les autres, celui de leur sévérité.
+        self.assertAlmostEqual(summary.pop('effort_score'), 8.0 + 8.0 + 2.0 + 0.1 + 0.1)
+        for rows in (summary['by_module'], summary['by_migration_hop']):
+            for row in rows.values():
+                row['effort_score'] = round(row['effort_score'], 6)
+        self.assertEqual(summary, {
+            'issues_count': 5,
+            'by_severity': {'CRITICAL': 2, 'MAJOR': 1, 'MINOR': 1, 'INFO': 1},
+            'by_issue_code': {'PY002': 2, 'PY001': 1, 'XML001': 1, 'PY010': 1},
+            'by_module': {
+                'mod_a': {'issues_count': 3, 'effort_score': 18.0},
+                'mod_b': {'issues_count': 2, 'effort_score': 0.2},
+            },
+            'by_migration_hop': {
+                '15.0-16.0': {'issues_count': 2, 'effort_score': 16.0},
+                '16.0-17.0': {'issues_count': 2, 'effort_score': 2.1},
+                '': {'issues_count': 1, 'effort_score': 0.1},
+            },
+        })
+        analysis_run.refresh_from_db()
+        self.assertAlmostEqual(analysis_run.effort_score, 18.2)
+        self.assertEqual(analysis_run.summary['issues_count'], 5)
+
+    def test_empty_run(self):
+        summary = refresh_run_summary(self._run([]))
+        self.assertEqual((summary['issues_count'], summary['effort_score']), (0, 0.0))
+        self.assertEqual(summary['by_severity'], {'CRITICAL': 0, 'MAJOR': 0, 'MINOR': 0, 'INFO': 0})
+        self.assertEqual(summary['by_module'], {})
+
+    def test_query_count_does_not_depend_on_issue_count(self):
+        # Totaux, par code, par module et par étape, puis l'enregistrement du résumé.
+        for count in (3, 300):
+            analysis_run = self._run([issue_data(f'mod_{n % 5}/a.py', 'PY002', 'CRITICAL', n) for n in range(count)])
+            with self.assertNumQueries(5):
+                summary = refresh_run_summary(analysis_run)
+            self.assertEqual(summary['issues_count'], count)
+
+    def test_summary_endpoint(self):
+        analysis_run = self._run([issue_data('mod_a/a.py', 'PY002', 'CRITICAL', n) for n in range(200)])
+        refresh_run_summary(analysis_run)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        # Analyse, projet et propriétaire : le résumé est lu tel quel, sans toucher aux issues.
+        with self.assertNumQueries(3):
+            response = client.get(f'/api/analyses/{analysis_run.id}/summary/')
+        self.assertEqual(response.data['summary']['by_module'], {'mod_a': {'issues_count': 200, 'effort_score': 1600.0}})
+        self.assertEqual(response.data['effort_score'], 1600.0)
+
+
+class ApiKeyCacheTests(TestCase):
+    """
+    Les clés d'API des agents sont résolues par le cache : une clé valide ou
+    inconnue ne coûte une requête qu'à sa première utilisation, et une clé
+    remplacée ou supprimée est refusée immédiatement.
+    """
+
+    def setUp(self):
+        caches[settings.API_KEY_CACHE_ALIAS].clear()
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='project', owner=self.user)
+        self.run = AnalysisRun.objects.create(project=self.project, status=AnalysisRun.StatusChoices.RUNNING)
+
+    def _agent_get(self, api_key):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Api-Key {api_key}')
+        return client.get(f'/api/submissions/{self.run.id}/')
+
+    def test_valid_key_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_project_for_api_key(str(self.project.api_key)), self.project)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_project_for_api_key(str(self.project.api_key)), self.project)
+
+        # Requête d'un agent : la clé n'est plus relue, seules l'analyse et ses lots le sont.
+        with self.assertNumQueries(2):
+            self.assertEqual(self._agent_get(self.project.api_key).status_code, 200)
+
+    def test_unknown_key_is_cached_briefly(self):
+        unknown = str(uuid.uuid4())
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_project_for_api_key(unknown))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_project_for_api_key(unknown))
+            self.assertEqual(self._agent_get(unknown).status_code, 401)
+
+        with override_settings(API_KEY_NEGATIVE_CACHE_TIMEOUT=0):
+            other = str(uuid.uuid4())
+            get_project_for_api_key(other)
+            with self.assertNumQueries(1):
+                self.assertIsNone(get_project_for_api_key(other))
+
+    def test_malformed_key_never_reaches_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_project_for_api_key('not-a-key'))
+            self.assertEqual(self._agent_get('not-a-key').status_code, 401)
+
+    def test_rotated_key_is_refused_immediately(self):
+        old_key = self.project.api_key
+        self.assertEqual(self._agent_get(old_key).status_code, 200)
+
+        owner = APIClient()
+        owner.force_authenticate(self.user)
+        new_key = owner.post(f'/api/projects/{self.project.id}/regenerate-api-key/').data['api_key']
+
+        self.assertEqual(self._agent_get(old_key).status_code, 401)
+        self.assertEqual(self._agent_get(new_key).status_code, 200)
+
+    def test_deleted_project_key_is_refused_immediately(self):
+        api_key = self.project.api_key
+        self.assertEqual(get_project_for_api_key(api_key), self.project)
+
+        owner = APIClient()
+        owner.force_authenticate(self.user)
+        self.assertEqual(owner.delete(f'/api/projects/{self.project.id}/').status_code, 204)
+        self.assertIsNone(get_project_for_api_key(api_key))
+
+
+class RunDiffTests(TestCase):
+    """
+    Issues nouvelles, corrigées et persistantes entre deux analyses, d'après les
+    empreintes : une issue déplacée ou ré-indentée est la même issue.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='project', owner=self.user)
+
+    def _run(self, issues, status=AnalysisRun.StatusChoices.COMPLETED):
+        analysis_run = AnalysisRun.objects.create(project=self.project, status=status)
+        ingest_issues(analysis_run, validate_issues(issues))
+        return analysis_run
+
+    def _diff(self, base_run, target_run, **params):
+        return self.client.get(f'/api/analyses/{base_run.id}/diff/{target_run.id}/', params)
+
+    def test_fingerprint_ignores_line_and_whitespace(self):
+        fingerprint = issue_fingerprint('PY002', 'mod/a.py', 'self.env.cr.execute(query)')
+        self.assertEqual(issue_fingerprint('PY002', 'mod/a.py', '  self.env.cr.execute(query)\n'), fingerprint)
+        self.assertNotEqual(issue_fingerprint('PY002', 'mod/b.py', 'self.env.cr.execute(query)'), fingerprint)
+        self.assertNotEqual(issue_fingerprint('PY001', 'mod/a.py', 'self.env.cr.execute(query)'), fingerprint)
+        self.assertNotEqual(issue_fingerprint('PY002', 'mod/a.py', 'self.env.cr.execute(query)', 1), fingerprint)
+
+    def test_diff(self):
+        sql = {'code_snippet': 'self.env.cr.execute(query)'}
+        base_run = self._run([
+            issue_data('mod/a.py', 'PY002', 'CRITICAL', 10, **sql),
+            issue_data('mod/a.py', 'PY002', 'CRITICAL', 30, **sql),
+            issue_data('mod/b.xml', 'XML001', 'MINOR', 5),
+            issue_data('mod/c.py', 'PY001', 'MAJOR', 1),
+        ])
+        target_run = self._run([
+            # Déplacée et ré-indentée : persistante. La seconde occurrence a disparu.
+            issue_data('mod/a.py', 'PY002', 'CRITICAL', 42, code_snippet='  self.env.cr.execute(query)  '),
+            issue_data('mod/c.py', 'PY001', 'MAJOR', 1),
+            issue_data('mod/d.py', 'PY002', 'CRITICAL', 7),
+        ])
+
+        # Analyses, projet et propriétaire, puis une agrégation par analyse.
+        with self.assertNumQueries(6):
+            response = self._diff(base_run, target_run)
+        self.assertEqual(response.data, {
+            'base': base_run.id, 'target': target_run.id, 'counts': {'new': 1, 'fixed': 2, 'persisting': 2},
+        })
+
+        def lines(selected):
+            results = self._diff(base_run, target_run, set=selected).data['results']
+            return [(issue['file_path'], issue['line_number']) for issue in results]
+
+        self.assertEqual(lines('new'), [('mod/d.py', 7)])
+        self.assertEqual(lines('fixed'), [('mod/a.py', 30), ('mod/b.xml', 5)])
+        self.assertEqual(lines('persisting'), [('mod/a.py', 42), ('mod/c.py', 1)])
+
+        # Dans l'autre sens, les nouvelles et les corrigées s'échangent.
+        self.assertEqual(self._diff(target_run, base_run).data['counts'], {'new': 2, 'fixed': 1, 'persisting': 2})
+
+    def test_query_count_does_not_depend_on_run_size(self):
+        for count in (5, 400):
+            base_run = self._run([issue_data(f'mod/f{n}.py', 'PY002', 'CRITICAL', n) for n in range(count)])
+            target_run = self._run([issue_data(f'mod/f{n}.py', 'PY002', 'CRITICAL', n) for n in range(1, count + 1)])
+            with self.assertNumQueries(6):
+                counts = self._diff(base_run, target_run).data['counts']
+            self.assertEqual(counts, {'new': 1, 'fixed': 1, 'persisting': count - 1})
+
+    def test_runs_must_be_completed(self):
+        base_run = self._run([issue_data('mod/a.py', 'PY002', 'CRITICAL')])
+        pending = self._run([], status=AnalysisRun.StatusChoices.PENDING)
+        self.assertEqual(self._diff(base_run, pending).status_code, 400)
+        self.assertEqual(self._diff(base_run, base_run, set='gone').status_code, 400)
+
+
+class StreamingExportTests(TestCase):
+    """
+    Export complet des issues d'une analyse (NDJSON ou CSV), en streaming et
+    compressé si le client l'accepte ; le nombre de requêtes ne dépend pas de la taille.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.project = Project.objects.create(name='project', owner=self.user)
+        self.analysis_run = self._run([
+            issue_data('sale_ext/models/sale.py', 'PY002', 'CRITICAL', 1),
+            issue_data('sale_ext/views/sale.xml', 'XML001', 'MINOR', 2, code_snippet='<field name="a, b"/>'),
+            issue_data('stock_ext/models/stock.py', 'PY001', 'MAJOR', 3, description='Dépréciée'),
+        ])
+
+    def _run(self, issues):
+        analysis_run = AnalysisRun.objects.create(project=self.project)
+        ingest_issues(analysis_run, validate_issues(issues))
+        return analysis_run
+
+    def _export(self, export_format='ndjson', headers=None, **params):
+        response = self.client.get(
+            f'/api/analyses/{self.analysis_run.id}/export/', {'format': export_format, **params}, headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def test_ndjson(self):
+        response = self._export()
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        self.assertEqual(
+            response['Content-Disposition'], f'attachment; filename="analysis-{self.analysis_run.id}.ndjson"',
+        )
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([list(row) for row in rows], [EXPORT_FIELDS] * 3)
+        self.assertEqual([row['line_number'] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0]['fingerprint'], issue_fingerprint('PY002', 'sale_ext/models/sale.py',
+                                                                  'PY002 at sale_ext/models/sale.py:1'))
+        self.assertEqual(rows[2]['description'], 'Dépréciée')
+
+    def test_csv(self):
+        response = self._export('csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], EXPORT_FIELDS)
+        self.assertEqual(len(rows), 4)
+        code_snippet = EXPORT_FIELDS.index('code_snippet')
+        self.assertEqual(rows[2][code_snippet], '<field name="a, b"/>')
+
+    def test_filters(self):
+        def lines(**params):
+            content = b''.join(self._export(**params).streaming_content).decode()
+            return [json.loads(line)['line_number'] for line in content.splitlines()]
+
+        self.assertEqual(lines(severity='CRITICAL,MAJOR'), [1, 3])
+        self.assertEqual(lines(module_name='sale_ext', issue_code='XML001'), [2])
+        self.assertEqual(lines(file_path='stock_ext/'), [3])
+
+    def test_gzip(self):
+        plain = b''.join(self._export('csv').streaming_content)
+        response = self._export('csv', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+        self.assertFalse(self._export('csv').has_header('Content-Encoding'))
+
+    def test_query_count_does_not_depend_on_run_size(self):
+        for count in (10, 3000):
+            analysis_run = self._run([issue_data('mod/a.py', 'PY002', 'CRITICAL', n) for n in range(count)])
+            # Un seul SELECT (jointures comprises) par lot de `chunk_size` lignes.
+            with self.assertNumQueries(1):
+                rows = list(iter_issue_rows(analysis_run.issues.all(), chunk_size=5000))
+            self.assertEqual(len(rows), count)
@@ -1,13 +1,15 @@
 # projects/urls.py
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ProjectViewSet, AnalysisRunViewSet, AnalysisRunCreateView
+from .views import ProjectViewSet, AnalysisRunViewSet, AnalysisRunCreateView, SubmissionViewSet
 
 router = DefaultRouter()
 # On enregistre notre ViewSet auprès du routeur.
 # 'projects' sera la base de l'URL (ex: /api/projects/)
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'analyses', AnalysisRunViewSet, basename='analysis')
+# Soumission d'une analyse en plusieurs requêtes (ouverture, lots numérotés, finalisation).
+router.register(r'submissions', SubmissionViewSet, basename='submission')
 urlpatterns = router.urls
 
 urlpatterns = router.urls + [
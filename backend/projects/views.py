@@ -1,21 +1,34 @@
-from django.shortcuts import render
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+import re
 import uuid
-from rest_framework import viewsets, generics
+from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated 
-from rest_framework.exceptions import PermissionDenied
-from .models import Project, AnalysisRun
-from .serializers import ProjectSerializer, AnalysisRunDetailSerializer,  AnalysisRunCreateSerializer
+from rest_framework.exceptions import APIException, PermissionDenied, ParseError, ValidationError
+from rest_framework.parsers import JSONParser
+from .models import Project, AnalysisRun, Issue
+from .serializers import ProjectSerializer, AnalysisRunDetailSerializer,  AnalysisRunCreateSerializer, IssueSerializer, AnalysisRunSummarySerializer, AnalysisRunListSerializer
+from .api_keys import invalidate_api_key
+from .diff import DIFF_SETS, diff_counts, diff_issue_sets
+from .http_cache import cached_run_data, conditional_run_response
+from .export import gzip_stream, iter_csv, iter_issue_rows, iter_ndjson
+from .pagination import AnalysisRunCursorPagination, IssueCursorPagination
+from .parsers import NDJSONParser
+from .renderers import CSVRenderer, NDJSONRenderer
 from .permissions import IsProjectOwner, IsAnalysisOwner, HasValidAPIKey
-from .scoring import calculate_effort_score
+from .tasks import (
+    assemble_batches, missing_batches, spool_ndjson_stream, spool_issues, store_batch, store_payload,
+)
 
 class ProjectViewSet(viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated, IsProjectOwner]
 
     def get_queryset(self):
-        return Project.objects.filter(owner=self.request.user)
+        return Project.objects.filter(owner=self.request.user).with_run_stats()
 
     def perform_create(self, serializer):
             """
@@ -24,6 +37,24 @@ class ProjectViewSet(viewsets.ModelViewSet):
             # request.user est l'utilisateur authentifié grâce au token.
             serializer.save(owner=self.request.user)
 
+    def perform_destroy(self, instance):
+        # La clé d'un projet supprimé ne doit plus être acceptée, même en cache.
+        api_key = instance.api_key
+        instance.delete()
+        invalidate_api_key(api_key)
+
+    @action(detail=True, methods=['get'], url_path='runs')
+    def runs(self, request, pk=None):
+        """
+        Historique paginé (curseur) des analyses d'un projet, de la plus récente à la plus ancienne.
+        URL générée : GET /api/projects/{pk}/runs/
+        """
+        project = self.get_object()
+        paginator = AnalysisRunCursorPagination()
+        page = paginator.paginate_queryset(project.analysis_runs.all(), request, view=self)
+        serializer = AnalysisRunListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['get'], url_path='latest-analysis')
     def latest_analysis(self, request, pk=None):
         """
@@ -34,20 +65,23 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         
         # 2. On cherche la dernière analyse liée à ce projet
-        # .order_by('-created_at') trie de la plus récente à la plus ancienne
+        # .order_by('-created_at', '-id') trie de la plus récente à la plus ancienne (index run_project_created_idx)
         # .first() prend la première de la liste (donc la plus récente)
-        latest_run = project.analysis_runs.order_by('-created_at').first()
+        latest_run = project.analysis_runs.order_by('-created_at', '-id').first()
 
-        # 3. Si aucune analyse n'existe, on renvoie une 404
+        # Si aucune analyse n'existe, on renvoie une 404
         if not latest_run:
             return Response(
                 {"detail": "Aucune analyse trouvée pour ce projet."}, 
                 status=404
             )
 
-        # 4. Sinon, on sérialise et on renvoie la réponse
-        serializer = AnalysisRunDetailSerializer(latest_run)
-        return Response(serializer.data)
+        # 3. Si elle est terminée, sa représentation est en cache, sous la clé de
+        # l'analyse elle-même : une nouvelle analyse ne sert jamais l'ancienne.
+        data = cached_run_data(latest_run, 'detail', lambda: AnalysisRunDetailSerializer(latest_run).data)
+
+        # 4. On renvoie la réponse (ou 304 si le client a déjà cette version)
+        return conditional_run_response(request, data)
 
     @action(detail=True, methods=['post'], url_path='regenerate-api-key')
     def regenerate_api_key(self, request, pk=None):
@@ -58,8 +92,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         
         # On génère une nouvelle clé UUID et on sauvegarde le projet.
+        old_api_key = project.api_key
         project.api_key = uuid.uuid4()
         project.save()
+
+        # L'ancienne clé doit être refusée tout de suite, sans attendre l'expiration du cache.
+        invalidate_api_key(old_api_key, project.api_key)
         
         # On renvoie une réponse avec la nouvelle clé.
         return Response({'api_key': project.api_key})
@@ -80,36 +118,319 @@ class AnalysisRunViewSet(viewsets.ReadOnlyModelViewSet):
         """
         return AnalysisRun.objects.filter(project__owner=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Détail d'une analyse, avec `ETag`/`Last-Modified` (réponse 304 si
+        inchangée) et mise en cache une fois l'analyse terminée.
+        """
+        analysis_run = self.get_object()
+        data = cached_run_data(analysis_run, 'detail', lambda: self.get_serializer(analysis_run).data)
+        return conditional_run_response(request, data)
+
+    @action(detail=True, methods=['get'], url_path='summary')
+    def summary(self, request, pk=None):
+        """
+        Résumé pré-calculé d'une analyse : compteurs par sévérité, par code
+        d'issue et par module, effort par module et score total.
+        URL générée : GET /api/analyses/{pk}/summary/
+        """
+        analysis_run = self.get_object()
+        data = cached_run_data(analysis_run, 'summary', lambda: AnalysisRunSummarySerializer(analysis_run).data)
+        return conditional_run_response(request, data)
+
+    @action(detail=True, methods=['get'], url_path='issues')
+    def issues(self, request, pk=None):
+        """
+        Liste paginée (par curseur) des issues d'une analyse.
+        URL générée : GET /api/analyses/{pk}/issues/
+
+        Filtres disponibles (paramètres de requête) :
+        - `severity` et `issue_code` : une ou plusieurs valeurs séparées par des virgules ;
+        - `module_name` : nom exact du module ;
+        - `file_path` : préfixe du chemin du fichier.
+        """
+        # get_object() vérifie que l'utilisateur est bien propriétaire de l'analyse.
+        analysis_run = self.get_object()
+        issues = self._filter_issues(Issue.objects.filter(analysis_run=analysis_run))
+
+        paginator = IssueCursorPagination()
+        page = paginator.paginate_queryset(issues.select_related('issue_type', 'snippet'), request, view=self)
+        serializer = IssueSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='export', renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request, pk=None):
+        """
+        Export complet des issues d'une analyse, en streaming.
+        URL générée : GET /api/analyses/{pk}/export/?format=ndjson|csv
+
+        Accepte les mêmes filtres que `/issues/`. La réponse est compressée
+        (gzip) si le client l'accepte (`Accept-Encoding`). La mémoire utilisée
+        ne dépend pas du nombre d'issues.
+        """
+        analysis_run = self.get_object()
+        issues = self._filter_issues(Issue.objects.filter(analysis_run=analysis_run))
+
+        export_format = request.accepted_renderer.format
+        rows = iter_issue_rows(issues)
+        blocks = iter_csv(rows) if export_format == 'csv' else iter_ndjson(rows)
+
+        gzip_accepted = 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = StreamingHttpResponse(
+            gzip_stream(blocks) if gzip_accepted else blocks,
+            content_type=f"{request.accepted_renderer.media_type}; charset=utf-8",
+        )
+        if gzip_accepted:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = f'attachment; filename="analysis-{analysis_run.pk}.{export_format}"'
+        return response
+
+    def _filter_issues(self, issues):
+        """Applique les filtres communs à `/issues/` et `/export/` (paramètres de requête)."""
+        params = self.request.query_params
+        if params.get('severity'):
+            issues = issues.filter(severity__in=params['severity'].split(','))
+        if params.get('issue_code'):
+            issues = issues.filter(issue_type__in=params['issue_code'].split(','))
+        if params.get('module_name'):
+            issues = issues.filter(module_name=params['module_name'])
+        if params.get('file_path'):
+            issues = issues.filter(file_path__startswith=params['file_path'])
+        return issues
+
+    @action(detail=True, methods=['get'], url_path=r'diff/(?P<other_pk>[^/.]+)')
+    def diff(self, request, pk=None, other_pk=None):
+        """
+        Compare deux analyses terminées : issues nouvelles, corrigées et persistantes.
+        URL générée : GET /api/analyses/{pk}/diff/{other_pk}/
+
+        `pk` est l'analyse de référence, `other_pk` la plus récente. Sans
+        paramètre, seuls les compteurs sont renvoyés ; avec `?set=new`,
+        `fixed` ou `persisting`, la liste paginée (curseur) des issues de cet ensemble.
+        """
+        base_run = self.get_object()
+        target_run = get_object_or_404(self.get_queryset(), pk=other_pk)
+        for analysis_run in (base_run, target_run):
+            if analysis_run.status != AnalysisRun.StatusChoices.COMPLETED:
+                raise ValidationError({'detail': f"Analysis #{analysis_run.pk} is not completed."})
+
+        selected = request.query_params.get('set')
+        if selected:
+            if selected not in DIFF_SETS:
+                raise ValidationError({'set': f"Must be one of: {', '.join(DIFF_SETS)}."})
+            paginator = IssueCursorPagination()
+            page = paginator.paginate_queryset(diff_issue_sets(base_run, target_run)[selected].select_related('issue_type', 'snippet'), request, view=self)
+            serializer = IssueSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        return Response({
+            'base': base_run.pk,
+            'target': target_run.pk,
+            'counts': diff_counts(base_run, target_run),
+        })
+
+
+def spool_ndjson_body(request):
+    """
+    Recopie le corps NDJSON (gzip ou non) de la requête dans un fichier temporaire gzip.
+
+    Le flux est recopié par blocs, sans être décodé ni chargé en mémoire.
+    """
+    encoding = request.headers.get('Content-Encoding', '').lower()
+    if encoding not in ('', 'identity', 'gzip'):
+        raise ParseError(f"Unsupported Content-Encoding: {encoding}")
+    if request.stream is None:
+        raise ParseError("Empty request body.")
+    return spool_ndjson_stream(request.stream, encoding)
+
 
 class AnalysisRunCreateView(generics.CreateAPIView):
     """
-    Vue dédiée à la création d'une nouvelle analyse par l'agent CLI.
+    Vue dédiée à la soumission d'une nouvelle analyse par l'agent CLI.
+
+    Accepte soit le format historique (`{"issues": [...]}` en JSON), soit un
+    flux NDJSON compressé en gzip (une issue par ligne). Le rapport brut est
+    simplement enregistré et la vue répond immédiatement `202 Accepted` avec
+    l'id de l'analyse (PENDING) ; la validation, l'insertion des issues et le
+    calcul du score sont faits par le worker (`manage.py process_analyses`).
+    L'avancement est visible via `/api/analyses/{id}/`.
     """
     queryset = AnalysisRun.objects.all()
     serializer_class = AnalysisRunCreateSerializer
     permission_classes = [HasValidAPIKey]
+    parser_classes = [JSONParser, NDJSONParser]
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        if request.content_type.split(';')[0].strip() == NDJSONParser.media_type:
+            payload_file = spool_ndjson_body(request)
+        else:
+            # Seule la forme générale est vérifiée ici ; chaque issue sera validée par le worker.
+            issues_data = request.data.get('issues') if isinstance(request.data, dict) else None
+            if not isinstance(issues_data, list):
+                raise ValidationError({'issues': ["This field is required and must be a list."]})
+            payload_file = spool_issues(issues_data)
+
+        # La permission HasValidAPIKey a déjà validé la clé et stocké le projet ici.
+        with payload_file:
+            analysis_run = store_payload(AnalysisRun(project=request.project), payload_file)
+
+        return Response(
+            {'id': analysis_run.id, 'status': analysis_run.status},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+# Empreinte complète d'un commit git (SHA-1, ou SHA-256 pour les dépôts qui l'utilisent).
+GIT_COMMIT_RE = re.compile(r'^(?:[0-9a-f]{40}|[0-9a-f]{64})$')
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This resource is not in a state that allows this operation.'
+    default_code = 'conflict'
+
+
+class SubmissionViewSet(viewsets.GenericViewSet):
+    """
+    Soumission d'une analyse en plusieurs requêtes, pour les gros rapports.
+
+    1. `POST /api/submissions/` ouvre une analyse (statut RUNNING) et renvoie son id ;
+    2. `PUT /api/submissions/{id}/batches/{n}/` envoie le lot numéro `n` (NDJSON,
+       éventuellement gzip). Renvoyer un lot le remplace : un envoi interrompu
+       peut être repris sans risque de doublon ;
+    3. `POST /api/submissions/{id}/finalize/` (`{"batches": N}`) vérifie que les
+       lots 1 à N sont arrivés et met l'analyse en file pour le worker, qui
+       calcule le score et la passe en COMPLETED.
+
+    `GET /api/submissions/{id}/` liste les lots déjà reçus, pour reprendre un envoi.
+    L'en-tête `Idempotency-Key` de l'ouverture permet de la retenter sans ouvrir
+    une seconde analyse. Une soumission jamais finalisée expire (voir `tasks.expire_open_submissions`).
+
+    L'agent envoie aussi à l'ouverture le commit analysé (`git_commit`), quand le
+    dossier audité est un dépôt git sans modification locale.
+
+    Audit partiel (`audit --changed-since`) : l'agent envoie à l'ouverture la liste
+    des fichiers ré-analysés (`{"changed_files": [...]}`, chemins relatifs au
+    dossier audité, fichiers supprimés compris). Les issues des autres fichiers
+    sont reprises de l'analyse de base : la dernière analyse du commit `base_commit`
+    (le `git merge-base` de la révision demandée et de HEAD), ou `base_run` si l'agent
+    la désigne (`auditor watch` enchaîne ainsi ses envois : chacun part du
+    précédent, même si celui-ci n'a pas encore été traité par le worker). Sans
+    analyse de base, l'audit partiel est refusé.
+    """
+    permission_classes = [HasValidAPIKey]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def get_queryset(self):
+        # La permission HasValidAPIKey a déjà validé la clé et stocké le projet ici.
+        return AnalysisRun.objects.filter(project=self.request.project)
+
+    def _submission_state(self, analysis_run):
+        # `finalized` : le rapport complet a été reçu et l'analyse n'a pas échoué,
+        # l'agent n'a plus rien à envoyer. Une analyse échouée (ou une soumission
+        # expirée) doit être soumise de nouveau.
+        statuses = AnalysisRun.StatusChoices
+        return {
+            'id': analysis_run.id,
+            'status': analysis_run.status,
+            'finalized': analysis_run.status in (statuses.PENDING, statuses.COMPLETED) or (
+                analysis_run.status == statuses.RUNNING and bool(analysis_run.payload)
+            ),
+            'received_batches': sorted(analysis_run.submission_batches.values_list('number', flat=True)),
+            'base_run': analysis_run.base_run_id,
+        }
+
+    def _get_open_run(self):
+        analysis_run = self.get_object()
+        if analysis_run.status != AnalysisRun.StatusChoices.RUNNING or analysis_run.payload:
+            raise Conflict(f"Analysis #{analysis_run.pk} is not accepting batches anymore.")
+        return analysis_run
+
+    def _get_base_run(self, data):
         """
-        Cette méthode est appelée juste avant de sauvegarder.
-        Le projet est récupéré via la clé d'API grâce à notre permission
-        et est disponible dans `self.request.project`.
-        On le passe directement au serializer lors de la sauvegarde.
+        Analyse de base d'un audit partiel : celle que l'agent désigne (`base_run`),
+        ou la dernière analyse du commit de base de sa comparaison git (`base_commit`).
         """
-        # La permission HasValidAPIKey a déjà validé la clé et stocké le projet ici.
-        project = self.request.project
-        
-        # On passe le projet en argument additionnel à la méthode save().
-        # Le serializer l'ajoutera à validated_data avant d'appeler sa méthode create().
-        analysis_run = serializer.save(project=project)
-        
-        # Maintenant que tout est en base de données, on peut calculer le score.
-        # On récupère toutes les issues qui viennent d'être créées.
-        issues = analysis_run.issues.all()
-        
-        # On appelle notre logique de scoring
-        score = calculate_effort_score(issues)
-        
-        # On met à jour l'objet AnalysisRun avec le score calculé et on le sauvegarde.
-        analysis_run.effort_score = score
-        analysis_run.save(update_fields=['effort_score'])
\ No newline at end of file
+        runs = self.get_queryset().exclude(status=AnalysisRun.StatusChoices.FAILED)
+        base_run_id = data.get('base_run')
+        if base_run_id is not None:
+            base_run = runs.filter(pk=base_run_id).first() if isinstance(base_run_id, int) else None
+            if base_run is None:
+                raise ValidationError({'base_run': ["Unknown or failed analysis of this project."]})
+            return base_run
+
+        base_commit = data.get('base_commit')
+        if base_commit is None:
+            raise ValidationError({'changed_files': ["A partial audit needs a 'base_run' or a 'base_commit'."]})
+        if not isinstance(base_commit, str) or not GIT_COMMIT_RE.match(base_commit):
+            raise ValidationError({'base_commit': ["This field must be a full git commit hash."]})
+        base_run = runs.filter(git_commit=base_commit).order_by('-created_at', '-id').first()
+        if base_run is None:
+            raise ValidationError({'base_commit': [
+                f"This project has no analysis of commit {base_commit[:12]} to carry unchanged files forward from: "
+                "run a full audit of that commit first."
+            ]})
+        return base_run
+
+    def create(self, request, *args, **kwargs):
+        # Ouverture retentée par l'agent (réponse perdue) : on renvoie la soumission déjà ouverte.
+        idempotency_key = request.headers.get('Idempotency-Key', '')[:64]
+        if idempotency_key:
+            analysis_run = self.get_queryset().filter(
+                idempotency_key=idempotency_key, status=AnalysisRun.StatusChoices.RUNNING, payload='',
+            ).first()
+            if analysis_run is not None:
+                return Response(self._submission_state(analysis_run), status=status.HTTP_200_OK)
+
+        data = request.data if isinstance(request.data, dict) else {}
+        git_commit = data.get('git_commit') or ''
+        if git_commit and not (isinstance(git_commit, str) and GIT_COMMIT_RE.match(git_commit)):
+            raise ValidationError({'git_commit': ["This field must be a full git commit hash."]})
+
+        changed_files = data.get('changed_files')
+        base_run = None
+        if changed_files is not None:
+            if not isinstance(changed_files, list) or not all(isinstance(path, str) for path in changed_files):
+                raise ValidationError({'changed_files': ["This field must be a list of file paths."]})
+            base_run = self._get_base_run(data)
+
+        analysis_run = AnalysisRun.objects.create(
+            project=request.project, status=AnalysisRun.StatusChoices.RUNNING,
+            base_run=base_run, changed_files=changed_files, idempotency_key=idempotency_key,
+            git_commit=git_commit,
+        )
+        return Response(self._submission_state(analysis_run), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self._submission_state(self.get_object()))
+
+    @action(detail=True, methods=['put'], url_path=r'batches/(?P<number>[0-9]+)')
+    def batch(self, request, pk=None, number=None):
+        number = int(number)
+        if number < 1:
+            raise ValidationError({'number': ["Batch numbers start at 1."]})
+        analysis_run = self._get_open_run()
+        with spool_ndjson_body(request) as payload_file:
+            store_batch(analysis_run, number, payload_file)
+        return Response({'id': analysis_run.id, 'batch': number})
+
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        batch_count = request.data.get('batches') if isinstance(request.data, dict) else None
+        if not isinstance(batch_count, int) or batch_count < 0:
+            raise ValidationError({'batches': ["This field is required and must be a non-negative integer."]})
+
+        with transaction.atomic():
+            # Le verrou évite qu'une finalisation répétée (nouvelle tentative de l'agent) ne soit traitée deux fois.
+            analysis_run = self.get_queryset().select_for_update().get(pk=self.get_object().pk)
+            if analysis_run.status != AnalysisRun.StatusChoices.RUNNING or analysis_run.payload:
+                # Déjà finalisée : on renvoie simplement l'état courant.
+                return Response({'id': analysis_run.id, 'status': analysis_run.status}, status=status.HTTP_202_ACCEPTED)
+
+            missing = missing_batches(analysis_run, batch_count)
+            if missing:
+                raise ValidationError({'batches': [f"Missing batches: {', '.join(map(str, missing))}."]})
+            assemble_batches(analysis_run, batch_count)
+
+        return Response({'id': analysis_run.id, 'status': analysis_run.status}, status=status.HTTP_202_ACCEPTED)
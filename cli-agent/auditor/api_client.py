@@ -1,31 +1,184 @@
 # auditor/api_client.py
-import requests
+import gzip
+import hashlib
 import json
+import random
+import time
+import requests
 import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urljoin
+
+from .report import IssueSpool
+
+
+@lru_cache(maxsize=None)
+def get_submit_url() -> str:
+    """
+    URL de soumission historique, lue dans l'environnement au premier envoi
+    (et non à l'import : un audit qui ne soumet rien n'en a pas besoin).
+    """
+    from dotenv import load_dotenv
+
+    # Charge les variables du fichier .env dans l'environnement du script
+    load_dotenv()
+
+    # C'est une sécurité importante : on s'assure que l'URL est bien configurée.
+    submit_url = os.getenv("AUDITOR_API_URL")
+    if not submit_url:
+        raise ValueError(
+            "AUDITOR_API_URL is not set in your environment. "
+            "Please create a .env file at the root of the cli-agent directory."
+        )
+    return submit_url
+
+
+def get_submissions_url() -> str:
+    """Soumission en plusieurs requêtes : par défaut, `/api/submissions/` à côté de l'URL historique."""
+    submit_url = get_submit_url()
+    return os.getenv("AUDITOR_SUBMISSIONS_URL") or urljoin(submit_url, "../submissions/")
+
+
+UPLOAD_BATCH_SIZE = 5000
+UPLOAD_MANIFEST_FILE_NAME = "upload-manifest.json"
+
+# Nouvelles tentatives : délai exponentiel plafonné, sur erreurs réseau et réponses 429/5xx.
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = (10, 100)
+
+
+# Session HTTP partagée : les connexions (TCP/TLS) sont réutilisées d'un appel à l'autre.
+_session = None
+
+
+def get_session() -> requests.Session:
+    """Retourne la session HTTP partagée, créée au premier appel."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+class UploadManifest:
+    """
+    Fichier local qui suit l'avancement d'une soumission en plusieurs requêtes.
+
+    Il associe l'empreinte du rapport à l'analyse ouverte sur le serveur et aux
+    lots déjà acceptés : si l'envoi est interrompu, la prochaine exécution qui
+    produit le même rapport reprend là où la précédente s'est arrêtée.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.data = {}
+
+    def load(self, report_digest: str) -> bool:
+        """Charge le manifeste s'il correspond à ce rapport. Retourne True en cas de reprise."""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("report_digest") != report_digest:
+            return False
+        self.data = data
+        return True
 
-# Cette ligne charge les variables du fichier .env dans l'environnement du script
-load_dotenv()
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Écriture atomique : un manifeste n'est jamais à moitié écrit.
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
 
-# On récupère l'URL depuis les variables d'environnement.
-# os.getenv() retournera None si la variable n'est pas trouvée.
-SUBMIT_URL = os.getenv("AUDITOR_API_URL")
+    def delete(self):
+        self.data = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
 
-# C'est une sécurité importante : on s'assure que l'URL est bien configurée.
-if not SUBMIT_URL:
-    raise ValueError(
-        "AUDITOR_API_URL is not set in your environment. "
-        "Please create a .env file at the root of the cli-agent directory."
-    )
 
+def _request_with_retries(method: str, url: str, max_attempts: Optional[int] = None, **kwargs) -> requests.Response:
+    """
+    Envoie une requête en la retentant, avec un délai exponentiel (et aléatoire),
+    sur les erreurs réseau, les timeouts et les réponses 429/5xx.
+    """
+    max_attempts = max_attempts or MAX_ATTEMPTS
+    for attempt in range(1, max_attempts + 1):
+        try:
+            response = get_session().request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == max_attempts:
+                response.raise_for_status()
+                return response
+            reason = f"HTTP {response.status_code}"
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == max_attempts:
+                raise
+            reason = type(e).__name__
+
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        print(f"  {method} {url} failed ({reason}), retrying in {delay:.1f}s ({attempt}/{max_attempts})...")
+        time.sleep(delay)
+
+
+def iter_batches(issues: IssueSpool, batch_size: int = UPLOAD_BATCH_SIZE) -> Iterator[bytes]:
+    """Découpe le rapport en lots NDJSON compressés (gzip), de `batch_size` issues au plus."""
+    lines = []
+    for issue in issues:
+        lines.append(json.dumps(issue.to_dict()).encode('utf-8') + b'\n')
+        if len(lines) == batch_size:
+            yield gzip.compress(b''.join(lines), mtime=0)
+            lines = []
+    if lines:
+        yield gzip.compress(b''.join(lines), mtime=0)
+
+
+def report_digest(issues: IssueSpool, batch_size: int = UPLOAD_BATCH_SIZE,
+                  submission: Optional[dict] = None) -> str:
+    """Empreinte du rapport et du découpage en lots : deux exécutions identiques ont la même."""
+    digest = hashlib.sha256(f"batch_size={batch_size}\n".encode('utf-8'))
+    if submission:
+        digest.update(f"submission={json.dumps(submission, sort_keys=True)}\n".encode('utf-8'))
+    for issue in issues:
+        digest.update(json.dumps(issue.to_dict()).encode('utf-8') + b'\n')
+    return digest.hexdigest()
 
-def submit_report(report_data: dict, api_key: str):
+
+def submit_report(issues: IssueSpool, api_key: str, manifest_path: Optional[str] = None,
+                  max_attempts: Optional[int] = None, verbose: bool = True,
+                  submission: Optional[dict] = None):
     """
     Submits the analysis report to the backend API.
 
+    Le rapport est envoyé en plusieurs requêtes (`/api/submissions/`) : ouverture
+    d'une analyse, envoi des lots numérotés (NDJSON gzip), puis finalisation.
+    Chaque requête est retentée en cas d'échec. Si `manifest_path` est fourni,
+    l'avancement y est enregistré et un envoi interrompu est repris à la
+    prochaine exécution, sans renvoyer les lots déjà acceptés.
+
     Args:
-        report_data: Un dictionnaire contenant les résultats de l'analyse (les "issues").
+        issues: Le spool contenant les résultats de l'analyse (les "issues").
         api_key: La clé d'API du projet pour l'authentification.
+        manifest_path: Fichier de suivi de l'envoi, pour pouvoir le reprendre.
+        max_attempts: Nombre maximal de tentatives par requête (par défaut, `MAX_ATTEMPTS`).
+        verbose: Affiche l'avancement de l'envoi (désactivé pour les envois en arrière-plan).
+        submission: Champs de l'ouverture de la soumission : `git_commit` (commit
+            analysé) et, pour un audit partiel (`audit --changed-since`), `changed_files`
+            (fichiers ré-analysés) avec `base_commit` ou `base_run` (analyse dont le
+            serveur reprend les issues des autres fichiers).
 
     Returns:
         La réponse JSON du serveur en cas de succès.
@@ -33,29 +186,89 @@ def submit_report(report_data: dict, api_key: str):
     Raises:
         requests.exceptions.RequestException: Pour les erreurs de connexion ou les statuts HTTP d'erreur.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Api-Key {api_key}"
-    }
+    auth = {"Authorization": f"Api-Key {api_key}"}
+    batch_headers = {**auth, "Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+
+    log = print if verbose else (lambda *args: None)
+    submissions_url = get_submissions_url()
+    log(f"\nConnecting to {submissions_url} to submit the report...")
 
-    print(f"\nConnecting to {SUBMIT_URL} to submit the report...")
+    manifest = UploadManifest(manifest_path)
+    digest = report_digest(issues, UPLOAD_BATCH_SIZE, submission)
 
     try:
-        response = requests.post(
-            SUBMIT_URL,
-            data=json.dumps(report_data),
-            headers=headers,
-            timeout=100
+        run_id, received = None, set()
+        if manifest.load(digest):
+            run_id, received = _resume_submission(submissions_url, manifest.data["run_id"], auth, max_attempts)
+            if run_id is not None and received is None:
+                # La soumission avait déjà été finalisée : il n'y a plus rien à envoyer.
+                manifest.delete()
+                return {"id": run_id}
+
+        if run_id is None:
+            body = submission or None
+            # L'empreinte du rapport sert de clé d'idempotence : si la réponse est perdue,
+            # la nouvelle tentative retrouve l'analyse ouverte au lieu d'en créer une autre.
+            create_headers = {**auth, "Idempotency-Key": digest}
+            state = _request_with_retries("POST", submissions_url, max_attempts, json=body, headers=create_headers).json()
+            run_id, received = state["id"], set()
+            manifest.data = {"report_digest": digest, "run_id": run_id, "received_batches": []}
+            manifest.save()
+        else:
+            log(f"Resuming the upload of analysis #{run_id} ({len(received)} batch(es) already received).")
+
+        submission_url = f"{submissions_url}{run_id}/"
+        batch_count = 0
+        for batch_count, body in enumerate(iter_batches(issues, UPLOAD_BATCH_SIZE), start=1):
+            if batch_count in received:
+                continue
+            _request_with_retries(
+                "PUT", f"{submission_url}batches/{batch_count}/", max_attempts, data=body, headers=batch_headers
+            )
+            received.add(batch_count)
+            manifest.data["received_batches"] = sorted(received)
+            manifest.save()
+
+        response = _request_with_retries(
+            "POST", f"{submission_url}finalize/", max_attempts, json={"batches": batch_count}, headers=auth
         )
-        
-        response.raise_for_status()
-        
+        manifest.delete()
         return response.json()
 
     except requests.exceptions.RequestException as e:
-        print(f"Error while submitting the report: {e}")
-        
+        log(f"Error while submitting the report: {e}")
+
         if e.response is not None:
-            print("Server response:", e.response.text)
+            log("Server response:", e.response.text)
         
-        raise
\ No newline at end of file
+        raise
+
+
+def get_submission(run_id: int, api_key: str, max_attempts: Optional[int] = None) -> dict:
+    """État d'une soumission sur le serveur (statut, lots reçus, analyse de base)."""
+    auth = {"Authorization": f"Api-Key {api_key}"}
+    return _request_with_retries("GET", f"{get_submissions_url()}{run_id}/", max_attempts, headers=auth).json()
+
+
+def _resume_submission(submissions_url: str, run_id: int, auth: dict,
+                       max_attempts: Optional[int] = None) -> Tuple[Optional[int], Optional[set]]:
+    """
+    Interroge le serveur sur une soumission interrompue.
+
+    Returns:
+        (run_id, lots reçus) si l'envoi peut reprendre, (run_id, None) si le
+        serveur a déjà reçu tout le rapport (`finalized`), et (None, None) s'il
+        faut recommencer : soumission expirée ou analyse échouée (FAILED), ou
+        tout autre état.
+    """
+    try:
+        response = _request_with_retries("GET", f"{submissions_url}{run_id}/", max_attempts, headers=auth)
+    except requests.exceptions.HTTPError:
+        # Analyse introuvable (supprimée, autre projet...) : on repart de zéro.
+        return None, None
+    state = response.json()
+    if state.get("finalized"):
+        return run_id, None
+    if state["status"] == "RUNNING":
+        return run_id, set(state["received_batches"])
+    return None, None
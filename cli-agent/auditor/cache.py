@@ -0,0 +1,103 @@
+# auditor/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+from typing import TYPE_CHECKING, List, Optional
+
+from .report import Issue
+
+if TYPE_CHECKING:
+    # Annotations seulement : les checkers (et lxml) ne sont chargés qu'à l'analyse.
+    from .checkers.base_checker import BaseChecker
+
+DEFAULT_CACHE_DIR = ".odoo-auditor-cache"
+DB_FILE_NAME = "audit-cache.sqlite3"
+
+# À incrémenter quand la façon dont le runner produit les issues change
+# (et non une règle en particulier) : tout le cache est alors invalidé.
+CACHE_SCHEMA_VERSION = 1
+
+
+def checkers_fingerprint(checkers: List["BaseChecker"]) -> str:
+    """
+    Calcule une empreinte de l'ensemble des checkers actifs.
+
+    Elle change dès qu'une règle est ajoutée, retirée, ou que son ISSUE_CODE
+    ou sa VERSION est modifié, ce qui invalide les résultats mis en cache.
+    """
+    parts = sorted(
+        f"{type(c).__module__}.{type(c).__name__}:{c.ISSUE_CODE}:{c.VERSION}"
+        for c in checkers
+    )
+    payload = f"schema={CACHE_SCHEMA_VERSION}\n" + "\n".join(parts)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Retourne le hash SHA-256 du contenu brut d'un fichier."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AuditCache:
+    """
+    Cache persistant (SQLite) des issues trouvées pour chaque fichier.
+
+    Une entrée n'est réutilisée que si le contenu du fichier et l'ensemble des
+    checkers actifs sont identiques à ceux de l'exécution qui l'a produite.
+    Il n'y a qu'une entrée par fichier : une nouvelle analyse écrase l'ancienne.
+    """
+
+    def __init__(self, cache_dir: str, checkers: List["BaseChecker"]):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, DB_FILE_NAME)
+        self.checkers_hash = checkers_fingerprint(checkers)
+        self.hits = 0
+        self.misses = 0
+
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_results (
+                module_name   TEXT NOT NULL,
+                file_path     TEXT NOT NULL,
+                content_hash  TEXT NOT NULL,
+                checkers_hash TEXT NOT NULL,
+                issues        TEXT NOT NULL,
+                PRIMARY KEY (module_name, file_path)
+            )
+            """
+        )
+
+    def get(self, module_name: str, file_path: str, content_hash: str) -> Optional[List[Issue]]:
+        """Retourne les issues en cache pour ce fichier, ou None si l'entrée est absente ou périmée."""
+        row = self._connection.execute(
+            "SELECT content_hash, checkers_hash, issues FROM file_results "
+            "WHERE module_name = ? AND file_path = ?",
+            (module_name, file_path),
+        ).fetchone()
+
+        if row is None or row[0] != content_hash or row[1] != self.checkers_hash:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return [Issue(**data) for data in json.loads(row[2])]
+
+    def put(self, module_name: str, file_path: str, content_hash: str, issues: List[Issue]):
+        """Enregistre (ou remplace) les issues trouvées pour ce fichier."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO file_results "
+            "(module_name, file_path, content_hash, checkers_hash, issues) VALUES (?, ?, ?, ?, ?)",
+            (module_name, file_path, content_hash, self.checkers_hash,
+             json.dumps([issue.to_dict() for issue in issues])),
+        )
+
+    def close(self):
+        """Valide les écritures et ferme la base."""
+        self._connection.commit()
+        self._connection.close()
@@ -1,6 +1,8 @@
 # auditor/checkers/base_checker.py
+import ast
 from abc import ABC, abstractmethod
 from typing import List, Tuple
+from lxml import etree
 from ..report import Issue
 
 class BaseChecker(ABC):
@@ -18,6 +20,15 @@ class BaseChecker(ABC):
     # Description du problème, peut contenir des placeholders comme {name}.
     DESCRIPTION: str = "No description provided."
 
+    # Version de l'implémentation de la règle. À incrémenter à chaque modification
+    # de la logique du checker pour invalider les résultats du cache d'audit.
+    VERSION: int = 1
+
+    # Chaînes littérales dont la présence dans le fichier brut est nécessaire pour que
+    # la règle puisse se déclencher (ex: ("api.one",)). Un fichier qui n'en contient
+    # aucune, pour aucune règle, n'est même pas parsé. Vide = la règle s'exécute toujours.
+    TRIGGER_TOKENS: Tuple[str, ...] = ()
+
     # Par défaut, une règle s'applique à toutes les versions.
     # Les checkers spécifiques surchargeront ces valeurs.
     APPLIES_FROM_VERSION: float = 0.0
@@ -39,19 +50,75 @@ class BasePythonChecker(BaseChecker):
     """
     Classe de base spécialisée pour les fichiers Python.
     Elle travaillera avec un Arbre Syntaxique Abstrait (AST) pour plus de robustesse.
+
+    Deux façons d'écrire une règle :
+    - déclarer `NODE_TYPES` et implémenter `visit()` : le moteur parcourt l'arbre
+      une seule fois pour toutes les règles et ne transmet que les nœuds demandés ;
+    - surcharger `check()` pour recevoir l'arbre complet (mode historique, en repli).
     """
-    @abstractmethod
+    # Types de nœuds AST qui intéressent la règle (ex: (ast.FunctionDef,)).
+    NODE_TYPES: Tuple[type, ...] = ()
+
+    def visit(self, node, file_path: str, module_name: str) -> List[Issue]:
+        """
+        Appelée par le moteur pour chaque nœud dont le type est dans `NODE_TYPES`.
+        """
+        return []
+
     def check(self, ast_tree, file_path: str, module_name: str) -> List[Issue]:
         # Note: on change la signature. On ne prend plus le contenu brut,
         # mais un arbre AST déjà parsé, c'est beaucoup plus efficace.
-        pass
+        # Par défaut, on parcourt l'arbre et on délègue à `visit()`, ce qui permet
+        # d'utiliser une règle "par nœud" sans passer par le moteur.
+        issues = []
+        for node in ast.walk(ast_tree):
+            if isinstance(node, self.NODE_TYPES):
+                issues.extend(self.visit(node, file_path, module_name))
+        return issues
 
 class BaseXMLChecker(BaseChecker):
     """
     Classe de base spécialisée pour les fichiers XML.
     Elle travaillera avec un arbre XML parsé (lxml) pour des recherches efficaces.
+
+    Une règle décrit les éléments qui l'intéressent plutôt que de parcourir
+    l'arbre elle-même, et implémente `visit()` pour chaque élément trouvé :
+    - `TAGS` (+ `CONDITION` optionnelle) : le moteur évalue toutes les règles
+      en un seul parcours `iter()` du document, filtré par nom de balise ;
+    - sinon `XPATH` : une requête absolue, précompilée une fois au chargement.
+    Surcharger `check()` reste possible pour les cas particuliers (mode historique, en repli).
     """
-    @abstractmethod
+    # Balises des éléments candidats (ex: ('field',)).
+    TAGS: Tuple[str, ...] = ()
+
+    # Expression XPath relative à l'élément candidat qui doit être vraie (ex: "@track_visibility").
+    CONDITION: str = None
+
+    # Requête XPath absolue, utilisée quand la règle ne peut pas s'exprimer avec TAGS.
+    XPATH: str = None
+
+    def visit(self, element, file_path: str, module_name: str) -> List[Issue]:
+        """
+        Appelée par le moteur pour chaque élément sélectionné par la règle.
+        """
+        return []
+
     def check(self, xml_tree, file_path: str, module_name: str) -> List[Issue]:
         # Idem, on passe un arbre XML parsé.
-        pass
\ No newline at end of file
+        # Par défaut, on sélectionne les éléments décrits par les métadonnées
+        # et on délègue à `visit()`, ce qui permet d'utiliser la règle sans le moteur.
+        if self.TAGS:
+            condition = etree.XPath(f"boolean({self.CONDITION})") if self.CONDITION else None
+            elements = [
+                el for el in xml_tree.iter(*self.TAGS)
+                if isinstance(el.tag, str) and (condition is None or condition(el))
+            ]
+        elif self.XPATH:
+            elements = xml_tree.xpath(self.XPATH)
+        else:
+            elements = []
+
+        issues = []
+        for element in elements:
+            issues.extend(self.visit(element, file_path, module_name))
+        return issues
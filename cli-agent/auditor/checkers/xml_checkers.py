@@ -21,25 +21,20 @@ class TrackVisibilityChecker(BaseXMLChecker):
     APPLIES_FROM_VERSION = 8.0
     APPLIES_TO_VERSION = 16.0 # Pertinent pour les projets jusqu'à la v16.
 
-    def check(self, xml_tree, file_path: str, module_name: str) -> List[Issue]:
-        issues = []
-        
-        # On utilise XPath, un langage de requête pour XML.
-        # Cette requête cherche toutes les balises <field> qui ont un attribut 'track_visibility'.
-        # `//` signifie "cherche n'importe où dans le document".
-        # `[@track_visibility]` est la condition sur l'attribut.
-        nodes_with_issue = xml_tree.xpath("//field[@track_visibility]")
+    # On cherche toutes les balises <field> qui ont un attribut 'track_visibility'.
+    # Le moteur ne nous transmet que les éléments <field> pour lesquels la
+    # condition XPath `@track_visibility` est vraie.
+    TRIGGER_TOKENS = ("track_visibility",)
+    TAGS = ('field',)
+    CONDITION = "@track_visibility"
 
-        for node in nodes_with_issue:
-            new_issue = Issue(
-                issue_code=self.ISSUE_CODE,
-                severity=self.SEVERITY,
-                module_name=module_name,
-                file_path=file_path,
-                line_number=node.sourceline, # lxml nous donne le numéro de ligne !
-                description=self.DESCRIPTION,
-                code_snippet=etree.tostring(node, pretty_print=False).decode('utf-8').strip()
-            )
-            issues.append(new_issue)
-            
-        return issues
\ No newline at end of file
+    def visit(self, node, file_path: str, module_name: str) -> List[Issue]:
+        return [Issue(
+            issue_code=self.ISSUE_CODE,
+            severity=self.SEVERITY,
+            module_name=module_name,
+            file_path=file_path,
+            line_number=node.sourceline, # lxml nous donne le numéro de ligne !
+            description=self.DESCRIPTION,
+            code_snippet=etree.tostring(node, pretty_print=False).decode('utf-8').strip()
+        )]
@@ -1,39 +1,370 @@
 # auditor/discovery.py
 import os
-from typing import List, Tuple
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
-def find_odoo_modules(project_path: str) -> List[Tuple[str, str, str]]:
+MANIFEST_FILE_NAME = '__manifest__.py'
+GITIGNORE_FILE_NAME = '.gitignore'
+
+# Une règle d'exclusion : (dossier de base relatif à la racine, regex, négation, dossiers seulement)
+IgnoreRule = Tuple[str, re.Pattern, bool, bool]
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Traduit un motif glob au format .gitignore en expression régulière."""
+    i, n, out = 0, len(pattern), []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                # `**/` : zéro, un ou plusieurs dossiers.
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                content = pattern[i + 1:j]
+                if content.startswith('!'):
+                    content = '^' + content[1:]
+                out.append(f'[{content}]')
+                i = j + 1
+                continue
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def parse_ignore_patterns(lines: Iterable[str], base: str = '') -> List[IgnoreRule]:
     """
-    Parcourt un répertoire, identifie les modules Odoo et liste leurs fichiers.
+    Compile des motifs au format .gitignore.
+
+    Args:
+        lines: Les motifs, un par ligne (commentaires et lignes vides ignorés).
+        base: Le dossier (relatif à la racine du parcours) auquel les motifs s'appliquent.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip()
+        if not line or line.startswith('#'):
+            continue
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+
+        # Un motif contenant un '/' est ancré au dossier du .gitignore,
+        # sinon il s'applique à n'importe quel niveau.
+        anchored = '/' in line
+        regex = _glob_to_regex(line.lstrip('/'))
+        if not anchored:
+            regex = '(?:.*/)?' + regex
+        rules.append((base, re.compile(regex), negate, dir_only))
+    return rules
+
+
+def _read_gitignore(directory: str, base: str) -> List[IgnoreRule]:
+    try:
+        with open(os.path.join(directory, GITIGNORE_FILE_NAME), 'r', encoding='utf-8') as f:
+            return parse_ignore_patterns(f, base)
+    except (OSError, UnicodeDecodeError):
+        return []
+
+
+def is_ignored(rel_path: str, is_dir: bool, rules: List[IgnoreRule]) -> bool:
+    """Applique les règles dans l'ordre : comme pour git, la dernière qui correspond l'emporte."""
+    ignored = False
+    for base, regex, negate, dir_only in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel_path.startswith(base + '/'):
+                continue
+            candidate = rel_path[len(base) + 1:]
+        else:
+            candidate = rel_path
+        if regex.fullmatch(candidate):
+            ignored = not negate
+    return ignored
+
+
+def _find_git_root(path: str) -> Optional[str]:
+    current = path
+    while True:
+        if os.path.exists(os.path.join(current, '.git')):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _join(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def iter_odoo_files(
+    project_path: str,
+    extensions: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+    use_gitignore: bool = True,
+    on_module: Optional[Callable[[str], None]] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """
+    Parcourt paresseusement un répertoire, identifie les modules Odoo et produit leurs fichiers.
+
+    Le parcours repose sur `os.scandir` et ne descend pas dans les dossiers exclus,
+    cachés ou `__pycache__`. Les fichiers sont produits au fil de l'eau, dans un
+    ordre stable (tri par nom), ce qui permet de les analyser sans attendre la
+    fin de la découverte.
 
     Args:
         project_path: Le chemin du répertoire des addons à analyser.
+        extensions: Si fourni, seuls les fichiers ayant une de ces extensions (ex: '.py') sont produits.
+        exclude: Motifs au format .gitignore, relatifs à `project_path`, à ignorer.
+        use_gitignore: Respecte les fichiers .gitignore du dépôt.
+        on_module: Appelé avec le nom de chaque module découvert.
+
+    Yields:
+        Des tuples (nom_du_module, chemin_complet_du_fichier, chemin_relatif_du_fichier)
+    """
+    project_path = os.path.abspath(project_path)
+    suffixes = tuple(extensions) if extensions is not None else None
+
+    # Les chemins utilisés pour les règles sont relatifs à la racine du dépôt git,
+    # pour que les .gitignore situés au-dessus de `project_path` s'appliquent aussi.
+    root = (_find_git_root(project_path) if use_gitignore else None) or project_path
+    project_rel = os.path.relpath(project_path, root).replace(os.sep, '/')
+    project_rel = '' if project_rel == '.' else project_rel
+
+    rules: List[IgnoreRule] = []
+    if use_gitignore and project_rel:
+        current, base = root, ''
+        for part in project_rel.split('/'):
+            rules = rules + _read_gitignore(current, base)
+            current, base = os.path.join(current, part), _join(base, part)
+    if exclude:
+        rules = rules + parse_ignore_patterns(exclude, project_rel)
+
+    # Pile de (dossier, chemin relatif à la racine, règles actives, module courant).
+    stack = [(project_path, project_rel, rules, None)]
+    while stack:
+        directory, rel_dir, dir_rules, module_name = stack.pop()
+        if use_gitignore:
+            dir_rules = dir_rules + _read_gitignore(directory, rel_dir)
+
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        # Si on trouve un manifest, on sait qu'on est à la racine d'un module.
+        # Comme avant, un module imbriqué dans un autre est rattaché au module parent.
+        if module_name is None and any(e.name == MANIFEST_FILE_NAME for e in entries):
+            module_name = os.path.basename(directory)
+            if on_module is not None:
+                on_module(module_name)
+
+        sub_dirs = []
+        for entry in entries:
+            # On ignore les fichiers et dossiers cachés ou les dossiers de cache
+            if entry.name.startswith('.') or entry.name == '__pycache__':
+                continue
+            rel_path = _join(rel_dir, entry.name)
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+
+            if is_dir:
+                if not is_ignored(rel_path, True, dir_rules):
+                    sub_dirs.append((entry.path, rel_path, dir_rules, module_name))
+            elif is_file and module_name is not None:
+                if suffixes is not None and not entry.name.endswith(suffixes):
+                    continue
+                if is_ignored(rel_path, False, dir_rules):
+                    continue
+                yield module_name, entry.path, os.path.relpath(entry.path, project_path)
+
+        # La pile est LIFO : on empile à l'envers pour parcourir les dossiers dans l'ordre alphabétique.
+        stack.extend(reversed(sub_dirs))
+
+
+def _git(project_path: str, *args: str) -> str:
+    """
+    Exécute une commande git dans `project_path` et renvoie sa sortie.
+
+    Raises:
+        ValueError: Si git est absent ou si la commande échoue (pas de dépôt, révision inconnue...).
+    """
+    import subprocess
+
+    command = ['git', *args]
+    try:
+        result = subprocess.run(command, cwd=project_path, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise ValueError("git is required to audit only the files changed since a revision.")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(e.stderr.decode('utf-8', 'replace').strip() or f"'{' '.join(command)}' failed.")
+    return result.stdout.decode('utf-8')
+
+
+def git_merge_base(project_path: str, ref: str) -> str:
+    """
+    Commit de base d'un audit partiel : le dernier ancêtre commun de `ref` et de HEAD
+    (`git merge-base`). Pour une branche, c'est le point où elle a quitté `ref`.
+
+    Raises:
+        ValueError: Voir `_git`, ou si `ref` n'a pas d'ancêtre commun avec HEAD.
+    """
+    if not ref or ref.startswith('-'):
+        raise ValueError(f"Invalid git revision: {ref!r}")
+    return _git(project_path, 'merge-base', ref, 'HEAD').strip()
+
+
+def git_clean_head(project_path: str, extensions: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Commit HEAD du dépôt de `project_path`, si l'audit porte exactement sur ce
+    commit : aucun fichier suivi n'est modifié, et aucun fichier non suivi ne
+    serait analysé. None sinon, ou hors d'un dépôt git.
+
+    Les fichiers non suivis que la découverte ignore ne comptent pas : fichiers
+    ignorés par git, cachés (dont le cache et la boîte d'envoi de l'agent,
+    `.odoo-auditor-cache/`) ou sans une des `extensions` analysées (ex: le
+    rapport JSON enregistré par un audit précédent).
+    """
+    suffixes = tuple(extensions) if extensions is not None else None
+    try:
+        if _git(project_path, 'status', '--porcelain', '-z', '--untracked-files=no', '--', '.'):
+            return None
+        untracked = _git(project_path, 'ls-files', '--others', '--exclude-standard', '-z', '--', '.')
+        for path in untracked.split('\0'):
+            parts = path.split('/')
+            if (path and not any(part.startswith('.') or part == '__pycache__' for part in parts)
+                    and (suffixes is None or parts[-1].endswith(suffixes))):
+                return None
+        return _git(project_path, 'rev-parse', 'HEAD').strip()
+    except ValueError:
+        return None
+
+
+def git_changed_files(project_path: str, ref: str) -> List[str]:
+    """
+    Liste les fichiers de `project_path` touchés depuis la révision git `ref`.
+
+    Ce sont les fichiers ajoutés, modifiés ou supprimés (`git diff --name-only
+    --no-renames` : un renommage compte comme une suppression et un ajout),
+    modifications non commitées comprises, ainsi que les fichiers non suivis
+    qui ne sont pas ignorés par git.
+
+    Returns:
+        Les chemins relatifs à `project_path`, triés et sans doublon.
+
+    Raises:
+        ValueError: Si git est absent, si `project_path` n'est pas dans un dépôt
+            ou si la révision `ref` est inconnue.
+    """
+    if not ref or ref.startswith('-'):
+        raise ValueError(f"Invalid git revision: {ref!r}")
+    outputs = [
+        _git(project_path, 'diff', '--name-only', '--no-renames', '--relative', '-z', ref, '--', '.'),
+        _git(project_path, 'ls-files', '--others', '--exclude-standard', '-z', '--', '.'),
+    ]
+    paths = {path for output in outputs for path in output.split('\0') if path}
+    return sorted(os.path.normpath(path) for path in paths)
+
+
+def iter_changed_files(
+    project_path: str,
+    changed_paths: Iterable[str],
+    extensions: Optional[Iterable[str]] = None,
+    exclude: Optional[Iterable[str]] = None,
+    on_module: Optional[Callable[[str], None]] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """
+    Variante de `iter_odoo_files` limitée à une liste de fichiers (audit partiel,
+    voir `git_changed_files`).
+
+    Les fichiers supprimés, cachés, exclus ou hors d'un module Odoo sont ignorés.
+    Comme dans `iter_odoo_files`, un fichier est rattaché au module le plus haut
+    qui le contient.
+
+    Args:
+        project_path: Le chemin du répertoire des addons.
+        changed_paths: Les fichiers à analyser, relatifs à `project_path`.
+        extensions, exclude, on_module: Voir `iter_odoo_files`.
+
+    Yields:
+        Des tuples (nom_du_module, chemin_complet_du_fichier, chemin_relatif_du_fichier)
+    """
+    project_path = os.path.abspath(project_path)
+    suffixes = tuple(extensions) if extensions is not None else None
+    rules = parse_ignore_patterns(exclude) if exclude else []
+    is_module_dir = {}
+    seen_modules = set()
+
+    for changed_path in changed_paths:
+        parts = changed_path.replace(os.sep, '/').split('/')
+        if any(part.startswith('.') or part == '__pycache__' for part in parts):
+            continue
+        if suffixes is not None and not parts[-1].endswith(suffixes):
+            continue
+        full_path = os.path.join(project_path, *parts)
+        if not os.path.isfile(full_path):
+            continue
+        if is_ignored('/'.join(parts), False, rules) or any(
+            is_ignored('/'.join(parts[:depth]), True, rules) for depth in range(1, len(parts))
+        ):
+            continue
+
+        module_name = None
+        for depth in range(len(parts)):
+            directory = os.path.join(project_path, *parts[:depth])
+            if directory not in is_module_dir:
+                is_module_dir[directory] = os.path.isfile(os.path.join(directory, MANIFEST_FILE_NAME))
+            if is_module_dir[directory]:
+                module_name = os.path.basename(directory)
+                break
+        if module_name is None:
+            continue
+
+        if on_module is not None and module_name not in seen_modules:
+            seen_modules.add(module_name)
+            on_module(module_name)
+        yield module_name, full_path, os.path.relpath(full_path, project_path)
+
+
+def find_odoo_modules(project_path: str, **kwargs) -> List[Tuple[str, str, str]]:
+    """
+    Parcourt un répertoire, identifie les modules Odoo et liste leurs fichiers.
+
+    Version matérialisée de `iter_odoo_files`, qui accepte les mêmes options.
 
     Returns:
         Une liste de tuples. Chaque tuple contient:
         (nom_du_module, chemin_complet_du_fichier, chemin_relatif_du_fichier)
     """
-    all_files = []
-    
-    for root, dirs, files in os.walk(project_path):
-        # Si on trouve un manifest, on sait qu'on est à la racine d'un module.
-        if '__manifest__.py' in files:
-            module_name = os.path.basename(root)
-            print(f"  -> Discovered module: {module_name}")
-            
-            # On parcourt à nouveau ce dossier de module pour lister tous ses fichiers.
-            for sub_root, _, sub_files in os.walk(root):
-                for file_name in sub_files:
-                    # On ignore les fichiers cachés ou les fichiers de cache
-                    if file_name.startswith('.') or '__pycache__' in sub_root:
-                        continue
-                        
-                    file_path = os.path.join(sub_root, file_name)
-                    relative_path = os.path.relpath(file_path, project_path)
-                    all_files.append((module_name, file_path, relative_path))
-            
-            # On empêche os.walk de descendre dans les sous-dossiers qui 
-            # pourraient aussi être des modules (cas rare mais possible).
-            dirs[:] = [] 
-
-    return all_files
\ No newline at end of file
+    return list(iter_odoo_files(project_path, **kwargs))
@@ -0,0 +1,198 @@
+# auditor/engine.py
+import ast
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from .checkers.base_checker import BaseChecker, BasePythonChecker, BaseXMLChecker
+from .report import Issue
+
+
+class TokenPrefilter:
+    """
+    Pré-filtre textuel : décide, sans parser, si un fichier peut déclencher une règle.
+
+    Les `TRIGGER_TOKENS` de tous les checkers sont fusionnés en une seule
+    expression régulière sur octets, ce qui permet un unique balayage du
+    contenu brut. Si un seul checker ne déclare aucun jeton, le filtre est
+    désactivé : ce checker doit pouvoir s'exécuter sur tous les fichiers.
+    """
+
+    def __init__(self, checkers: List[BaseChecker]):
+        self.pattern: Optional[re.Pattern] = None
+        if checkers and all(c.TRIGGER_TOKENS for c in checkers):
+            tokens = sorted({t.encode('utf-8') for c in checkers for t in c.TRIGGER_TOKENS})
+            self.pattern = re.compile(b"|".join(re.escape(t) for t in tokens))
+
+    def may_match(self, content: bytes) -> bool:
+        """Retourne False seulement si aucune règle ne peut se déclencher sur ce contenu."""
+        return self.pattern is None or self.pattern.search(content) is not None
+
+
+class PythonRuleEngine:
+    """
+    Applique un ensemble de checkers Python à un arbre AST en un seul parcours.
+
+    Les checkers qui déclarent `NODE_TYPES` sont indexés par type de nœud :
+    l'arbre n'est parcouru qu'une fois et chaque nœud n'est transmis qu'aux
+    checkers qui s'y intéressent. Les autres checkers (qui surchargent
+    seulement `check()`) sont appelés tels quels, en repli.
+    """
+
+    def __init__(self, checkers: List[BasePythonChecker]):
+        self.checkers = list(checkers)
+        self.dispatch_checkers = [c for c in self.checkers if c.NODE_TYPES]
+        self.fallback_checkers = [c for c in self.checkers if not c.NODE_TYPES]
+        self.prefilter = TokenPrefilter(self.checkers)
+        # Cache type de nœud concret -> checkers intéressés, rempli à la volée
+        # pour gérer les checkers qui déclarent une classe de base (ex: ast.stmt).
+        self._handlers: Dict[type, Tuple[BasePythonChecker, ...]] = {}
+        # `audit --profile` : chaque appel de règle est chronométré (voir `profiling.Profiler`).
+        self.profiler = None
+
+    def __len__(self):
+        return len(self.checkers)
+
+    def _handlers_for(self, node_type: type) -> Tuple[BasePythonChecker, ...]:
+        handlers = self._handlers.get(node_type)
+        if handlers is None:
+            handlers = tuple(
+                c for c in self.dispatch_checkers if issubclass(node_type, c.NODE_TYPES)
+            )
+            self._handlers[node_type] = handlers
+        return handlers
+
+    def run(self, ast_tree: ast.AST, file_path: str, module_name: str) -> List[Issue]:
+        """Retourne les issues de tous les checkers, regroupées dans l'ordre des checkers."""
+        found: Dict[int, List[Issue]] = {id(c): [] for c in self.checkers}
+        profiler = self.profiler
+
+        if self.dispatch_checkers:
+            for node in ast.walk(ast_tree):
+                for checker in self._handlers_for(type(node)):
+                    if profiler is None:
+                        found[id(checker)].extend(checker.visit(node, file_path, module_name))
+                    else:
+                        found[id(checker)].extend(
+                            _profiled_call(profiler, checker, checker.visit, node, file_path, module_name)
+                        )
+
+        for checker in self.fallback_checkers:
+            if profiler is None:
+                found[id(checker)].extend(checker.check(ast_tree, file_path, module_name))
+            else:
+                found[id(checker)].extend(
+                    _profiled_call(profiler, checker, checker.check, ast_tree, file_path, module_name)
+                )
+
+        return [issue for checker in self.checkers for issue in found[id(checker)]]
+
+
+# Balise `TAGS` qui sélectionne tous les éléments du document.
+WILDCARD_TAG = '*'
+
+
+class XMLRuleEngine:
+    """
+    Applique un ensemble de checkers XML à un document en limitant les parcours.
+
+    Les expressions XPath des règles sont compilées une seule fois, à la
+    construction du moteur. Les règles qui déclarent `TAGS` sont évaluées
+    ensemble en un seul parcours `iter()` restreint à leurs balises ; celles qui
+    ne déclarent qu'un `XPATH` exécutent leur requête précompilée, et celles qui
+    surchargent seulement `check()` sont appelées telles quelles, en repli.
+    Une règle qui déclare `'*'` dans ses `TAGS` visite tous les éléments
+    (jamais les commentaires ni les instructions de traitement).
+    """
+
+    def __init__(self, checkers: List[BaseXMLChecker]):
+        self.checkers = list(checkers)
+        self.tag_checkers: Dict[str, List[Tuple[BaseXMLChecker, Optional[etree.XPath]]]] = {}
+        self.xpath_checkers: List[Tuple[BaseXMLChecker, etree.XPath]] = []
+        self.fallback_checkers: List[BaseXMLChecker] = []
+
+        for checker in self.checkers:
+            if checker.TAGS:
+                condition = etree.XPath(f"boolean({checker.CONDITION})") if checker.CONDITION else None
+                # Avec '*', les autres balises de la règle sont redondantes : elle ne visite chaque élément qu'une fois.
+                for tag in (WILDCARD_TAG,) if WILDCARD_TAG in checker.TAGS else checker.TAGS:
+                    self.tag_checkers.setdefault(tag, []).append((checker, condition))
+            elif checker.XPATH:
+                self.xpath_checkers.append((checker, etree.XPath(checker.XPATH)))
+            else:
+                self.fallback_checkers.append(checker)
+
+        self.tags = (WILDCARD_TAG,) if WILDCARD_TAG in self.tag_checkers else tuple(self.tag_checkers)
+        self.wildcard_checkers = self.tag_checkers.get(WILDCARD_TAG, [])
+        self.prefilter = TokenPrefilter(self.checkers)
+        self.profiler = None
+
+    def __len__(self):
+        return len(self.checkers)
+
+    def run(self, xml_tree, file_path: str, module_name: str) -> List[Issue]:
+        """Retourne les issues de tous les checkers, regroupées dans l'ordre des checkers."""
+        found: Dict[int, List[Issue]] = {id(c): [] for c in self.checkers}
+        profiler = self.profiler
+
+        if self.tags:
+            # Un seul parcours du document, limité aux balises qui intéressent au moins une règle.
+            for element in xml_tree.iter(*self.tags):
+                if not isinstance(element.tag, str):
+                    continue  # Commentaire ou instruction de traitement.
+                handlers = self.tag_checkers.get(element.tag, [])
+                if self.wildcard_checkers:
+                    handlers = handlers + self.wildcard_checkers
+                for checker, condition in handlers:
+                    if profiler is None:
+                        if condition is None or condition(element):
+                            found[id(checker)].extend(checker.visit(element, file_path, module_name))
+                    else:
+                        found[id(checker)].extend(
+                            _profiled_call(profiler, checker, _visit_if, checker, condition, element,
+                                           file_path, module_name)
+                        )
+
+        for checker, xpath in self.xpath_checkers:
+            if profiler is None:
+                for element in xpath(xml_tree):
+                    found[id(checker)].extend(checker.visit(element, file_path, module_name))
+            else:
+                found[id(checker)].extend(
+                    _profiled_call(profiler, checker, _visit_xpath, checker, xpath, xml_tree, file_path, module_name)
+                )
+
+        for checker in self.fallback_checkers:
+            if profiler is None:
+                found[id(checker)].extend(checker.check(xml_tree, file_path, module_name))
+            else:
+                found[id(checker)].extend(
+                    _profiled_call(profiler, checker, checker.check, xml_tree, file_path, module_name)
+                )
+
+        return [issue for checker in self.checkers for issue in found[id(checker)]]
+
+
+def _profiled_call(profiler, checker: BaseChecker, func, *args) -> List[Issue]:
+    """Appelle une règle en comptant son temps et ses issues sous `rule:<ISSUE_CODE>`."""
+    start = time.perf_counter()
+    issues = func(*args)
+    profiler.add(f"rule:{checker.ISSUE_CODE}", time.perf_counter() - start)
+    profiler.issues[checker.ISSUE_CODE] += len(issues)
+    return issues
+
+
+def _visit_if(checker: BaseXMLChecker, condition, element, file_path: str, module_name: str) -> List[Issue]:
+    # La condition XPath fait partie du coût de la règle.
+    if condition is None or condition(element):
+        return checker.visit(element, file_path, module_name)
+    return []
+
+
+def _visit_xpath(checker: BaseXMLChecker, xpath, xml_tree, file_path: str, module_name: str) -> List[Issue]:
+    issues = []
+    for element in xpath(xml_tree):
+        issues.extend(checker.visit(element, file_path, module_name))
+    return issues
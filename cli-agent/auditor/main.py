@@ -1,9 +1,13 @@
 # main.py
 import click
+import json
 import sys
 import os
-from auditor import run
-import yaml
+import time
+from auditor.cache import DEFAULT_CACHE_DIR
+
+# Les autres modules de l'agent (et leurs dépendances : requests, lxml, tqdm...)
+# sont importés dans les commandes qui s'en servent, pour que `--help` reste instantané.
 
 
 CONFIG_FILE_NAME = ".odoo-auditor.yml"
@@ -11,6 +15,8 @@ CONFIG_FILE_NAME = ".odoo-auditor.yml"
 def load_config() -> dict:
     """Cherche et charge le fichier de configuration .odoo-auditor.yml."""
     if os.path.exists(CONFIG_FILE_NAME):
+        import yaml
+
         try:
             with open(CONFIG_FILE_NAME, 'r') as f:
                 return yaml.safe_load(f) or {}
@@ -50,12 +56,64 @@ def cli():
 @click.option(
     '--output-file',
     type=click.Path(dir_okay=False, writable=True), # Doit être un fichier inscriptible
-    help="Save the audit report to a local JSON file instead of submitting it."
+    help="Save the audit report to a local JSON file (it is only submitted if an API key is also given)."
+)
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    help="Number of worker processes used to analyze files (defaults to the CPU count, 1 disables multiprocessing)."
+)
+@click.option(
+    '--no-cache',
+    is_flag=True,
+    help="Disable the incremental cache and re-analyze every file."
+)
+@click.option(
+    '--cache-dir',
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    help="Directory of the incremental audit cache (defaults to .odoo-auditor-cache)."
+)
+@click.option(
+    '--changed-since',
+    metavar='REF',
+    help="Only audit the files changed since the merge base of this git revision and HEAD (e.g. origin/main); "
+         "the server carries the other files' issues forward from its analysis of that commit, "
+         "which must have been audited with a clean working tree."
+)
+@click.option(
+    '--outbox-dir',
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    help="Directory where reports that could not be submitted are kept (defaults to <cache-dir>/outbox)."
 )
-def audit(path, api_key, from_version, to_version, output_file):
+@click.option(
+    '--profile',
+    is_flag=True,
+    help="Measure time and call counts per stage and per rule, the slowest files and the peak memory."
+)
+@click.option(
+    '--profile-output',
+    type=click.Path(dir_okay=False, writable=True),
+    help="JSON file of the --profile results (defaults to <cache-dir>/profile.json)."
+)
+@click.option(
+    '--profile-top',
+    type=click.IntRange(min=0),
+    default=10,
+    show_default=True,
+    help="Number of slowest files listed by --profile."
+)
+@click.option(
+    '--profile-pstats',
+    type=click.Path(dir_okay=False, writable=True),
+    help="Also run the audit under cProfile and dump the pstats data to this file (main process only)."
+)
+def audit(path, api_key, from_version, to_version, output_file, jobs, no_cache, cache_dir, changed_since,
+          outbox_dir, profile, profile_output, profile_top, profile_pstats):
     """
     Run a migration audit on a given addons directory.
     """
+    from auditor import outbox, run
+
     config = load_config()
 
     # --- Logique de fusion : Ligne de commande > Fichier de config > Défaut ---
@@ -64,6 +122,11 @@ def audit(path, api_key, from_version, to_version, output_file):
     final_from = from_version or config.get('from_version', 16.0)
     final_to = to_version or config.get('to_version', 17.0)
     final_output = output_file or config.get('output_file')
+    final_jobs = jobs or config.get('jobs') or os.cpu_count()
+    final_use_cache = not no_cache and config.get('cache', True)
+    final_cache_dir = cache_dir or config.get('cache_dir', DEFAULT_CACHE_DIR)
+    final_exclude = config.get('exclude') or []
+    final_outbox_dir = outbox_dir or config.get('outbox_dir')
 
     if not final_path:
         raise click.UsageError("Missing option '--path'. Provide it via command line or config file.")
@@ -74,22 +137,241 @@ def audit(path, api_key, from_version, to_version, output_file):
     click.echo(f"Starting audit for migration from v{final_from} to v{final_to}...")
     click.echo(f"Analyzing addons at: {final_path}")
 
+    profiler = None
+    if profile:
+        from auditor.profiling import Profiler
+        profiler = Profiler()
+    cprofile = None
+    if profile_pstats:
+        import cProfile
+        cprofile = cProfile.Profile()
+    started = time.perf_counter()
+
     try:
+        if cprofile is not None:
+            cprofile.enable()
         # C'est ici qu'on appelle la logique principale de notre application.
         # Pour l'instant, on passe juste les arguments.
         # La fonction run.start_audit n'existe pas encore, on la créera plus tard.
-        run.start_audit(final_path, final_api_key, final_from, final_to, final_output)
+        run.start_audit(final_path, final_api_key, final_from, final_to, final_output, jobs=final_jobs,
+                        use_cache=final_use_cache, cache_dir=final_cache_dir, exclude=final_exclude,
+                        outbox_dir=final_outbox_dir, profiler=profiler, changed_since=changed_since)
 
-        if final_output:
-            click.secho(f"\nAudit completed and submitted successfully! Report saved to {output_file}", fg="green")
+        if final_output and final_api_key:
+            click.secho(f"\nAudit completed and submitted successfully! Report saved to {final_output}", fg="green")
+        elif final_output:
+            click.secho(f"\nAudit completed successfully! Report saved to {final_output}", fg="green")
         else:
             click.secho("\nAudit completed and submitted successfully!", fg="green")
 
+    except outbox.ReportSpooled as e:
+        # L'analyse est terminée : seul l'envoi a échoué, il sera repris par `flush`.
+        click.secho(f"\nAudit completed, but the report could not be submitted: {e.cause}", fg="yellow")
+        click.secho(f"It was saved to {e.path}. Run 'odoo-auditor flush' to submit it later.", fg="yellow")
+
     except Exception as e:
         # On attrape toutes les erreurs potentielles pour un affichage propre.
         click.secho(f"\nAn unexpected error occurred: {e}", fg="red", err=True)
         sys.exit(1)
 
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(profile_pstats)
+            click.echo(f"cProfile data saved to {profile_pstats} (open it with `python -m pstats`).")
+        if profiler is not None:
+            _report_profile(profiler, time.perf_counter() - started, final_jobs, profile_top,
+                            profile_output or os.path.join(final_cache_dir, "profile.json"))
+
+
+def _report_profile(profiler, wall_seconds: float, jobs: int, top_files: int, output_path: str):
+    """Affiche le tableau de `--profile` et enregistre le détail en JSON."""
+    from auditor.profiling import format_report, write_report
+
+    report = profiler.report(wall_seconds, top_files=top_files, jobs=jobs)
+    click.echo("\nProfile:\n" + format_report(report))
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_report(report, output_path)
+    click.echo(f"\nProfile saved to {output_path}")
+
+
+@cli.command()
+@click.option(
+    '--path',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    help="The path to the Odoo custom addons directory to watch."
+)
+@click.option('--from-version', type=float, help="Odoo source version (e.g., 16.0).")
+@click.option('--to-version', type=float, help="Odoo target version (e.g., 17.0).")
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    help="Number of worker processes used for the initial scan (defaults to the CPU count)."
+)
+@click.option('--no-cache', is_flag=True, help="Do not use the incremental cache for the initial scan.")
+@click.option(
+    '--cache-dir',
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    help="Directory of the incremental audit cache (defaults to .odoo-auditor-cache)."
+)
+@click.option('--polling', is_flag=True, help="Poll the files for changes instead of using inotify.")
+@click.option(
+    '--poll-interval',
+    type=click.FloatRange(min=0.05),
+    default=1.0,
+    show_default=True,
+    help="Seconds between two checks when polling."
+)
+@click.option(
+    '--api-key',
+    type=str,
+    help="Also push the results to the Odoo Auditor platform: a full report first, then only the changes."
+)
+@click.option(
+    '--push-interval',
+    type=click.FloatRange(min=1),
+    default=30.0,
+    show_default=True,
+    help="Minimum number of seconds between two pushes (with --api-key)."
+)
+def watch(path, from_version, to_version, jobs, no_cache, cache_dir, polling, poll_interval, api_key, push_interval):
+    """
+    Watch an addons directory and re-check the files as they are saved.
+    """
+    from auditor import watch as watch_mode
+    from auditor.cache import AuditCache
+
+    config = load_config()
+    final_path = path or config.get('path')
+    final_api_key = api_key or config.get('api_key')
+    final_from = from_version or config.get('from_version', 16.0)
+    final_to = to_version or config.get('to_version', 17.0)
+    final_jobs = jobs or config.get('jobs') or os.cpu_count()
+    final_use_cache = not no_cache and config.get('cache', True)
+    final_cache_dir = cache_dir or config.get('cache_dir', DEFAULT_CACHE_DIR)
+    if not final_path:
+        raise click.UsageError("Missing option '--path'. Provide it via command line or config file.")
+
+    if final_api_key:
+        from auditor import api_client
+        try:
+            api_client.get_submissions_url()
+        except ValueError as e:
+            raise click.UsageError(str(e))
+
+    click.echo(f"Loading the audit rules for migration from v{final_from} to v{final_to}...")
+    session = watch_mode.WatchSession(final_path, final_from, final_to, exclude=config.get('exclude') or [])
+    if not session.checkers:
+        click.echo("No audit rules are relevant for this migration path. Exiting.")
+        return
+
+    click.echo(f"Initial scan of {session.path}...")
+    audit_cache = AuditCache(final_cache_dir, session.checkers) if final_use_cache else None
+    try:
+        session.scan(jobs=final_jobs, audit_cache=audit_cache)
+    finally:
+        if audit_cache is not None:
+            audit_cache.close()
+    click.echo(watch_mode.format_module_counts(session))
+
+    watcher = watch_mode.make_watcher(session, polling=polling, poll_interval=poll_interval)
+    pusher = watch_mode.DeltaPusher(session, final_api_key, push_interval) if final_api_key else None
+    click.secho(f"\nWatching {session.path} ({type(watcher).__name__}). Press Ctrl+C to stop.", fg="green")
+    try:
+        watch_mode.watch(session, watcher, pusher,
+                         on_update=lambda update: click.echo(watch_mode.format_update(update, session)))
+    except KeyboardInterrupt:
+        click.echo("\nStopped watching.")
+    finally:
+        watcher.close()
+
+
+@cli.command()
+@click.option(
+    '--outbox-dir',
+    type=click.Path(file_okay=False, dir_okay=True),
+    help="Directory of the spooled reports (defaults to <cache-dir>/outbox)."
+)
+@click.option(
+    '--cache-dir',
+    type=click.Path(file_okay=False, dir_okay=True),
+    help="Directory of the incremental audit cache (defaults to .odoo-auditor-cache)."
+)
+@click.option(
+    '--api-key',
+    type=str,
+    help="API key of the project to submit to (defaults to the config file, then $AUDITOR_API_KEY). "
+         "API keys are never saved with the spooled reports."
+)
+def flush(outbox_dir, cache_dir, api_key):
+    """
+    Submit the reports that could not be submitted by previous audits.
+    """
+    from auditor import outbox
+
+    config = load_config()
+    final_cache_dir = cache_dir or config.get('cache_dir', DEFAULT_CACHE_DIR)
+    final_outbox_dir = outbox_dir or config.get('outbox_dir') or os.path.join(final_cache_dir, "outbox")
+
+    pending = outbox.iter_reports(final_outbox_dir)
+    if not pending:
+        click.echo("No spooled reports to submit.")
+        return
+    final_api_key = api_key or config.get('api_key') or os.getenv('AUDITOR_API_KEY')
+    if not final_api_key:
+        raise click.UsageError(
+            "An API key is required: use --api-key, set api_key in the config file or AUDITOR_API_KEY."
+        )
+    click.echo(f"Submitting {len(pending)} spooled report(s) from {final_outbox_dir}...")
+
+    result = outbox.flush(final_outbox_dir, final_api_key)
+
+    if result.locked:
+        click.secho("Another flush is already in progress.", fg="yellow")
+        sys.exit(1)
+    if result.sent:
+        click.secho(f"\nSubmitted {len(result.sent)} report(s).", fg="green")
+    for path in result.rejected:
+        click.secho(f"The server rejected {path}; it was kept in the outbox.", fg="red", err=True)
+    if result.other_key:
+        click.secho(
+            f"{len(result.other_key)} report(s) were saved for another API key; run flush again with that key.",
+            fg="yellow", err=True,
+        )
+    if result.remaining:
+        click.secho(f"{result.remaining} report(s) could not be submitted, try again later.", fg="yellow", err=True)
+    if result.rejected or result.other_key or result.remaining:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    '--format', 'output_format',
+    type=click.Choice(['table', 'json']),
+    default='table',
+    help="Output format. 'json' can be loaded into the backend with 'manage.py load_issue_types'."
+)
+def rules(output_format):
+    """
+    List the metadata of every available rule.
+    """
+    from auditor import registry
+
+    # Lu depuis l'index des checkers : aucun module de règles n'est importé.
+    metadata = registry.rule_metadata(registry.load_index())
+
+    if output_format == 'json':
+        click.echo(json.dumps(metadata, indent=4))
+        return
+
+    for rule in metadata:
+        click.echo(
+            f"{rule['issue_code']:<10} {rule['severity']:<9} v{rule['version']:<3} "
+            f"{rule['applies_from_version']}-{rule['applies_to_version']}  {rule['description']}"
+        )
+
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
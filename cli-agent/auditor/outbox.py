@@ -0,0 +1,216 @@
+# auditor/outbox.py
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from .cache import DEFAULT_CACHE_DIR
+from .report import IssueSpool
+
+# Rapports qui n'ont pas pu être envoyés, en attente d'un `odoo-auditor flush`.
+DEFAULT_OUTBOX_DIR = os.path.join(DEFAULT_CACHE_DIR, "outbox")
+
+REPORT_SUFFIX = ".ndjson.gz"
+METADATA_SUFFIX = ".meta.json"
+MANIFEST_SUFFIX = ".manifest.json"
+LOCK_FILE_NAME = ".flush.lock"
+
+# Un verrou plus ancien que ça a été laissé par un processus interrompu.
+STALE_LOCK_SECONDS = 3600
+
+
+class ReportSpooled(Exception):
+    """Le rapport n'a pas pu être envoyé : il a été mis en attente dans la boîte d'envoi."""
+
+    def __init__(self, path: str, cause: Exception):
+        super().__init__(f"{cause} (report spooled to {path})")
+        self.path = path
+        self.cause = cause
+
+
+@dataclass
+class FlushResult:
+    """Bilan d'un vidage de la boîte d'envoi."""
+    sent: List[str] = field(default_factory=list)
+    rejected: List[str] = field(default_factory=list)
+    # Rapports d'un autre projet (autre clé d'API) : laissés dans la boîte d'envoi.
+    other_key: List[str] = field(default_factory=list)
+    remaining: int = 0
+    locked: bool = False
+
+
+def api_key_digest(api_key: str) -> str:
+    """
+    Identifie la clé d'API d'un rapport sans la stocker : la clé n'est jamais
+    écrite sur disque, elle est redonnée à `flush`.
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def _write_private(path: str, data: dict):
+    """Écrit un fichier JSON lisible par son seul propriétaire."""
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def save_report(issues: IssueSpool, api_key: str, outbox_dir: str = DEFAULT_OUTBOX_DIR,
+                metadata: Optional[dict] = None, manifest_path: Optional[str] = None) -> str:
+    """
+    Copie le rapport (NDJSON gzip, tel que produit par l'analyse) dans la boîte d'envoi.
+
+    Le rapport est écrit avant ses métadonnées : un rapport sans fichier de
+    métadonnées (copie interrompue) n'est jamais envoyé. Si `manifest_path`
+    désigne le manifeste d'un envoi interrompu, il suit le rapport : le vidage
+    reprendra cet envoi au lieu d'en ouvrir un nouveau. Les métadonnées ne
+    contiennent rien de secret : seule une empreinte de `api_key` est conservée.
+
+    Returns:
+        Le chemin du rapport mis en attente.
+    """
+    os.makedirs(outbox_dir, exist_ok=True)
+    # Le nom commence par la date : l'ordre alphabétique est l'ordre des analyses.
+    name = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+    report_path = os.path.join(outbox_dir, name + REPORT_SUFFIX)
+
+    tmp_path = f"{report_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        shutil.copyfileobj(issues.compressed_file(), f)
+    os.replace(tmp_path, report_path)
+
+    if manifest_path and os.path.exists(manifest_path):
+        os.replace(manifest_path, os.path.join(outbox_dir, name + MANIFEST_SUFFIX))
+
+    _write_private(os.path.join(outbox_dir, name + METADATA_SUFFIX), {
+        **(metadata or {}),
+        "api_key_digest": api_key_digest(api_key),
+        "issues_count": len(issues),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return report_path
+
+
+def iter_reports(outbox_dir: str = DEFAULT_OUTBOX_DIR) -> List[str]:
+    """Liste les rapports en attente (chemins sans suffixe), du plus ancien au plus récent."""
+    try:
+        names = os.listdir(outbox_dir)
+    except FileNotFoundError:
+        return []
+    reports = []
+    for name in sorted(names):
+        if name.endswith(METADATA_SUFFIX):
+            base = os.path.join(outbox_dir, name[:-len(METADATA_SUFFIX)])
+            if os.path.exists(base + REPORT_SUFFIX):
+                reports.append(base)
+    return reports
+
+
+def _acquire_lock(outbox_dir: str) -> Optional[int]:
+    """Verrou exclusif de la boîte d'envoi, pour qu'un rapport ne soit jamais envoyé deux fois."""
+    path = os.path.join(outbox_dir, LOCK_FILE_NAME)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < STALE_LOCK_SECONDS:
+                    return None
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        return fd
+    return None
+
+
+def _release_lock(outbox_dir: str, fd: int):
+    os.close(fd)
+    try:
+        os.remove(os.path.join(outbox_dir, LOCK_FILE_NAME))
+    except FileNotFoundError:
+        pass
+
+
+def _remove_report(base: str):
+    for suffix in (REPORT_SUFFIX, MANIFEST_SUFFIX, METADATA_SUFFIX):
+        try:
+            os.remove(base + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def flush(outbox_dir: str, api_key: str,
+          max_attempts: Optional[int] = None, verbose: bool = True) -> FlushResult:
+    """
+    Envoie les rapports en attente, du plus ancien au plus récent, puis les supprime.
+
+    Tous les envois passent par la session HTTP partagée de `api_client` (une seule
+    connexion réutilisée). Chaque rapport a son manifeste d'envoi : un vidage
+    interrompu reprend au lot suivant. Le vidage s'arrête à la première erreur
+    réseau ou serveur (inutile d'insister) ; un rapport refusé par le serveur
+    (erreur 4xx) est conservé et les suivants sont tout de même envoyés.
+
+    Seuls les rapports enregistrés avec `api_key` sont envoyés : ceux d'un autre
+    projet restent dans la boîte d'envoi (`FlushResult.other_key`).
+
+    Args:
+        api_key: La clé d'API du projet (elle n'est pas enregistrée avec les rapports).
+        max_attempts: Nombre de tentatives par requête (voir `api_client.submit_report`).
+    """
+    import requests
+    from . import api_client
+
+    result = FlushResult()
+    reports = iter_reports(outbox_dir)
+    if not reports:
+        return result
+
+    lock = _acquire_lock(outbox_dir)
+    if lock is None:
+        result.locked = True
+        result.remaining = len(reports)
+        return result
+
+    try:
+        # La liste est relue sous verrou : un autre vidage a pu passer entre-temps.
+        reports = iter_reports(outbox_dir)
+        for index, base in enumerate(reports):
+            try:
+                with open(base + METADATA_SUFFIX, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                result.rejected.append(base + REPORT_SUFFIX)
+                continue
+            if metadata.get("api_key_digest") != api_key_digest(api_key):
+                result.other_key.append(base + REPORT_SUFFIX)
+                continue
+
+            with IssueSpool.from_file(base + REPORT_SUFFIX) as issues:
+                try:
+                    api_client.submit_report(issues, api_key, base + MANIFEST_SUFFIX,
+                                             max_attempts=max_attempts, verbose=verbose,
+                                             submission=metadata.get("submission"))
+                except requests.exceptions.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else None
+                    if status is None or status >= 500 or status == 429:
+                        result.remaining = len(reports) - index
+                        break
+                    result.rejected.append(base + REPORT_SUFFIX)
+                    continue
+                except requests.exceptions.RequestException:
+                    result.remaining = len(reports) - index
+                    break
+
+            _remove_report(base)
+            result.sent.append(base + REPORT_SUFFIX)
+    finally:
+        _release_lock(outbox_dir, lock)
+    return result
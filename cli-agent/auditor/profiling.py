@@ -0,0 +1,203 @@
+# auditor/profiling.py
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Ordre d'affichage des étapes du pipeline ; les règles (`rule:<ISSUE_CODE>`) suivent.
+STAGES = (
+    "load_rules", "discovery", "cache_lookup", "read", "prefilter", "parse_python", "parse_xml",
+    "rules_python", "rules_xml", "render_snippet", "cache_store", "report_write",
+    "json_report", "submit",
+)
+
+# Étapes dont le temps est déjà compté dans une autre (affichées en retrait).
+NESTED_STAGES = {"render_snippet": "rules_python/rules_xml"}
+RULE_PREFIX = "rule:"
+
+
+class Profiler:
+    """
+    Accumule le temps passé et le nombre d'appels par étape du pipeline et par
+    règle, ainsi que le temps d'analyse de chaque fichier.
+
+    N'est créé qu'avec `audit --profile` : sans profiler, le code instrumenté
+    se contente d'un test `profiler is None`.
+    Chaque worker a le sien ; ses mesures sont renvoyées au processus principal
+    avec les résultats de chaque fichier (voir `drain` et `merge`).
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        self.issues: Counter = Counter()
+        self.files: List[Tuple[float, str]] = []
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        entry = self.stages[stage]
+        entry[0] += seconds
+        entry[1] += calls
+
+    @contextmanager
+    def track(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add_file(self, file_path: str, seconds: float):
+        self.files.append((seconds, file_path))
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        """Retourne `func` instrumentée : chaque appel est compté dans `stage`."""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        timed.__wrapped__ = func
+        return timed
+
+    def iterate(self, stage: str, iterable: Iterable) -> Iterator:
+        """Itère sur `iterable` en comptant dans `stage` le temps passé à produire chaque élément."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start, calls=0)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def drain(self) -> dict:
+        """Retourne les mesures accumulées (sérialisables) et repart de zéro."""
+        snapshot = {"stages": dict(self.stages), "issues": dict(self.issues), "files": self.files}
+        self.stages = defaultdict(lambda: [0.0, 0])
+        self.issues = Counter()
+        self.files = []
+        return snapshot
+
+    def merge(self, snapshot: Optional[dict]):
+        """Ajoute les mesures d'un autre profiler (typiquement, celles d'un worker)."""
+        if not snapshot:
+            return
+        for stage, (seconds, calls) in snapshot["stages"].items():
+            self.add(stage, seconds, calls)
+        self.issues.update(snapshot["issues"])
+        self.files.extend(snapshot["files"])
+
+    def report(self, wall_seconds: float, top_files: int = 10, jobs: int = 1) -> dict:
+        """Construit le rapport de profilage (sérialisable en JSON)."""
+        def sort_key(stage):
+            # Les règles sont affichées sous rules_xml, de la plus lente à la plus rapide.
+            if stage.startswith(RULE_PREFIX):
+                return (0, STAGES.index("rules_xml"), 1, -self.stages[stage][0], stage)
+            if stage in STAGES:
+                return (0, STAGES.index(stage), 0, 0.0, stage)
+            return (1, 0, 0, -self.stages[stage][0], stage)
+
+        stages = []
+        for stage in sorted(self.stages, key=sort_key):
+            seconds, calls = self.stages[stage]
+            entry = {"stage": stage, "seconds": round(seconds, 6), "calls": calls}
+            if stage.startswith(RULE_PREFIX):
+                entry["issues"] = self.issues.get(stage[len(RULE_PREFIX):], 0)
+            stages.append(entry)
+
+        return {
+            "wall_seconds": round(wall_seconds, 6),
+            "jobs": jobs,
+            "stages": stages,
+            "slowest_files": [
+                {"file_path": path, "seconds": round(seconds, 6)}
+                for seconds, path in sorted(self.files, reverse=True)[:top_files]
+            ],
+            "files_analyzed": len(self.files),
+            "peak_memory": peak_memory(),
+        }
+
+
+def instrument_snippet_rendering(profiler: Profiler) -> Callable[[], None]:
+    """
+    Compte dans `render_snippet` les appels à `ast.unparse` et `etree.tostring`,
+    qui servent aux checkers à produire les extraits de code des issues.
+    Retourne la fonction qui rétablit les originaux.
+    """
+    import ast
+    from lxml import etree
+
+    originals = ast.unparse, etree.tostring
+    ast.unparse = profiler.wrap("render_snippet", ast.unparse)
+    etree.tostring = profiler.wrap("render_snippet", etree.tostring)
+
+    def restore():
+        ast.unparse, etree.tostring = originals
+    return restore
+
+
+def peak_memory() -> Dict[str, Optional[int]]:
+    """
+    Pic de mémoire résidente (octets) du processus principal et de ses workers terminés.
+    Lu depuis `getrusage`, sans surcoût pendant l'analyse ; indisponible sous Windows.
+    """
+    try:
+        import resource
+    except ImportError:
+        return {"main_bytes": None, "workers_bytes": None}
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS.
+    unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "main_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+        "workers_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit or None,
+    }
+
+
+def _format_bytes(size: Optional[int]) -> str:
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_report(report: dict) -> str:
+    """Met en forme le rapport de profilage en tableau lisible."""
+    wall = report["wall_seconds"]
+    lines = [f"{'stage':<24} {'time (s)':>10} {'% wall':>7} {'calls':>9} {'issues':>7}", "-" * 61]
+    for entry in report["stages"]:
+        stage = entry["stage"]
+        label = f"  {stage}" if stage.startswith(RULE_PREFIX) or stage in NESTED_STAGES else stage
+        share = entry["seconds"] / wall if wall else 0.0
+        issues = entry.get("issues", "")
+        lines.append(f"{label:<24} {entry['seconds']:>10.3f} {share:>7.1%} {entry['calls']:>9} {issues:>7}")
+    lines.append("-" * 61)
+    lines.append(f"{'wall time':<24} {wall:>10.3f}")
+
+    if report["jobs"] > 1:
+        lines.append(f"\nAnalysis stages are summed over {report['jobs']} worker processes "
+                     "and can exceed the wall time.")
+    lines.append("Rule times include snippet rendering; rule and snippet times are part of rules_python/rules_xml.")
+
+    if report["slowest_files"]:
+        lines.append(f"\nSlowest {len(report['slowest_files'])} of {report['files_analyzed']} analyzed files:")
+        for entry in report["slowest_files"]:
+            lines.append(f"  {entry['seconds'] * 1000:>9.1f} ms  {entry['file_path']}")
+
+    memory = report["peak_memory"]
+    peak = f"\nPeak memory: {_format_bytes(memory['main_bytes'])} (main process)"
+    if report["jobs"] > 1:
+        peak += f", {_format_bytes(memory['workers_bytes'])} (largest worker)"
+    lines.append(peak)
+    return "\n".join(lines)
+
+
+def write_report(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
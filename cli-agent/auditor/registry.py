@@ -0,0 +1,212 @@
+# auditor/registry.py
+import bisect
+import importlib
+import json
+import math
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CHECKERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkers")
+INDEX_FILE_NAME = "checkers-index.json"
+
+# À incrémenter quand le format des entrées de l'index change.
+INDEX_SCHEMA_VERSION = 1
+
+
+def iter_checker_classes() -> Iterator[type]:
+    """
+    Découvre dynamiquement toutes les classes de checkers qui héritent de BaseChecker.
+
+    Tous les modules du package `checkers` sont importés : c'est ce parcours,
+    coûteux, que l'index évite à chaque exécution.
+    """
+    import inspect
+    import pkgutil
+
+    # On importe le package 'checkers'
+    import auditor.checkers
+    from .checkers.base_checker import BaseChecker, BasePythonChecker, BaseXMLChecker
+
+    # On parcourt tous les modules à l'intérieur du package 'auditor.checkers'
+    for importer, modname, ispkg in pkgutil.walk_packages(
+        path=auditor.checkers.__path__,
+        prefix=auditor.checkers.__name__ + '.',
+        onerror=lambda x: None
+    ):
+        module = importlib.import_module(modname)
+        # On inspecte chaque membre du module
+        for name, obj in inspect.getmembers(module):
+            # On cherche les classes qui héritent de BaseChecker mais qui ne sont pas BaseChecker elles-mêmes
+            if (inspect.isclass(obj) and issubclass(obj, BaseChecker) and obj not in [BaseChecker, BasePythonChecker, BaseXMLChecker]):
+                yield obj
+
+
+def checkers_signature() -> List[list]:
+    """
+    Signature du package `checkers` : nom, taille et date de modification de chaque module.
+    L'index est reconstruit dès qu'un fichier est ajouté, retiré ou modifié.
+    """
+    signature = []
+    for directory, dir_names, file_names in os.walk(CHECKERS_DIR):
+        dir_names[:] = sorted(d for d in dir_names if d != '__pycache__')
+        for name in sorted(file_names):
+            if name.endswith('.py'):
+                stat = os.stat(os.path.join(directory, name))
+                rel_path = os.path.relpath(os.path.join(directory, name), CHECKERS_DIR).replace(os.sep, '/')
+                signature.append([rel_path, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def _checker_entry(checker: type) -> dict:
+    from .checkers.base_checker import BasePythonChecker, BaseXMLChecker
+
+    if issubclass(checker, BasePythonChecker):
+        kind = "python"
+    elif issubclass(checker, BaseXMLChecker):
+        kind = "xml"
+    else:
+        kind = None
+    return {
+        "module": checker.__module__,
+        "class": checker.__qualname__,
+        "kind": kind,
+        "issue_code": checker.ISSUE_CODE,
+        "severity": checker.SEVERITY,
+        "description": checker.DESCRIPTION,
+        "version": checker.VERSION,
+        "applies_from_version": checker.APPLIES_FROM_VERSION,
+        "applies_to_version": checker.APPLIES_TO_VERSION,
+        "applies_only_for_migration": (
+            list(checker.APPLIES_ONLY_FOR_MIGRATION) if checker.APPLIES_ONLY_FOR_MIGRATION else None
+        ),
+    }
+
+
+def build_index() -> dict:
+    """Construit l'index en important tous les checkers."""
+    return {
+        "schema": INDEX_SCHEMA_VERSION,
+        "signature": checkers_signature(),
+        "checkers": [_checker_entry(checker) for checker in iter_checker_classes()],
+    }
+
+
+def _read_index(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_index(index_path: Optional[str] = None) -> List[dict]:
+    """
+    Retourne les métadonnées de tous les checkers, sans importer leurs modules.
+
+    L'index est lu depuis `checkers/checkers-index.json` ; s'il est absent ou ne
+    correspond plus aux fichiers du package, il est reconstruit puis réécrit
+    (si le dossier n'est pas accessible en écriture, on s'en passe).
+    """
+    index_path = index_path or os.path.join(CHECKERS_DIR, INDEX_FILE_NAME)
+    index = _read_index(index_path)
+    if (index is not None and index.get("schema") == INDEX_SCHEMA_VERSION
+            and index.get("signature") == checkers_signature()):
+        return index["checkers"]
+
+    index = build_index()
+    try:
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+    return index["checkers"]
+
+
+def load_class(entry: dict) -> type:
+    """Importe le module d'un checker de l'index et retourne sa classe."""
+    obj = importlib.import_module(entry["module"])
+    for attribute in entry["class"].split('.'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def rule_metadata(entries: List[dict]) -> List[dict]:
+    """
+    Métadonnées des règles, dans le format attendu par le catalogue du backend
+    (`manage.py load_issue_types`).
+    """
+    fields = ("issue_code", "severity", "description", "version", "applies_from_version", "applies_to_version")
+    rules = {entry["issue_code"]: {key: entry[key] for key in fields} for entry in entries}
+    return [rules[code] for code in sorted(rules)]
+
+
+Hop = Tuple[float, float]
+
+
+def migration_hops(from_version: float, to_version: float) -> List[Hop]:
+    """
+    Découpe une migration en étapes d'une version majeure :
+    14.0 -> 17.0 donne (14.0, 15.0), (15.0, 16.0) et (16.0, 17.0).
+    """
+    if to_version <= from_version:
+        return [(from_version, to_version)]
+    steps = [from_version]
+    steps += [float(version) for version in range(math.floor(from_version) + 1, math.ceil(to_version))]
+    steps.append(to_version)
+    return list(zip(steps, steps[1:]))
+
+
+def hop_label(hop: Hop) -> str:
+    return f"{hop[0]:.1f}-{hop[1]:.1f}"
+
+
+class VersionIndex:
+    """
+    Index des checkers par intervalle de versions, construit sur les métadonnées
+    de l'index (`load_index`) : aucune classe n'est importée.
+
+    Une règle s'applique à l'étape (a, b) si la version de départ `a` est dans
+    [APPLIES_FROM_VERSION, APPLIES_TO_VERSION] et, si elle déclare
+    APPLIES_ONLY_FOR_MIGRATION, si (a, b) est exactement cette migration.
+    Les entrées sont triées par version de début : pour une plage d'étapes, seules
+    celles qui commencent avant la dernière version de départ sont examinées.
+    """
+
+    def __init__(self, entries: List[dict]):
+        # (position dans l'index, entrée), triées par version de début.
+        self._entries = sorted(enumerate(entries), key=lambda item: item[1]["applies_from_version"])
+        self._starts = [entry["applies_from_version"] for _, entry in self._entries]
+
+    @staticmethod
+    def applies_to(entry: dict, hop: Hop) -> bool:
+        only = entry["applies_only_for_migration"]
+        return (entry["applies_from_version"] <= hop[0] <= entry["applies_to_version"]
+                and (only is None or tuple(only) == tuple(hop)))
+
+    def rules_for_hops(self, hops: List[Hop]) -> List[Tuple[dict, List[Hop]]]:
+        """
+        Les règles qui s'appliquent à au moins une des étapes, avec ces étapes
+        (dans l'ordre de `hops`). Les règles restent dans l'ordre de l'index.
+        """
+        if not hops:
+            return []
+        first_source = min(hop[0] for hop in hops)
+        candidates = self._entries[:bisect.bisect_right(self._starts, max(hop[0] for hop in hops))]
+        selected = []
+        for position, entry in candidates:
+            if entry["applies_to_version"] < first_source:
+                continue
+            entry_hops = [hop for hop in hops if self.applies_to(entry, hop)]
+            if entry_hops:
+                selected.append((position, entry, entry_hops))
+        return [(entry, entry_hops) for _, entry, entry_hops in sorted(selected, key=lambda item: item[0])]
+
+
+def hop_tags(rules: List[Tuple[dict, List[Hop]]]) -> Dict[str, str]:
+    """
+    Étape à laquelle les issues de chaque règle sont imputées : la première de la
+    migration où la règle s'applique (une issue n'est corrigée qu'une fois).
+    """
+    return {entry["issue_code"]: hop_label(entry_hops[0]) for entry, entry_hops in rules}
@@ -1,5 +1,9 @@
 # auditor/report.py
+import gzip
+import json
+import tempfile
 from dataclasses import dataclass, asdict
+from typing import BinaryIO, Iterable, Iterator
 
 @dataclass
 class Issue:
@@ -13,7 +17,74 @@ class Issue:
     line_number: int
     description: str
     code_snippet: str
+    # Étape de migration à laquelle l'issue est imputée (ex: "16.0-17.0"),
+    # renseignée à l'assemblage du rapport (voir `registry.hop_tags`).
+    migration_hop: str = ""
 
     def to_dict(self):
         """Convertit l'instance de dataclass en dictionnaire pour la sérialisation JSON."""
-        return asdict(self)
\ No newline at end of file
+        return asdict(self)
+
+class IssueSpool:
+    """
+    Accumule des issues dans un fichier temporaire au format NDJSON compressé (gzip).
+
+    Les issues ne restent pas en mémoire : le fichier peut être relu
+    (`__iter__`) ou envoyé tel quel au backend (`compressed_file`), quel
+    que soit leur nombre.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._writer = gzip.GzipFile(fileobj=self._file, mode='wb')
+        self._count = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "IssueSpool":
+        """Relit un rapport NDJSON gzip déjà écrit sur disque (ex: un rapport mis en attente d'envoi)."""
+        spool = cls.__new__(cls)
+        spool._file = open(path, 'rb')
+        spool._writer = None
+        with gzip.GzipFile(fileobj=spool._file, mode='rb') as reader:
+            spool._count = sum(1 for _ in reader)
+        return spool
+
+    def append(self, issue: Issue):
+        if self._writer is None:
+            raise RuntimeError("Cannot add issues to a spool that has already been read.")
+        self._writer.write(json.dumps(issue.to_dict()).encode('utf-8') + b'\n')
+        self._count += 1
+
+    def extend(self, issues: Iterable[Issue]):
+        for issue in issues:
+            self.append(issue)
+
+    def __len__(self):
+        return self._count
+
+    def _finish_writing(self):
+        if self._writer is not None:
+            # GzipFile.close() écrit la fin du flux sans fermer le fichier sous-jacent.
+            self._writer.close()
+            self._writer = None
+
+    def compressed_file(self) -> BinaryIO:
+        """Retourne le fichier NDJSON gzip, positionné au début."""
+        self._finish_writing()
+        self._file.seek(0)
+        return self._file
+
+    def __iter__(self) -> Iterator[Issue]:
+        with gzip.GzipFile(fileobj=self.compressed_file(), mode='rb') as reader:
+            for line in reader:
+                yield Issue(**json.loads(line))
+
+    def close(self):
+        self._finish_writing()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
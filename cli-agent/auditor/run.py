@@ -1,128 +1,486 @@
 # auditor/run.py
 import ast
+import contextlib
+import io
 import json
-import pkgutil
-import importlib
-import inspect
+import itertools
+import os
+import multiprocessing
+import textwrap
+import time
 from tqdm import tqdm
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from lxml import etree 
 
 from . import discovery
-from . import api_client
+from . import cache
+from . import registry
+from .cache import AuditCache
+from .engine import PythonRuleEngine, XMLRuleEngine
+from .profiling import Profiler, instrument_snippet_rendering
 from .checkers.base_checker import BaseChecker, BasePythonChecker, BaseXMLChecker
-from .report import Issue
+from .report import Issue, IssueSpool
+
+def select_rules(from_version: float, to_version: float) -> List[Tuple[dict, List[registry.Hop]]]:
+    """
+    Les règles pertinentes pour au moins une étape de la migration demandée
+    (voir `registry.migration_hops`), avec les étapes auxquelles elles s'appliquent.
+    """
+    hops = registry.migration_hops(from_version, to_version)
+    return registry.VersionIndex(registry.load_index()).rules_for_hops(hops)
+
 
 def load_checkers(from_version: float, to_version: float) -> List[BaseChecker]:
     """
-    Charge dynamiquement toutes les classes de checkers qui héritent de BaseChecker
-    et les filtre pour ne garder que celles pertinentes pour la migration demandée.
+    Charge les checkers pertinents pour la migration demandée.
+
+    Pour une migration sur plusieurs versions, ce sont les règles de toutes les
+    étapes : les fichiers ne sont découverts et parsés qu'une fois.
+    Le filtrage se fait sur l'index des checkers (voir `registry.load_index`) :
+    seuls les modules des règles retenues sont importés.
     """
-    checkers = []
-    # On importe le package 'checkers'
-    import auditor.checkers
-    
-    # On parcourt tous les modules à l'intérieur du package 'auditor.checkers'
-    for importer, modname, ispkg in pkgutil.walk_packages(
-        path=auditor.checkers.__path__,
-        prefix=auditor.checkers.__name__ + '.',
-        onerror=lambda x: None
-    ):
-        module = importlib.import_module(modname)
-        # On inspecte chaque membre du module
-        for name, obj in inspect.getmembers(module):
-            # On cherche les classes qui héritent de BaseChecker mais qui ne sont pas BaseChecker elles-mêmes
-            if (inspect.isclass(obj) and issubclass(obj, BaseChecker) and obj not in [BaseChecker, BasePythonChecker, BaseXMLChecker]):
-                # --- Logique de filtrage par version ---
-                is_relevant = (
-                    from_version >= obj.APPLIES_FROM_VERSION and
-                    from_version <= obj.APPLIES_TO_VERSION
-                )
-                
-                # On instancie la classe et on l'ajoute à la liste si elle est pertinente
-                if is_relevant:
-                    checkers.append(obj())
-    
-    return checkers
+    return [registry.load_class(entry)() for entry, _ in select_rules(from_version, to_version)]
+
+
+class HopTaggingSink:
+    """
+    Renseigne l'étape de migration de chaque issue (`registry.hop_tags`) avant
+    de la transmettre à `sink`, et compte les issues par étape.
+    """
+
+    def __init__(self, sink, tags: Dict[str, str]):
+        self.sink = sink
+        self.tags = tags
+        self.counts: Dict[str, int] = {}
+
+    def _tag(self, issue: Issue) -> Issue:
+        issue.migration_hop = self.tags.get(issue.issue_code, "")
+        self.counts[issue.migration_hop] = self.counts.get(issue.migration_hop, 0) + 1
+        return issue
+
+    def extend(self, issues: Iterable[Issue]):
+        self.sink.extend(self._tag(issue) for issue in issues)
+
+# Moteurs construits une seule fois par processus worker (voir `_init_worker`).
+_worker_engines: Tuple[Optional[PythonRuleEngine], Optional[XMLRuleEngine]] = (None, None)
+_worker_profiler: Optional[Profiler] = None
+
+# Sans profiler, les étapes d'`analyze_file` sont encadrées par ce contexte vide.
+_UNTRACKED = contextlib.nullcontext()
+
+
+def _untracked(stage: str):
+    return _UNTRACKED
+
+
+def split_checkers(checkers: List[BaseChecker]) -> Tuple[List[BasePythonChecker], List[BaseXMLChecker]]:
+    """Sépare les checkers par type de fichier traité."""
+    python_checkers = [c for c in checkers if isinstance(c, BasePythonChecker)]
+    xml_checkers = [c for c in checkers if isinstance(c, BaseXMLChecker)]
+    return python_checkers, xml_checkers
+
+
+def build_engines(checkers: List[BaseChecker],
+                  profiler: Optional[Profiler] = None) -> Tuple[PythonRuleEngine, XMLRuleEngine]:
+    """Prépare les moteurs d'exécution des règles, une seule fois par processus."""
+    python_checkers, xml_checkers = split_checkers(checkers)
+    python_engine, xml_engine = PythonRuleEngine(python_checkers), XMLRuleEngine(xml_checkers)
+    python_engine.profiler = xml_engine.profiler = profiler
+    return python_engine, xml_engine
+
+
+def analyze_file(module_name: str, file_path: str, relative_path: str,
+                 python_engine: PythonRuleEngine, xml_engine: XMLRuleEngine,
+                 profiler: Optional[Profiler] = None) -> Tuple[List[Issue], List[str], bool]:
+    """
+    Parse un fichier et lui applique tous les checkers pertinents.
+
+    Returns:
+        Un tuple (issues, warnings, skipped). Les avertissements sont renvoyés plutôt
+        qu'affichés pour que le processus principal puisse les écrire sans
+        casser la barre de progression. `skipped` indique que le pré-filtre a
+        écarté le fichier sans le parser.
+
+    Avec un `profiler` (`audit --profile`), le temps de chaque étape et le temps
+    total du fichier y sont comptés.
+    """
+    if profiler is None:
+        return _analyze_file(module_name, file_path, relative_path, python_engine, xml_engine, _untracked)
+    start = time.perf_counter()
+    try:
+        return _analyze_file(module_name, file_path, relative_path, python_engine, xml_engine, profiler.track)
+    finally:
+        profiler.add_file(relative_path, time.perf_counter() - start)
+
+
+def _analyze_file(module_name: str, file_path: str, relative_path: str,
+                  python_engine: PythonRuleEngine, xml_engine: XMLRuleEngine,
+                  track) -> Tuple[List[Issue], List[str], bool]:
+    issues: List[Issue] = []
+    warnings: List[str] = []
+    skipped = False
+
+    # LOGIQUE POUR PYTHON
+    if file_path.endswith(".py") and python_engine:
+        try:
+            with track("read"):
+                with open(file_path, 'rb') as f:
+                    content = f.read()
+            # Aucun jeton déclencheur dans le fichier brut : aucune règle ne peut s'appliquer.
+            with track("prefilter"):
+                may_match = python_engine.prefilter.may_match(content)
+            if not may_match:
+                return issues, warnings, True
+
+            # On parse le fichier en AST une seule fois
+            with track("parse_python"):
+                ast_tree = ast.parse(content, filename=file_path)
+
+            # Le moteur applique tous les checkers Python pertinents en un seul parcours de l'arbre
+            with track("rules_python"):
+                issues.extend(python_engine.run(ast_tree, relative_path, module_name))
+        except (SyntaxError, UnicodeDecodeError) as e:
+            warnings.append(f"Warning: Skipping file {file_path} due to parsing error: {e}")
+        except Exception as e:
+            warnings.append(f"Warning: An unexpected error occurred with file {file_path}: {e}")
+
+    # LOGIQUE POUR XML
+    elif file_path.endswith(".xml") and xml_engine:
+        try:
+            with track("read"):
+                with open(file_path, 'rb') as f:
+                    content = f.read()
+            with track("prefilter"):
+                may_match = xml_engine.prefilter.may_match(content)
+            if not may_match:
+                return issues, warnings, True
+
+            # On parse le fichier XML avec lxml. `recover=True` évite de planter sur un XML mal formé.
+            with track("parse_xml"):
+                xml_tree = etree.parse(io.BytesIO(content), parser=etree.XMLParser(recover=True), base_url=file_path)
+
+            # Le moteur applique tous les checkers XML pertinents en limitant les parcours du document
+            with track("rules_xml"):
+                issues.extend(xml_engine.run(xml_tree, relative_path, module_name))
+        except etree.XMLSyntaxError as e:
+            warnings.append(f"Warning: Skipping file {file_path} due to XML syntax error: {e}")
+        except Exception as e:
+            warnings.append(f"Warning: An unexpected error occurred with file {file_path}: {e}")
+
+    return issues, warnings, skipped
+
+
+def _init_worker(from_version: float, to_version: float, profile: bool = False):
+    """Initialiseur du pool : charge les checkers une seule fois par worker."""
+    global _worker_engines, _worker_profiler
+    if profile:
+        _worker_profiler = Profiler()
+        instrument_snippet_rendering(_worker_profiler)
+    _worker_engines = build_engines(load_checkers(from_version, to_version), _worker_profiler)
+
+
+def _analyze_in_worker(file_entry: Tuple[str, str, str]) -> Tuple[List[Issue], List[str], bool, Optional[dict]]:
+    """
+    Point d'entrée exécuté dans un worker pour un fichier découvert.
+    Les mesures du profiler du worker (s'il y en a un) accompagnent le résultat.
+    """
+    python_engine, xml_engine = _worker_engines
+    issues, warnings, skipped = analyze_file(*file_entry, python_engine, xml_engine, _worker_profiler)
+    return issues, warnings, skipped, _worker_profiler.drain() if _worker_profiler is not None else None
+
+
+# Nombre de fichiers découverts traités ensemble (recherche dans le cache puis analyse).
+ANALYSIS_BATCH_SIZE = 1024
+
 
-def start_audit(path: str, api_key: str, from_version: float, to_version: float, output_file: str = None):
+def _is_analyzable(file_path: str, python_engine: PythonRuleEngine,
+                   xml_engine: XMLRuleEngine) -> bool:
+    """Indique si au moins un checker chargé traite ce type de fichier."""
+    return ((file_path.endswith(".py") and bool(python_engine)) or
+            (file_path.endswith(".xml") and bool(xml_engine)))
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Découpe un itérable en listes d'au plus `size` éléments, sans le matérialiser."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def analyze_files(all_files: Iterable[Tuple[str, str, str]], checkers: List[BaseChecker],
+                  from_version: float, to_version: float, jobs: int = 1,
+                  audit_cache: Optional[AuditCache] = None, issues_sink=None,
+                  profiler: Optional[Profiler] = None) -> List[Issue]:
+    """
+    Analyse les fichiers découverts, en séquentiel ou via un pool de processus.
+
+    `all_files` peut être un générateur (voir `discovery.iter_odoo_files`) : les
+    fichiers sont consommés par lots au fil de la découverte, sans jamais
+    matérialiser la liste complète.
+    Les résultats sont toujours assemblés dans l'ordre de découverte des fichiers,
+    ce qui garantit un rapport déterministe quel que soit le nombre de workers.
+    `jobs=1` conserve l'exécution dans le processus courant (pratique pour déboguer).
+    Si `audit_cache` est fourni, les fichiers inchangés depuis la dernière exécution
+    ne sont ni relus ni parsés : leurs issues sont rejouées depuis le cache.
+    Les issues sont ajoutées à `issues_sink` (tout objet ayant une méthode
+    `extend`, par exemple un `IssueSpool`), qui est renvoyé ; une liste par défaut.
+    Avec un `profiler`, le temps de chaque étape (découverte comprise) y est compté,
+    y compris dans les workers.
+    """
+    track = profiler.track if profiler is not None else _untracked
+    if profiler is not None:
+        all_files = profiler.iterate("discovery", all_files)
+    python_engine, xml_engine = build_engines(checkers, profiler)
+    entries = (entry for entry in all_files if _is_analyzable(entry[1], python_engine, xml_engine))
+
+    all_issues = issues_sink if issues_sink is not None else []
+    analyzed_count = cached_count = skipped_count = 0
+
+    pool = None
+    if jobs > 1:
+        pool = multiprocessing.Pool(processes=jobs, initializer=_init_worker,
+                                    initargs=(from_version, to_version, profiler is not None))
+    restore_rendering = instrument_snippet_rendering(profiler) if profiler is not None and pool is None else None
+    try:
+        with tqdm(total=len(all_files) if hasattr(all_files, '__len__') else None,
+                  desc="Scanning files") as progress:
+            for batch in _batched(entries, ANALYSIS_BATCH_SIZE):
+                results: List[Optional[List[Issue]]] = [None] * len(batch)
+                content_hashes: List[Optional[str]] = [None] * len(batch)
+                pending: List[int] = []
+
+                for index, (module_name, file_path, relative_path) in enumerate(batch):
+                    if audit_cache is not None:
+                        with track("cache_lookup"):
+                            try:
+                                content_hashes[index] = cache.hash_file(file_path)
+                            except OSError:
+                                pass  # L'analyse remontera l'erreur de lecture.
+                            else:
+                                results[index] = audit_cache.get(module_name, relative_path, content_hashes[index])
+                    if results[index] is None:
+                        pending.append(index)
+                progress.update(len(batch) - len(pending))
+                cached_count += len(batch) - len(pending)
+
+                pending_entries = [batch[index] for index in pending]
+                if pool is not None:
+                    # On envoie les fichiers par paquets pour amortir le coût des échanges inter-processus.
+                    # `imap` (et non `imap_unordered`) rend les résultats dans l'ordre des fichiers.
+                    chunksize = max(1, min(64, len(pending_entries) // (jobs * 8)))
+                    file_results = pool.imap(_analyze_in_worker, pending_entries, chunksize=chunksize)
+                else:
+                    file_results = (
+                        (*analyze_file(*entry, python_engine, xml_engine, profiler), None) for entry in pending_entries
+                    )
+
+                for index, (issues, warnings, skipped, worker_profile) in zip(pending, file_results):
+                    if profiler is not None:
+                        profiler.merge(worker_profile)
+                    for warning in warnings:
+                        tqdm.write(warning)
+                    results[index] = issues
+                    skipped_count += skipped
+                    progress.update(1)
+
+                    # On ne met pas en cache les fichiers en erreur : ils seront réessayés (et signalés) au prochain passage.
+                    if audit_cache is not None and content_hashes[index] is not None and not warnings:
+                        module_name, _, relative_path = batch[index]
+                        with track("cache_store"):
+                            audit_cache.put(module_name, relative_path, content_hashes[index], issues)
+
+                analyzed_count += len(batch)
+                with track("report_write"):
+                    all_issues.extend(issue for issues in results for issue in issues)
+    finally:
+        if restore_rendering is not None:
+            restore_rendering()
+        # Comme `with Pool()` : tous les résultats ont été consommés (ou une erreur est survenue).
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    print(f"Analyzed {analyzed_count} files.")
+    if audit_cache is not None:
+        print(f"Reusing cached results for {cached_count} unchanged files.")
+    print(f"Skipped parsing {skipped_count} of {analyzed_count - cached_count} analyzed files: no rule trigger token found.")
+
+    return all_issues
+
+
+def start_audit(path: str, api_key: str, from_version: float, to_version: float, output_file: str = None,
+                jobs: int = None, use_cache: bool = True, cache_dir: str = cache.DEFAULT_CACHE_DIR,
+                exclude: Optional[List[str]] = None, outbox_dir: Optional[str] = None,
+                profiler: Optional[Profiler] = None, changed_since: Optional[str] = None):
     """
     Le point d'entrée principal de la logique d'audit.
     Orchestre la découverte, le chargement des règles, l'analyse et la soumission.
+
+    `jobs` fixe le nombre de processus d'analyse (par défaut, le nombre de CPU).
+    `use_cache` active le cache incrémental stocké dans `cache_dir`.
+    `exclude` liste des motifs (format .gitignore) de fichiers à ne pas analyser.
+    `output_file` enregistre le rapport en JSON ; il n'est soumis que si `api_key` est fourni.
+    `outbox_dir` est la boîte d'envoi des rapports qui n'ont pas pu être soumis
+    (par défaut, `outbox` dans `cache_dir`) : elle est vidée en arrière-plan
+    pendant l'analyse, et le rapport y est enregistré si sa soumission échoue
+    (`outbox.ReportSpooled` est alors levée).
+    `profiler` (`audit --profile`) reçoit le temps de chaque étape, de la
+    découverte à la soumission.
+    `changed_since` (une révision git) limite l'analyse aux fichiers touchés depuis
+    le commit de base de cette révision (`git merge-base <révision> HEAD`) : à la
+    soumission, le backend reprend les issues des autres fichiers de l'analyse de
+    ce commit, et refuse l'audit s'il n'en a pas.
     """
+    track = profiler.track if profiler is not None else _untracked
+    outbox_dir = outbox_dir or os.path.join(cache_dir, "outbox")
+
+    if api_key:
+        # Importé seulement pour une soumission (requests est lourd à charger).
+        from . import api_client, outbox
+
+        # Un backend mal configuré est signalé avant l'analyse, et non après.
+        api_client.get_submissions_url()
+
+    submission = {}
+    changed_files = None
+    if changed_since:
+        # Lève ValueError (révision inconnue, pas de dépôt git...) avant toute analyse.
+        base_commit = discovery.git_merge_base(path, changed_since)
+        changed_files = discovery.git_changed_files(path, base_commit)
+        submission.update(changed_files=changed_files, base_commit=base_commit)
+
+    hops = registry.migration_hops(from_version, to_version)
+    if len(hops) > 1:
+        path_label = " -> ".join(f"{version:.1f}" for version in [hops[0][0]] + [hop[1] for hop in hops])
+        print(f"Migration path: {path_label} ({len(hops)} hops, analyzed in a single pass).")
+
     print("Step 1: Loading relevant audit rules...")
-    checkers = load_checkers(from_version, to_version)
+    with track("load_rules"):
+        rules = select_rules(from_version, to_version)
+        checkers = [registry.load_class(entry)() for entry, _ in rules]
     if not checkers:
         print("No audit rules are relevant for this migration path. Exiting.")
         return
     
-    python_checkers = [c for c in checkers if isinstance(c, BasePythonChecker)]
-    xml_checkers = [c for c in checkers if isinstance(c, BaseXMLChecker)] 
+    python_checkers, xml_checkers = split_checkers(checkers)
 
     print(f"Loaded {len(checkers)} rules ({len(python_checkers)} for Python), {len(xml_checkers)} for XML).")
 
-    print("\nStep 2: Discovering Odoo modules and files...")
-    all_files = discovery.find_odoo_modules(path)
-    print(f"Found {len(all_files)} files to analyze.")
+    # On ne découvre que les types de fichiers traités par les règles chargées.
+    extensions = [ext for ext, rules in ((".py", python_checkers), (".xml", xml_checkers)) if rules]
 
-    all_issues: List[Issue] = []
-    print("\nStep 3: Analyzing files...")
-    
-    # On utilise tqdm pour créer une barre de progression
-    for module_name, file_path, relative_path in tqdm(all_files, desc="Scanning files"):
-         # LOGIQUE POUR PYTHON 
-        if file_path.endswith(".py") and python_checkers:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # On parse le fichier en AST une seule fois
-                    ast_tree = ast.parse(content, filename=file_path)
-                    
-                    # On passe l'arbre à tous les checkers Python pertinents
-                    for checker in python_checkers:
-                        found_issues = checker.check(ast_tree, relative_path, module_name)
-                        all_issues.extend(found_issues)
-            except (SyntaxError, UnicodeDecodeError) as e:
-                tqdm.write(f"Warning: Skipping file {file_path} due to parsing error: {e}")
-            except Exception as e:
-                tqdm.write(f"Warning: An unexpected error occurred with file {file_path}: {e}")
-            
-        # LOGIQUE POUR XML
-        elif file_path.endswith(".xml") and xml_checkers:
-            try:
-                # On parse le fichier XML avec lxml. `recover=True` évite de planter sur un XML mal formé.
-                xml_tree = etree.parse(file_path, parser=etree.XMLParser(recover=True))
-                
-                # On passe l'arbre XML à tous les checkers XML pertinents
-                for checker in xml_checkers:
-                    found_issues = checker.check(xml_tree, relative_path, module_name)
-                    all_issues.extend(found_issues)
-            except etree.XMLSyntaxError as e:
-                tqdm.write(f"Warning: Skipping file {file_path} due to XML syntax error: {e}")
-            except Exception as e:
-                tqdm.write(f"Warning: An unexpected error occurred with file {file_path}: {e}")
-
-    print(f"\nStep 4: Analysis complete. Found {len(all_issues)} total issues.")
-
-    if not all_issues:
-        print("No issues found. Nothing to submit.")
-        return
+    # Commit analysé, si l'audit porte exactement sur son contenu : il servira de
+    # base aux audits partiels des branches qui en partent.
+    git_commit = discovery.git_clean_head(path, extensions) if api_key else None
+    if git_commit:
+        submission["git_commit"] = git_commit
 
-    # On convertit notre liste d'objets Issue en une liste de dictionnaires
-    report_data = {
-        "issues": [issue.to_dict() for issue in all_issues]
-    }
-    
-    if output_file:
-        api_client.submit_report(report_data, api_key)
-        print(f"\nSaving report to {output_file}...")
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=4)
-        except IOError as e:
-            # On utilise tqdm.write pour ne pas casser la barre de progression si elle est active
-            tqdm.write(f"Error: Could not write to file {output_file}: {e}")
-            raise # On propage l'erreur pour que main.py l'attrape
+    # Les rapports restés en attente partent pendant l'analyse, sans la ralentir ni insister :
+    # une seule tentative par requête, sans message. Le vidage a son propre processus
+    # (démarré par `spawn`) : un thread en cours d'envoi au moment où le pool d'analyse
+    # fait ses `fork` laisserait aux workers des verrous (connexions, sorties) jamais relâchés.
+    background_flush = None
+    if api_key and outbox.iter_reports(outbox_dir):
+        background_flush = multiprocessing.get_context("spawn").Process(
+            target=outbox.flush, args=(outbox_dir, api_key), kwargs={"max_attempts": 1, "verbose": False}, daemon=True
+        )
+        background_flush.start()
+
+    jobs = jobs or os.cpu_count() or 1
+    print(f"\nStep 2-3: Discovering Odoo modules and analyzing files ({jobs} job{'s' if jobs > 1 else ''})...")
+    # La découverte est un générateur : les fichiers partent en analyse au fil de l'eau.
+    on_module = lambda module_name: tqdm.write(f"  -> Discovered module: {module_name}")
+    if changed_files is not None:
+        print(f"Auditing only the {len(changed_files)} file(s) changed since {changed_since} "
+              f"(merge base {submission['base_commit'][:12]}).")
+        all_files = discovery.iter_changed_files(
+            path, changed_files, extensions=extensions, exclude=exclude, on_module=on_module
+        )
     else:
-        # C'est le comportement précédent
-        api_client.submit_report(report_data, api_key)
\ No newline at end of file
+        all_files = discovery.iter_odoo_files(path, extensions=extensions, exclude=exclude, on_module=on_module)
+    audit_cache = AuditCache(cache_dir, checkers) if use_cache else None
+    # Les issues sont écrites au fil de l'analyse dans un fichier temporaire compressé,
+    # pour que la mémoire utilisée ne dépende pas du nombre d'issues trouvées.
+    with IssueSpool() as all_issues:
+        # Chaque issue est imputée à une étape de la migration (rapport et effort par étape).
+        tagged_issues = HopTaggingSink(all_issues, registry.hop_tags(rules))
+        try:
+            analyze_files(all_files, checkers, from_version, to_version,
+                          jobs=jobs, audit_cache=audit_cache, issues_sink=tagged_issues, profiler=profiler)
+        finally:
+            if audit_cache is not None:
+                audit_cache.close()
+
+        print(f"\nStep 4: Analysis complete. Found {len(all_issues)} total issues.")
+        if len(hops) > 1:
+            for hop in hops:
+                print(f"  {registry.hop_label(hop)}: {tagged_issues.counts.get(registry.hop_label(hop), 0)} issue(s)")
+
+        # Les rapports en attente doivent partir avant celui-ci, pour que l'ordre des analyses soit respecté.
+        if background_flush is not None:
+            background_flush.join()
+
+        # Un audit partiel sans issue est tout de même soumis : les issues corrigées
+        # dans les fichiers modifiés doivent disparaître de la nouvelle analyse.
+        if not len(all_issues) and changed_files is None:
+            print("No issues found. Nothing to submit.")
+            return
+
+        if output_file:
+            print(f"\nSaving report to {output_file}...")
+            try:
+                with track("json_report"):
+                    write_json_report(all_issues, output_file)
+            except IOError as e:
+                # On utilise tqdm.write pour ne pas casser la barre de progression si elle est active
+                tqdm.write(f"Error: Could not write to file {output_file}: {e}")
+                raise # On propage l'erreur pour que main.py l'attrape
+
+        if api_key:
+            with track("submit"):
+                _submit_or_spool(all_issues, api_key, cache_dir, outbox_dir, from_version, to_version,
+                                 submission)
+
+
+def _submit_or_spool(issues: IssueSpool, api_key: str, cache_dir: str, outbox_dir: str,
+                     from_version: float, to_version: float, submission: Optional[dict] = None):
+    """
+    Soumet le rapport. En cas d'échec, il est enregistré dans la boîte d'envoi
+    (`odoo-auditor flush` l'enverra sans relancer l'analyse).
+    """
+    import requests
+    from . import api_client, outbox
+
+    metadata = {"from_version": from_version, "to_version": to_version, "submission": submission}
+
+    # Des rapports plus anciens attendent encore : celui-ci passe derrière eux.
+    if outbox.iter_reports(outbox_dir):
+        path = outbox.save_report(issues, api_key, outbox_dir, metadata)
+        result = outbox.flush(outbox_dir, api_key)
+        if path in result.sent:
+            return
+        raise outbox.ReportSpooled(path, RuntimeError("Earlier spooled reports could not be submitted"))
+
+    # Suivi de l'envoi, pour reprendre une soumission interrompue à la prochaine exécution.
+    manifest_path = os.path.join(cache_dir, api_client.UPLOAD_MANIFEST_FILE_NAME)
+    try:
+        api_client.submit_report(issues, api_key, manifest_path, submission=submission)
+    except requests.exceptions.RequestException as e:
+        path = outbox.save_report(issues, api_key, outbox_dir, metadata, manifest_path)
+        raise outbox.ReportSpooled(path, e) from e
+
+
+def write_json_report(issues: Iterable[Issue], output_file: str):
+    """
+    Écrit le rapport au format JSON (`{"issues": [...]}`, indenté) issue par issue,
+    sans construire le document complet en mémoire.
+    """
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('{\n    "issues": [')
+        for index, issue in enumerate(issues):
+            f.write(',\n' if index else '\n')
+            f.write(textwrap.indent(json.dumps(issue.to_dict(), indent=4), ' ' * 8))
+        f.write('\n    ]\n}')
@@ -0,0 +1,422 @@
+# auditor/watch.py
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import discovery, registry
+from .cache import AuditCache
+from .report import Issue, IssueSpool
+from .run import HopTaggingSink, analyze_file, analyze_files, build_engines, select_rules, split_checkers
+
+# Les éditeurs enregistrent souvent un fichier en plusieurs étapes (écriture,
+# renommage...) : les événements rapprochés de moins de ce délai sont regroupés.
+DEBOUNCE_SECONDS = 0.05
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_PUSH_INTERVAL = 30.0
+
+# Constantes de <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def _is_watched_dir(name: str) -> bool:
+    # Comme la découverte : les dossiers cachés et les caches Python ne sont jamais analysés.
+    return not name.startswith('.') and name != '__pycache__'
+
+
+class InotifyWatcher:
+    """
+    Surveille une arborescence avec inotify (Linux), appelé via ctypes pour
+    n'ajouter aucune dépendance. inotify n'étant pas récursif, chaque dossier
+    a sa propre surveillance ; celles des nouveaux dossiers sont ajoutées au fil de l'eau.
+
+    Raises:
+        OSError: Si inotify est indisponible (autre système) ou si la limite du
+            nombre de surveillances (`fs.inotify.max_user_watches`) est atteinte.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this system")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            self._raise_errno(self.root)
+        self._dirs: Dict[int, str] = {}
+        try:
+            self._add_tree(self.root)
+        except OSError:
+            self.close()
+            raise
+
+    def _raise_errno(self, path: str):
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno), path)
+
+    def _add_tree(self, top: str):
+        for directory, dir_names, _ in os.walk(top):
+            dir_names[:] = [name for name in dir_names if _is_watched_dir(name)]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                if os.path.isdir(directory):
+                    self._raise_errno(directory)
+                continue  # Dossier supprimé entre-temps.
+            self._dirs[wd] = directory
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        """Attend (au plus `timeout` secondes) et retourne les chemins modifiés, créés ou supprimés."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + length].rstrip(b'\0')
+            offset += _INOTIFY_EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Des événements ont été perdus : toute l'arborescence doit être revue.
+                changed.add(self.root)
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & IN_ISDIR:
+                if not _is_watched_dir(os.path.basename(path)):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path)
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """
+    Surveillance de repli, pour tous les systèmes : la date de modification et
+    la taille des fichiers sont comparées toutes les `interval` secondes.
+    """
+
+    def __init__(self, list_files: Callable[[], Iterable[str]], interval: float = DEFAULT_POLL_INTERVAL):
+        self._list_files = list_files
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in self._list_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        previous, self._snapshot = self._snapshot, self._take_snapshot()
+        return {path for path in previous.keys() | self._snapshot.keys() if previous.get(path) != self._snapshot.get(path)}
+
+    def close(self):
+        pass
+
+
+@dataclass
+class WatchUpdate:
+    """Résultat d'une nouvelle analyse : les fichiers concernés et les modules dont le compte a changé."""
+    # (chemin relatif, issues trouvées (None si le fichier n'est plus analysé), nombre d'issues avant)
+    files: List[Tuple[str, Optional[List[Issue]], int]] = field(default_factory=list)
+    module_deltas: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class WatchSession:
+    """
+    Analyse « à chaud » d'un dossier d'addons : les checkers sont chargés une
+    seule fois et les issues de chaque fichier gardées en mémoire, pour ne
+    ré-analyser que les fichiers modifiés.
+    """
+
+    def __init__(self, path: str, from_version: float, to_version: float, exclude: Optional[List[str]] = None):
+        self.path = os.path.abspath(path)
+        self.from_version, self.to_version = from_version, to_version
+        self.exclude = exclude
+        rules = select_rules(from_version, to_version)
+        self.checkers = [registry.load_class(entry)() for entry, _ in rules]
+        self.hop_tags = registry.hop_tags(rules)
+        python_checkers, xml_checkers = split_checkers(self.checkers)
+        self.extensions = [ext for ext, rules in ((".py", python_checkers), (".xml", xml_checkers)) if rules]
+        self.python_engine, self.xml_engine = build_engines(self.checkers)
+        # Chemin relatif -> (module, issues du fichier).
+        self.results: Dict[str, Tuple[str, List[Issue]]] = {}
+        self.module_counts: Counter = Counter()
+
+    def iter_files(self):
+        return discovery.iter_odoo_files(self.path, extensions=self.extensions, exclude=self.exclude)
+
+    def scan(self, jobs: int = 1, audit_cache: Optional[AuditCache] = None):
+        """Analyse complète de départ (en parallèle et avec le cache incrémental, comme `audit`)."""
+        files = list(self.iter_files())
+        issues_by_file: Dict[str, List[Issue]] = {}
+        tagged_issues = HopTaggingSink([], self.hop_tags)
+        analyze_files(files, self.checkers, self.from_version, self.to_version,
+                      jobs=jobs, audit_cache=audit_cache, issues_sink=tagged_issues)
+        for issue in tagged_issues.sink:
+            issues_by_file.setdefault(issue.file_path, []).append(issue)
+
+        self.results = {
+            relative_path: (module_name, issues_by_file.get(relative_path, []))
+            for module_name, _, relative_path in files
+        }
+        self.module_counts = Counter({module_name: 0 for module_name, _ in self.results.values()})
+        for module_name, issues in self.results.values():
+            self.module_counts[module_name] += len(issues)
+
+    def all_issues(self, relative_paths: Optional[Iterable[str]] = None) -> List[Issue]:
+        """Les issues en mémoire, de tous les fichiers ou seulement de `relative_paths`."""
+        paths = self.results.keys() if relative_paths is None else relative_paths
+        return [issue for path in sorted(paths) if path in self.results for issue in self.results[path][1]]
+
+    def apply_changes(self, paths: Iterable[str]) -> WatchUpdate:
+        """
+        Ré-analyse les fichiers correspondant aux chemins modifiés (absolus).
+
+        Un manifest modifié, un dossier créé ou supprimé peuvent changer le
+        rattachement des fichiers aux modules : la découverte est alors refaite,
+        mais seuls les fichiers dont le module a changé sont ré-analysés.
+        """
+        start = time.perf_counter()
+        suffixes = tuple(self.extensions)
+        relative_paths, rediscover = set(), False
+        for path in paths:
+            relative_path = os.path.relpath(path, self.path)
+            if relative_path == os.curdir:
+                rediscover = True
+                continue
+            if relative_path.startswith(os.pardir):
+                continue
+            name = os.path.basename(path)
+            if name.endswith(suffixes):
+                relative_paths.add(relative_path)
+            if name == discovery.MANIFEST_FILE_NAME or os.path.isdir(path):
+                rediscover = True
+            elif not name.endswith(suffixes) and not os.path.exists(path):
+                # Un dossier supprimé contenait peut-être des fichiers analysés.
+                prefix = relative_path + os.sep
+                rediscover = rediscover or any(known.startswith(prefix) for known in self.results)
+
+        if rediscover:
+            current = {relative_path: module_name for module_name, _, relative_path in self.iter_files()}
+            relative_paths.update(path for path in current if self.results.get(path, (None,))[0] != current[path])
+            relative_paths.update(path for path in self.results if path not in current)
+
+        update = self._refresh(relative_paths)
+        update.seconds = time.perf_counter() - start
+        return update
+
+    def _refresh(self, relative_paths: Set[str]) -> WatchUpdate:
+        update = WatchUpdate()
+        entries = {
+            relative_path: (module_name, file_path)
+            for module_name, file_path, relative_path in discovery.iter_changed_files(
+                self.path, sorted(relative_paths), extensions=self.extensions, exclude=self.exclude
+            )
+        }
+        deltas: Counter = Counter()
+        for relative_path in sorted(relative_paths):
+            previous_module, previous_issues = self.results.pop(relative_path, (None, []))
+            if previous_module is not None:
+                deltas[previous_module] -= len(previous_issues)
+
+            issues = None
+            if relative_path in entries:
+                module_name, file_path = entries[relative_path]
+                issues, warnings, _ = analyze_file(module_name, file_path, relative_path,
+                                                   self.python_engine, self.xml_engine)
+                for warning in warnings:
+                    print(warning)
+                for issue in issues:
+                    issue.migration_hop = self.hop_tags.get(issue.issue_code, "")
+                self.results[relative_path] = (module_name, issues)
+                deltas[module_name] += len(issues)
+            if previous_module is not None or issues is not None:
+                update.files.append((relative_path, issues, len(previous_issues)))
+
+        for module_name, delta in deltas.items():
+            self.module_counts[module_name] += delta
+        # Modules supprimés (ou dont tous les fichiers ont été déplacés).
+        for module_name in list(deltas):
+            if not any(module == module_name for module, _ in self.results.values()):
+                del self.module_counts[module_name]
+        update.module_deltas = {module_name: delta for module_name, delta in deltas.items() if delta}
+        return update
+
+
+class DeltaPusher:
+    """
+    Envoie au backend l'état de la session, au plus toutes les `interval` secondes.
+
+    Le premier envoi est un rapport complet ; les suivants sont des audits
+    partiels qui ne contiennent que les fichiers modifiés depuis l'envoi
+    précédent, sur lequel ils s'appuient (`base_run`) : le backend reprend les
+    issues des autres fichiers sans que l'agent ait à les renvoyer.
+    Un envoi qui échoue est retenté à l'échéance suivante, avec les changements accumulés.
+    Si l'analyse de base a échoué côté serveur (ou est refusée comme base), le
+    prochain envoi repart d'un rapport complet.
+    """
+
+    def __init__(self, session: WatchSession, api_key: str, interval: float = DEFAULT_PUSH_INTERVAL):
+        self.session = session
+        self.api_key = api_key
+        self.interval = interval
+        self.last_run_id: Optional[int] = None
+        self.pending: Set[str] = set()
+        self._last_attempt = float('-inf')
+
+    def add(self, relative_paths: Iterable[str]):
+        self.pending.update(relative_paths)
+
+    def timeout(self) -> Optional[float]:
+        """Délai avant le prochain envoi (None s'il n'y a rien à envoyer)."""
+        if self.last_run_id is not None and not self.pending:
+            return None
+        return max(0.0, self._last_attempt + self.interval - time.monotonic())
+
+    def push_if_due(self):
+        if self.timeout() != 0.0:
+            return
+        import requests
+        from . import api_client
+
+        self._last_attempt = time.monotonic()
+        if self.last_run_id is not None:
+            # Un audit partiel s'appuie sur l'envoi précédent : s'il a échoué (ou a disparu), on repart de zéro.
+            try:
+                base_status = api_client.get_submission(self.last_run_id, self.api_key, max_attempts=1)["status"]
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or not 400 <= e.response.status_code < 500:
+                    print(f"Could not reach the server, retrying in {self.interval:.0f}s: {e}")
+                    return
+                base_status = "MISSING"
+            except requests.exceptions.RequestException as e:
+                print(f"Could not reach the server, retrying in {self.interval:.0f}s: {e}")
+                return
+            if base_status in ("FAILED", "MISSING"):
+                self._restart_from_full_report(f"analysis #{self.last_run_id} is {base_status.lower()} on the server")
+        full = self.last_run_id is None
+        changed_files = None if full else sorted(self.pending)
+        pushed = set(self.pending)
+        try:
+            with IssueSpool() as spool:
+                spool.extend(self.session.all_issues(changed_files))
+                submission = None if full else {"changed_files": changed_files, "base_run": self.last_run_id}
+                response = api_client.submit_report(
+                    spool, self.api_key, max_attempts=1, verbose=False, submission=submission,
+                )
+        except requests.exceptions.HTTPError as e:
+            response = e.response
+            if not full and response is not None and 400 <= response.status_code < 500 and "base_run" in response.text:
+                self._restart_from_full_report(f"the server refused analysis #{self.last_run_id} as a base")
+                # Pas d'attente : le rapport complet part au prochain tour de boucle.
+                self._last_attempt = float('-inf')
+                return
+            print(f"Could not push the changes to the server, retrying in {self.interval:.0f}s: {e}")
+            return
+        except requests.exceptions.RequestException as e:
+            print(f"Could not push the changes to the server, retrying in {self.interval:.0f}s: {e}")
+            return
+        self.last_run_id = response["id"]
+        self.pending -= pushed
+        what = "full report" if full else f"changes of {len(changed_files)} file(s)"
+        print(f"Pushed the {what} to the server (analysis #{self.last_run_id}).")
+
+    def _restart_from_full_report(self, reason: str):
+        print(f"Pushing a full report instead of the changes: {reason}.")
+        self.last_run_id = None
+
+
+def format_update(update: WatchUpdate, session: WatchSession) -> str:
+    """Met en forme le résultat d'une nouvelle analyse : issues des fichiers modifiés et comptes par module."""
+    lines = [f"[{datetime.now():%H:%M:%S}] Re-checked {len(update.files)} file(s) in {update.seconds * 1000:.1f} ms"]
+    for relative_path, issues, previous_count in update.files:
+        if issues is None:
+            lines.append(f"  {relative_path}: removed ({-previous_count:+d} issue(s))")
+            continue
+        lines.append(f"  {relative_path}: {len(issues)} issue(s) ({len(issues) - previous_count:+d})")
+        for issue in issues:
+            lines.append(f"    L{issue.line_number} [{issue.severity}] {issue.issue_code}: {issue.description}")
+    for module_name, delta in sorted(update.module_deltas.items()):
+        if module_name in session.module_counts:
+            lines.append(f"  -> {module_name}: {session.module_counts[module_name]} issue(s) ({delta:+d})")
+        else:
+            lines.append(f"  -> {module_name}: module removed ({delta:+d} issue(s))")
+    lines.append(f"  Total: {sum(session.module_counts.values())} issue(s)")
+    return "\n".join(lines)
+
+
+def format_module_counts(session: WatchSession) -> str:
+    lines = [f"{'module':<40} {'issues':>7}", "-" * 48]
+    for module_name, count in sorted(session.module_counts.items()):
+        lines.append(f"{module_name:<40} {count:>7}")
+    lines.append("-" * 48)
+    lines.append(f"{'total':<40} {sum(session.module_counts.values()):>7}")
+    return "\n".join(lines)
+
+
+def make_watcher(session: WatchSession, polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """inotify si possible, sinon (ou avec `polling`) la surveillance par scrutation."""
+    if not polling:
+        try:
+            return InotifyWatcher(session.path)
+        except OSError as e:
+            print(f"inotify unavailable ({e}), falling back to polling every {poll_interval:g}s.")
+    return PollingWatcher(lambda: (file_path for _, file_path, _ in session.iter_files()), poll_interval)
+
+
+def watch(session: WatchSession, watcher, pusher: Optional[DeltaPusher] = None,
+          on_update: Callable[[WatchUpdate], None] = None):
+    """Boucle de surveillance : ré-analyse les fichiers modifiés jusqu'à interruption (Ctrl+C)."""
+    while True:
+        changed = watcher.wait(pusher.timeout() if pusher is not None else None)
+        if changed:
+            while True:
+                more = watcher.wait(DEBOUNCE_SECONDS)
+                if not more:
+                    break
+                changed |= more
+            update = session.apply_changes(changed)
+            if update.files:
+                if on_update is not None:
+                    on_update(update)
+                if pusher is not None:
+                    pusher.add(relative_path for relative_path, _, _ in update.files)
+        if pusher is not None:
+            pusher.push_if_due()
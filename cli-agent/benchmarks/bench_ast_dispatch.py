@@ -0,0 +1,77 @@
+# benchmarks/bench_ast_dispatch.py
+"""
+Compare le coût de l'analyse Python selon le nombre de règles :
+- "legacy" : chaque checker parcourt lui-même l'arbre (un ast.walk par règle) ;
+- "engine" : PythonRuleEngine parcourt l'arbre une seule fois et distribue les nœuds.
+
+Usage (depuis le dossier cli-agent) :
+    python -m benchmarks.bench_ast_dispatch [--rules 1 8 32 128] [--repeat 5]
+"""
+import argparse
+import ast
+import time
+
+from auditor.checkers.python_checkers import DeprecatedApiOneChecker, DirectSQLChecker
+from auditor.engine import PythonRuleEngine
+
+SAMPLE_METHOD = '''
+    @api.depends('line_ids.amount')
+    def _compute_total_{i}(self):
+        for record in self:
+            total = sum(line.amount for line in record.line_ids if line.state != 'cancel')
+            record.total_{i} = total * 1.{i}
+            self.env.cr.execute("SELECT id FROM sale_order WHERE id = %s", (record.id,))
+'''
+
+
+def build_tree(methods: int) -> ast.AST:
+    """Génère un modèle Odoo synthétique de `methods` méthodes et le parse."""
+    source = "from odoo import api, models\n\nclass SaleOrder(models.Model):\n    _inherit = 'sale.order'\n"
+    source += "".join(SAMPLE_METHOD.format(i=i) for i in range(methods))
+    return ast.parse(source)
+
+
+def make_checkers(count: int):
+    """Crée `count` règles en clonant les checkers existants sous des codes distincts."""
+    templates = [DeprecatedApiOneChecker, DirectSQLChecker]
+    checkers = []
+    for i in range(count):
+        base = templates[i % len(templates)]
+        clone = type(f"{base.__name__}Clone{i}", (base,), {"ISSUE_CODE": f"{base.ISSUE_CODE}-{i}"})
+        checkers.append(clone())
+    return checkers
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--methods', type=int, default=300, help="Number of methods in the synthetic file.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tree = build_tree(args.methods)
+    nodes = sum(1 for _ in ast.walk(tree))
+    walk_time = best_of(lambda: sum(1 for _ in ast.walk(tree)), args.repeat)
+    print(f"Synthetic file: {args.methods} methods, {nodes} AST nodes, one ast.walk = {walk_time * 1000:.2f} ms\n")
+    print(f"{'rules':>6} {'legacy (ms)':>12} {'engine (ms)':>12} {'speedup':>8}")
+
+    for count in args.rules:
+        checkers = make_checkers(count)
+        engine = PythonRuleEngine(checkers)
+
+        legacy = best_of(lambda: [c.check(tree, 'bench.py', 'bench') for c in checkers], args.repeat)
+        fused = best_of(lambda: engine.run(tree, 'bench.py', 'bench'), args.repeat)
+        print(f"{count:>6} {legacy * 1000:>12.2f} {fused * 1000:>12.2f} {legacy / fused:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_cold_start.py
+"""
+Mesure le démarrage à froid de la CLI : chaque commande est lancée dans un
+nouveau processus Python, et on compare au coût d'un interpréteur vide.
+Objectif : `odoo-auditor --help` en moins de 150 ms.
+
+Usage (depuis le dossier cli-agent) :
+    python -m benchmarks.bench_cold_start [--repeat 15]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = [
+    ("python (empty)", ["-c", "pass"]),
+    ("--help", ["-m", "auditor.main", "--help"]),
+    ("audit --help", ["-m", "auditor.main", "audit", "--help"]),
+    ("rules", ["-m", "auditor.main", "rules"]),
+]
+
+TARGET_MS = 150.0
+
+
+def time_command(args, repeat: int):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        durations.append((time.perf_counter() - start) * 1000)
+    return min(durations), statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'command':>16} | {'min (ms)':>9} | {'median (ms)':>11}")
+    print("-" * 42)
+    medians = {}
+    for label, command in COMMANDS:
+        best, median = time_command(command, args.repeat)
+        medians[label] = median
+        print(f"{label:>16} | {best:>9.1f} | {median:>11.1f}")
+
+    status = "OK" if medians["--help"] < TARGET_MS else "ABOVE TARGET"
+    print(f"\n--help: {medians['--help']:.1f} ms (target {TARGET_MS:.0f} ms) -> {status}")
+
+
+if __name__ == '__main__':
+    main()
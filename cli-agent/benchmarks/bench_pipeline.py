@@ -0,0 +1,247 @@
+# benchmarks/bench_pipeline.py
+"""
+Mesure chaque étape du pipeline d'audit sur un corpus synthétique
+(voir `benchmarks.synthetic_addons`) : découverte, lecture, parsing Python et
+XML, chaque checker séparément, construction du rapport et sérialisation,
+puis l'analyse complète (`run.analyze_files`, un seul processus, sans cache).
+
+Les résultats sont écrits en JSON et comparés à une référence : une étape est
+en régression si son meilleur temps dépasse celui de la référence, corrigé de
+la vitesse relative des deux machines (voir `calibrate`), de plus de
+`--threshold` (et d'au moins `--min-delta-ms`, pour ignorer le bruit sur les
+étapes très courtes). Le code de sortie vaut 1 en cas de régression.
+
+Usage (depuis le dossier cli-agent) :
+    python -m benchmarks.bench_pipeline [--output results.json] [--repeat 5]
+        [--baseline benchmarks/baseline.json] [--threshold 0.25] [--update-baseline]
+        [--modules 20] [--files-per-module 12] [--lines-per-file 300] [--hit-density 0.05]
+"""
+import argparse
+import ast
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from auditor import api_client, discovery, run
+from auditor.engine import PythonRuleEngine, XMLRuleEngine
+from auditor.report import IssueSpool
+
+from .synthetic_addons import generate_addons
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+RESULTS_SCHEMA_VERSION = 1
+
+# Paramètres du corpus : deux résultats ne sont comparables que s'ils sont identiques.
+CORPUS_KEYS = ('path', 'modules', 'files_per_module', 'lines_per_file', 'hit_density', 'seed')
+
+
+def measure(func, repeat: int):
+    """Exécute `func` `repeat` fois. Retourne (meilleur temps, temps médian, dernier résultat)."""
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings), result
+
+
+def calibrate(repeat: int) -> float:
+    """
+    Temps (ms) d'une charge fixe (parsing et parcours d'un AST), indépendante du corpus.
+    Les étapes sont comparées en multiples de ce temps, ce qui rend une référence
+    utilisable d'une machine (ou d'une charge système) à l'autre.
+    """
+    source = "def f(x):\n    return [i * x for i in range(10) if i % 2]\n" * 200
+    best, _, _ = measure(lambda: sum(1 for _ in ast.walk(ast.parse(source))), max(repeat, 5))
+    return round(best * 1000, 3)
+
+
+def run_benchmarks(root: str, repeat: int, from_version: float, to_version: float) -> dict:
+    stages = {}
+
+    def record(name, func, count=None):
+        best, median, result = measure(func, repeat)
+        stages[name] = {'best_ms': round(best * 1000, 3), 'median_ms': round(median * 1000, 3)}
+        if count is not None:
+            stages[name]['items'] = count(result) if callable(count) else count
+        return result
+
+    files = record('discovery', lambda: discovery.find_odoo_modules(root, extensions=('.py', '.xml')), len)
+
+    def read_all():
+        contents = []
+        for module_name, path, relative_path in files:
+            with open(path, 'rb') as f:
+                contents.append((module_name, relative_path, f.read()))
+        return contents
+
+    contents = record('read', read_all, len)
+    python_files = [c for c in contents if c[1].endswith('.py')]
+    xml_files = [c for c in contents if c[1].endswith('.xml')]
+
+    python_trees = record(
+        'parse_python', lambda: [(m, p, ast.parse(content)) for m, p, content in python_files], len
+    )
+    xml_trees = record(
+        'parse_xml',
+        lambda: [(m, p, etree.parse(io.BytesIO(content), parser=etree.XMLParser(recover=True)))
+                 for m, p, content in xml_files],
+        len,
+    )
+
+    checkers = run.load_checkers(from_version, to_version)
+    all_issues = []
+    for checker in sorted(checkers, key=lambda c: c.ISSUE_CODE):
+        # Chaque règle seule, sur les fichiers que son pré-filtre laisse passer, comme dans l'analyse.
+        if isinstance(checker, run.BasePythonChecker):
+            engine, trees, sources = PythonRuleEngine([checker]), python_trees, python_files
+        else:
+            engine, trees, sources = XMLRuleEngine([checker]), xml_trees, xml_files
+        selected = [tree for tree, source in zip(trees, sources) if engine.prefilter.may_match(source[2])]
+        issues = record(
+            f"checker:{checker.ISSUE_CODE}",
+            lambda: [issue for m, p, tree in selected for issue in engine.run(tree, p, m)],
+            len,
+        )
+        all_issues.extend(issues)
+
+    def build_report():
+        spool = IssueSpool()
+        spool.extend(all_issues)
+        spool.compressed_file()
+        return spool
+
+    spools = []
+    record('report_build', lambda: spools.append(build_report()) or spools[-1], len)
+    spool = spools[-1]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, 'report.json')
+        record('serialize_json', lambda: run.write_json_report(spool, json_path), len(all_issues))
+        record('serialize_upload', lambda: list(api_client.iter_batches(spool)), len)
+    for s in spools:
+        s.close()
+
+    def analyze():
+        # L'analyse complète affiche sa progression : on la fait taire.
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            return run.analyze_files(discovery.iter_odoo_files(root, extensions=('.py', '.xml')), checkers,
+                                     from_version, to_version, jobs=1)
+
+    record('end_to_end', analyze, len)
+    return stages
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> bool:
+    """Affiche la comparaison étape par étape. Retourne True si aucune étape n'a régressé."""
+    if {k: current['corpus'].get(k) for k in CORPUS_KEYS} != {k: baseline['corpus'].get(k) for k in CORPUS_KEYS}:
+        print("\nThe baseline was measured on a different corpus: comparison skipped.")
+        return True
+
+    # Les temps de référence sont ramenés à la vitesse de la machine courante.
+    scale = current['calibration_ms'] / baseline['calibration_ms']
+    print(f"\nMachine speed factor vs baseline: {scale:.2f} (calibration {current['calibration_ms']:.2f} ms "
+          f"vs {baseline['calibration_ms']:.2f} ms)")
+
+    ok = True
+    print(f"\n{'stage':<20} {'expected (ms)':>14} {'current (ms)':>13} {'change':>8}")
+    print('-' * 60)
+    for name, result in current['stages'].items():
+        reference = baseline['stages'].get(name)
+        if reference is None:
+            print(f"{name:<20} {'-':>14} {result['best_ms']:>13.2f} {'new':>8}")
+            continue
+        expected_ms = reference['best_ms'] * scale
+        delta = result['best_ms'] - expected_ms
+        change = delta / expected_ms if expected_ms else 0.0
+        regressed = change > threshold and delta > min_delta_ms
+        ok = ok and not regressed
+        print(f"{name:<20} {expected_ms:>14.2f} {result['best_ms']:>13.2f} {change:>+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', help="Benchmark an existing addons directory instead of a synthetic corpus.")
+    parser.add_argument('--modules', type=int, default=20)
+    parser.add_argument('--files-per-module', type=int, default=12)
+    parser.add_argument('--lines-per-file', type=int, default=300)
+    parser.add_argument('--hit-density', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--from-version', type=float, default=16.0)
+    parser.add_argument('--to-version', type=float, default=17.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Relative slowdown above which a stage is reported as a regression.")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help="Ignore slowdowns smaller than this, whatever their ratio.")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.path:
+            root = args.path
+            corpus = {'path': os.path.abspath(args.path)}
+        else:
+            root = tmp_dir
+            corpus = generate_addons(root, args.modules, args.files_per_module, args.lines_per_file,
+                                     args.hit_density, args.seed)
+            print(f"Synthetic corpus: {corpus['modules']} modules, {corpus['files']} files, {corpus['lines']} lines.")
+        calibration_ms = calibrate(args.repeat)
+        stages = run_benchmarks(root, args.repeat, args.from_version, args.to_version)
+        # Mesurée avant et après : la machine a pu ralentir pendant le benchmark.
+        calibration_ms = round((calibration_ms + calibrate(args.repeat)) / 2, 3)
+
+    results = {
+        'schema': RESULTS_SCHEMA_VERSION,
+        'corpus': corpus,
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'repeat': args.repeat,
+        'calibration_ms': calibration_ms,
+        'stages': stages,
+    }
+
+    print(f"\n{'stage':<20} {'best (ms)':>10} {'median (ms)':>12} {'items':>8}")
+    print('-' * 53)
+    for name, result in stages.items():
+        print(f"{name:<20} {result['best_ms']:>10.2f} {result['median_ms']:>12.2f} {result.get('items', ''):>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nBaseline written to {args.baseline}.")
+        return
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"\nNo baseline at {args.baseline} (use --update-baseline to create one).")
+        return
+
+    if not compare(results, baseline, args.threshold, args.min_delta_ms):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
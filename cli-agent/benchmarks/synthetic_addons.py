@@ -0,0 +1,386 @@
+# benchmarks/synthetic_addons.py
+"""
+Génère un dossier d'addons Odoo synthétique, de taille configurable, pour les
+benchmarks : modèles Python (champs, méthodes calculées, onchange, surcharges),
+vues XML (form, tree, search, actions, menus) et fichiers de données.
+
+Une fraction des blocs générés (`--hit-density`) déclenche une règle
+(@api.one, SQL direct, track_visibility) ; d'autres contiennent les jetons
+déclencheurs sans être des problèmes, comme dans du vrai code. La génération
+est déterministe pour une graine donnée.
+
+Usage (depuis le dossier cli-agent) :
+    python -m benchmarks.synthetic_addons OUTPUT_DIR [--modules 20] [--files-per-module 12]
+        [--lines-per-file 300] [--hit-density 0.05] [--seed 0]
+"""
+import argparse
+import json
+import os
+import random
+from collections import Counter
+
+MANIFEST = """{{
+    'name': '{title}',
+    'version': '16.0.1.0.0',
+    'summary': 'Synthetic module generated for benchmarks.',
+    'author': 'Odoo Auditor',
+    'license': 'LGPL-3',
+    'depends': ['base', 'mail', 'sale'],
+    'data': [
+{data}
+    ],
+    'installable': True,
+    'auto_install': False,
+}}
+"""
+
+MODEL_HEADER = """# -*- coding: utf-8 -*-
+import logging
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError, ValidationError
+
+_logger = logging.getLogger(__name__)
+
+
+class {class_name}(models.Model):
+    _name = '{model}'
+    _description = '{title}'
+    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _order = 'sequence, id desc'
+
+    name = fields.Char(required=True, index=True, copy=False, default=lambda self: _('New'))
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+    company_id = fields.Many2one('res.company', default=lambda self: self.env.company, required=True)
+    partner_id = fields.Many2one('res.partner', string='Customer', tracking=True)
+    currency_id = fields.Many2one(related='company_id.currency_id', store=True)
+    line_ids = fields.One2many('{model}.line', 'order_id', copy=True)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('confirmed', 'Confirmed'),
+        ('done', 'Done'),
+        ('cancel', 'Cancelled'),
+    ], default='draft', tracking=True)
+    note = fields.Html()
+"""
+
+# Blocs de méthodes ordinaires ; `{i}` rend chaque nom unique dans le fichier.
+METHOD_BLOCKS = [
+    """
+    amount_{i} = fields.Monetary(compute='_compute_amount_{i}', store=True, currency_field='currency_id')
+
+    @api.depends('line_ids.price_subtotal', 'line_ids.state')
+    def _compute_amount_{i}(self):
+        for record in self:
+            lines = record.line_ids.filtered(lambda line: line.state != 'cancel')
+            record.amount_{i} = sum(lines.mapped('price_subtotal'))
+""",
+    """
+    @api.onchange('partner_id')
+    def _onchange_partner_{i}(self):
+        if not self.partner_id:
+            return
+        self.note = self.partner_id.comment
+        if self.partner_id.user_id:
+            self.activity_schedule('mail.mail_activity_data_todo', user_id=self.partner_id.user_id.id)
+""",
+    """
+    def action_confirm_{i}(self):
+        for record in self:
+            if not record.line_ids:
+                raise UserError(_('You cannot confirm %s without lines.', record.name))
+            record.write({{'state': 'confirmed'}})
+            record.message_post(body=_('Confirmed by %s', self.env.user.name))
+        return True
+""",
+    """
+    @api.constrains('sequence', 'state')
+    def _check_sequence_{i}(self):
+        for record in self:
+            if record.state == 'done' and record.sequence < 0:
+                raise ValidationError(_('Sequence must be positive.'))
+""",
+    """
+    def _prepare_values_{i}(self, values):
+        # Nothing to execute here: the values are only prepared for the wizard.
+        values = dict(values or {{}})
+        values.setdefault('company_id', self.env.company.id)
+        values.setdefault('partner_id', self.partner_id.id)
+        return values
+""",
+    """
+    def _cron_cleanup_{i}(self):
+        domain = [('state', '=', 'cancel'), ('write_date', '<', fields.Datetime.subtract(fields.Datetime.now(), days=30))]
+        records = self.search(domain, limit=500)
+        _logger.info('Removing %s cancelled records', len(records))
+        records.unlink()
+""",
+]
+
+# Blocs qui déclenchent une règle.
+PYTHON_HIT_BLOCKS = [
+    ("PY001", """
+    @api.one
+    def _compute_display_{i}(self):
+        self.display_name = '%s (%s)' % (self.name, self.partner_id.name or '')
+"""),
+    ("PY002", """
+    def _read_totals_{i}(self):
+        self.env.cr.execute(
+            "SELECT partner_id, SUM(amount_{i}) FROM {table} WHERE state = %s GROUP BY partner_id",
+            ('done',),
+        )
+        return dict(self.env.cr.fetchall())
+"""),
+    ("PY002", """
+    def _reset_sequence_{i}(self):
+        self._cr.execute("UPDATE {table} SET sequence = 10 WHERE sequence IS NULL")
+"""),
+]
+
+VIEW_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<odoo>
+"""
+
+VIEW_BLOCKS = [
+    """
+    <record id="view_{slug}_{i}_form" model="ir.ui.view">
+        <field name="name">{model}.form.{i}</field>
+        <field name="model">{model}</field>
+        <field name="arch" type="xml">
+            <form string="{title}">
+                <header>
+                    <button name="action_confirm_0" type="object" string="Confirm" class="oe_highlight"
+                            invisible="state != 'draft'"/>
+                    <field name="state" widget="statusbar" statusbar_visible="draft,confirmed,done"/>
+                </header>
+                <sheet>
+                    <group>
+                        <field name="name"/>
+                        <field name="partner_id"/>
+                        <field name="company_id" groups="base.group_multi_company"/>
+                    </group>
+                    <notebook>
+                        <page string="Lines">
+                            <field name="line_ids"/>
+                        </page>
+                        <page string="Notes">
+                            <field name="note"/>
+                        </page>
+                    </notebook>
+                </sheet>
+                <div class="oe_chatter">
+                    <field name="message_follower_ids"/>
+                    <field name="message_ids"/>
+                </div>
+            </form>
+        </field>
+    </record>
+""",
+    """
+    <record id="view_{slug}_{i}_tree" model="ir.ui.view">
+        <field name="name">{model}.tree.{i}</field>
+        <field name="model">{model}</field>
+        <field name="arch" type="xml">
+            <tree decoration-muted="state == 'cancel'">
+                <field name="sequence" widget="handle"/>
+                <field name="name"/>
+                <field name="partner_id"/>
+                <field name="state"/>
+            </tree>
+        </field>
+    </record>
+""",
+    """
+    <record id="view_{slug}_{i}_search" model="ir.ui.view">
+        <field name="name">{model}.search.{i}</field>
+        <field name="model">{model}</field>
+        <field name="arch" type="xml">
+            <search>
+                <field name="name"/>
+                <field name="partner_id"/>
+                <filter name="draft" string="Draft" domain="[('state', '=', 'draft')]"/>
+                <group expand="0" string="Group By">
+                    <filter name="group_state" string="Status" context="{{'group_by': 'state'}}"/>
+                </group>
+            </search>
+        </field>
+    </record>
+""",
+    """
+    <record id="action_{slug}_{i}" model="ir.actions.act_window">
+        <field name="name">{title}</field>
+        <field name="res_model">{model}</field>
+        <field name="view_mode">tree,form</field>
+        <field name="context">{{'search_default_draft': 1}}</field>
+    </record>
+    <menuitem id="menu_{slug}_{i}" name="{title} {i}" action="action_{slug}_{i}" sequence="{i}"/>
+""",
+]
+
+XML_HIT_BLOCKS = [
+    ("XML001", """
+    <record id="view_{slug}_{i}_form_inherit" model="ir.ui.view">
+        <field name="name">{model}.form.inherit.{i}</field>
+        <field name="model">{model}</field>
+        <field name="inherit_id" ref="view_{slug}_0_form"/>
+        <field name="arch" type="xml">
+            <xpath expr="//field[@name='partner_id']" position="after">
+                <field name="note" track_visibility="onchange"/>
+            </xpath>
+        </field>
+    </record>
+"""),
+]
+
+DATA_BLOCKS = [
+    """
+    <record id="seq_{slug}_{i}" model="ir.sequence">
+        <field name="name">{title} {i}</field>
+        <field name="code">{model}.{i}</field>
+        <field name="prefix">{prefix}/%(year)s/</field>
+        <field name="padding">5</field>
+        <field name="company_id" eval="False"/>
+    </record>
+""",
+    """
+    <record id="cron_{slug}_{i}" model="ir.cron">
+        <field name="name">{title}: cleanup {i}</field>
+        <field name="model_id" ref="model_{slug}"/>
+        <field name="state">code</field>
+        <field name="code">model._cron_cleanup_0()</field>
+        <field name="interval_number">1</field>
+        <field name="interval_type">days</field>
+        <field name="numbercall">-1</field>
+    </record>
+""",
+    """
+    <record id="category_{slug}_{i}" model="res.partner.category">
+        <field name="name">{title} tag {i}</field>
+        <field name="color" eval="{i} % 11"/>
+    </record>
+""",
+]
+
+FOOTER = "</odoo>\n"
+
+
+def _fill(header: str, blocks, hit_blocks, lines_per_file: int, hit_density: float,
+          rng: random.Random, hits: Counter, context: dict) -> str:
+    """Ajoute des blocs (ordinaires ou déclencheurs) jusqu'à atteindre `lines_per_file` lignes."""
+    parts = [header.format(**context)]
+    line_count = parts[0].count('\n')
+    i = 0
+    while line_count < lines_per_file:
+        if hit_blocks and rng.random() < hit_density:
+            code, block = rng.choice(hit_blocks)
+            hits[code] += 1
+        else:
+            block = rng.choice(blocks)
+        part = block.format(i=i, **context)
+        parts.append(part)
+        line_count += part.count('\n')
+        i += 1
+    return ''.join(parts)
+
+
+def generate_addons(output_dir: str, modules: int = 20, files_per_module: int = 12, lines_per_file: int = 300,
+                    hit_density: float = 0.05, seed: int = 0) -> dict:
+    """
+    Écrit `modules` modules dans `output_dir`.
+
+    Chaque module contient `files_per_module` fichiers analysables, répartis
+    entre modèles Python (la moitié), vues XML et données XML.
+
+    Returns:
+        Les caractéristiques du corpus, dont le nombre d'issues attendu par règle.
+    """
+    rng = random.Random(seed)
+    hits = Counter()
+    files = lines = 0
+
+    for m in range(modules):
+        slug = f"synthetic_{m:03d}"
+        module_dir = os.path.join(output_dir, slug)
+        os.makedirs(os.path.join(module_dir, 'models'), exist_ok=True)
+        os.makedirs(os.path.join(module_dir, 'views'), exist_ok=True)
+        os.makedirs(os.path.join(module_dir, 'data'), exist_ok=True)
+
+        python_count = max(1, files_per_module // 2)
+        xml_count = max(0, files_per_module - python_count)
+        view_count = (xml_count + 1) // 2
+        contents = {}
+
+        for f in range(python_count):
+            context = {
+                'class_name': f"SyntheticOrder{m}x{f}",
+                'model': f"x_synthetic.order{m}_{f}",
+                'table': f"x_synthetic_order{m}_{f}",
+                'title': f"Synthetic order {m}.{f}",
+            }
+            contents[f"models/order_{f}.py"] = _fill(
+                MODEL_HEADER, METHOD_BLOCKS, PYTHON_HIT_BLOCKS, lines_per_file, hit_density, rng, hits, context
+            )
+        contents['models/__init__.py'] = ''.join(f"from . import order_{f}\n" for f in range(python_count))
+        contents['__init__.py'] = "from . import models\n"
+
+        data_files = []
+        for f in range(xml_count):
+            context = {
+                'slug': f"{slug}_{f}",
+                'model': f"x_synthetic.order{m}_{f % python_count}",
+                'title': f"Synthetic {m}.{f}",
+                'prefix': f"S{m}{f}",
+            }
+            if f < view_count:
+                name = f"views/views_{f}.xml"
+                body = _fill(VIEW_HEADER, VIEW_BLOCKS, XML_HIT_BLOCKS, lines_per_file - 1, hit_density, rng, hits, context)
+            else:
+                name = f"data/data_{f}.xml"
+                body = _fill(VIEW_HEADER, DATA_BLOCKS, (), lines_per_file - 1, hit_density, rng, hits, context)
+            contents[name] = body + FOOTER
+            data_files.append(name)
+
+        contents['__manifest__.py'] = MANIFEST.format(
+            title=f"Synthetic module {m}",
+            data='\n'.join(f"        '{name}'," for name in data_files),
+        )
+
+        for name, content in contents.items():
+            with open(os.path.join(module_dir, name), 'w', encoding='utf-8') as fh:
+                fh.write(content)
+            if name.endswith(('.py', '.xml')) and not name.endswith('__.py'):
+                files += 1
+                lines += content.count('\n')
+
+    return {
+        'modules': modules,
+        'files_per_module': files_per_module,
+        'lines_per_file': lines_per_file,
+        'hit_density': hit_density,
+        'seed': seed,
+        'files': files,
+        'lines': lines,
+        'expected_hits': dict(sorted(hits.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_dir')
+    parser.add_argument('--modules', type=int, default=20)
+    parser.add_argument('--files-per-module', type=int, default=12)
+    parser.add_argument('--lines-per-file', type=int, default=300)
+    parser.add_argument('--hit-density', type=float, default=0.05,
+                        help="Probability that a generated block triggers a rule.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stats = generate_addons(args.output_dir, args.modules, args.files_per_module, args.lines_per_file,
+                            args.hit_density, args.seed)
+    print(json.dumps(stats, indent=4))
+
+
+if __name__ == '__main__':
+    main()
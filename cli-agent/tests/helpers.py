@@ -0,0 +1,49 @@
+# tests/helpers.py
+import os
+import shutil
+import tempfile
+import unittest
+
+# Projet d'exemple à la racine du dépôt : un module avec @api.one, du SQL direct et track_visibility.
+FAKE_ODOO_PROJECT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "fake_odoo_project")
+
+
+class TreeTestCase(unittest.TestCase):
+    """Fournit un dossier temporaire (`self.root`) supprimé à la fin de chaque test."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def write(self, relative_path: str, content: str = "") -> str:
+        """Écrit un fichier sous `self.root` (dossiers compris) et retourne son chemin complet."""
+        path = os.path.join(self.root, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def copy_fake_project(self) -> str:
+        """Copie le projet d'exemple dans le dossier temporaire et retourne son chemin."""
+        path = os.path.join(self.root, "addons")
+        shutil.copytree(FAKE_ODOO_PROJECT, path, ignore=shutil.ignore_patterns('__pycache__'))
+        return path
+
+
+def add_module(test: TreeTestCase, name: str, methods: int = 3, views: int = 1):
+    """Ajoute au dossier temporaire un module Odoo synthétique qui déclenche toutes les règles Python et XML."""
+    test.write(f"{name}/__manifest__.py", "{'name': '%s'}\n" % name)
+    body = "from odoo import api, models\n\n\nclass Model(models.Model):\n    _name = '%s.model'\n" % name
+    for i in range(methods):
+        body += (
+            f"\n    @api.one\n    def method_{i}(self):\n"
+            f"        self.env.cr.execute('SELECT {i}')\n"
+            f"        self._cr.execute('SELECT {i}')\n"
+        )
+    test.write(f"{name}/models/model.py", body)
+    test.write(f"{name}/models/clean.py", "def nothing_to_see():\n    return 1\n")
+    for i in range(views):
+        test.write(f"{name}/views/view_{i}.xml",
+                   "<odoo>\n  <record id='v%d' model='ir.ui.view'>\n"
+                   "    <field name='a' track_visibility='always'/>\n    <field name='b'/>\n"
+                   "    <!-- track_visibility -->\n  </record>\n</odoo>\n" % i)
@@ -0,0 +1,102 @@
+# tests/test_api_client.py
+import json
+import os
+import unittest
+from unittest import mock
+
+import requests
+
+from auditor import api_client
+
+from .helpers import TreeTestCase
+from .test_outbox import http_error, make_issues, make_spool
+
+SUBMISSIONS_URL = "http://auditor.test/api/submissions/"
+
+
+class FakeServer:
+    """Répond aux requêtes de `submit_report` ; `states` donne l'état des soumissions existantes."""
+
+    def __init__(self, states=None):
+        self.states = states or {}
+        self.calls = []
+
+    def request(self, method, url, max_attempts=None, **kwargs):
+        path = url[len(SUBMISSIONS_URL):]
+        self.calls.append((method, path))
+        if method == "GET":
+            run_id = int(path.strip('/'))
+            if run_id not in self.states:
+                raise http_error(404)
+            return self._response({"id": run_id, "received_batches": [], **self.states[run_id]})
+        if method == "POST" and not path:
+            return self._response({"id": 100, "status": "RUNNING", "received_batches": []})
+        if path.endswith("finalize/"):
+            return self._response({"id": int(path.split('/')[0]), "status": "PENDING"})
+        return self._response({})
+
+    @staticmethod
+    def _response(data):
+        response = mock.Mock(spec=requests.Response)
+        response.json.return_value = data
+        return response
+
+
+class SubmitReportTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest_path = os.path.join(self.root, api_client.UPLOAD_MANIFEST_FILE_NAME)
+        self.issues = make_issues(3)
+        patcher = mock.patch.object(api_client, "get_submissions_url", return_value=SUBMISSIONS_URL)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _submit(self, server, batch_size=2):
+        with make_spool(self.issues) as spool, \
+                mock.patch.object(api_client, "_request_with_retries", side_effect=server.request), \
+                mock.patch.object(api_client, "UPLOAD_BATCH_SIZE", batch_size):
+            return api_client.submit_report(spool, "key", self.manifest_path, verbose=False)
+
+    def _interrupted_upload(self, run_id=7, received=(1,)):
+        """Manifeste laissé par un envoi interrompu du même rapport."""
+        with make_spool(self.issues) as spool:
+            digest = api_client.report_digest(spool, 2)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"report_digest": digest, "run_id": run_id, "received_batches": list(received)}, f)
+
+    def test_new_submission(self):
+        server = FakeServer()
+        self.assertEqual(self._submit(server), {"id": 100, "status": "PENDING"})
+        self.assertEqual(server.calls, [
+            ("POST", ""), ("PUT", "100/batches/1/"), ("PUT", "100/batches/2/"), ("POST", "100/finalize/"),
+        ])
+        self.assertFalse(os.path.exists(self.manifest_path))
+
+    def test_interrupted_submission_is_resumed(self):
+        self._interrupted_upload()
+        server = FakeServer({7: {"status": "RUNNING", "received_batches": [1], "finalized": False}})
+        self._submit(server)
+        self.assertEqual(server.calls, [("GET", "7/"), ("PUT", "7/batches/2/"), ("POST", "7/finalize/")])
+
+    def test_finalized_submission_is_not_sent_again(self):
+        for status in ("PENDING", "RUNNING", "COMPLETED"):
+            self._interrupted_upload()
+            server = FakeServer({7: {"status": status, "finalized": True}})
+            self.assertEqual(self._submit(server), {"id": 7})
+            self.assertEqual(server.calls, [("GET", "7/")])
+            self.assertFalse(os.path.exists(self.manifest_path))
+
+    def test_expired_or_failed_submission_is_restarted(self):
+        # Une soumission expirée (ou une analyse échouée) est en FAILED : le rapport doit repartir en entier.
+        for state in ({"status": "FAILED", "finalized": False}, {"status": "FAILED"}, {"status": "UNKNOWN"}, None):
+            self._interrupted_upload()
+            server = FakeServer({7: state} if state is not None else {})
+            self.assertEqual(self._submit(server)["id"], 100)
+            self.assertEqual(server.calls, [
+                ("GET", "7/"), ("POST", ""), ("PUT", "100/batches/1/"), ("PUT", "100/batches/2/"),
+                ("POST", "100/finalize/"),
+            ])
+
+
+if __name__ == '__main__':
+    unittest.main()
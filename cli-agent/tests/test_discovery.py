@@ -0,0 +1,199 @@
+# tests/test_discovery.py
+import os
+import subprocess
+import unittest
+
+from auditor import discovery
+
+from .helpers import TreeTestCase
+
+
+class IgnorePatternTests(unittest.TestCase):
+    def _ignored(self, patterns, rel_path, is_dir=False, base=''):
+        return discovery.is_ignored(rel_path, is_dir, discovery.parse_ignore_patterns(patterns, base))
+
+    def test_unanchored_pattern_matches_at_any_level(self):
+        self.assertTrue(self._ignored(["*.pyc"], "a/b/c.pyc"))
+        self.assertTrue(self._ignored(["tests"], "mod/tests", is_dir=True))
+
+    def test_anchored_pattern(self):
+        self.assertTrue(self._ignored(["/build"], "build", is_dir=True))
+        self.assertFalse(self._ignored(["/build"], "mod/build", is_dir=True))
+        self.assertTrue(self._ignored(["mod/*.py"], "mod/a.py"))
+        self.assertFalse(self._ignored(["mod/*.py"], "mod/sub/a.py"))
+
+    def test_double_star(self):
+        self.assertTrue(self._ignored(["**/migrations/*.py"], "mod/migrations/1.py"))
+        self.assertTrue(self._ignored(["**/migrations/*.py"], "migrations/1.py"))
+        self.assertTrue(self._ignored(["mod/**"], "mod/a/b/c.xml"))
+
+    def test_directory_only_pattern(self):
+        self.assertTrue(self._ignored(["static/"], "mod/static", is_dir=True))
+        self.assertFalse(self._ignored(["static/"], "mod/static"))
+
+    def test_last_matching_rule_wins(self):
+        self.assertFalse(self._ignored(["*.xml", "!keep.xml"], "views/keep.xml"))
+        self.assertTrue(self._ignored(["*.xml", "!keep.xml", "views/*"], "views/keep.xml"))
+
+    def test_comments_escapes_and_character_classes(self):
+        self.assertFalse(self._ignored(["# comment", ""], "comment"))
+        self.assertTrue(self._ignored(["\\#file"], "#file"))
+        self.assertTrue(self._ignored(["data_[0-9].xml"], "data_7.xml"))
+        self.assertFalse(self._ignored(["data_[!0-9].xml"], "data_7.xml"))
+
+    def test_rules_apply_below_their_base(self):
+        self.assertTrue(self._ignored(["*.xml"], "mod/views/a.xml", base="mod"))
+        self.assertFalse(self._ignored(["*.xml"], "other/a.xml", base="mod"))
+
+
+class IterOdooFilesTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("sale_ext/__manifest__.py", "{}")
+        self.write("sale_ext/models/sale.py")
+        self.write("sale_ext/views/sale.xml")
+        self.write("sale_ext/static/src/app.js")
+        self.write("sale_ext/.hidden/secret.py")
+        self.write("sale_ext/__pycache__/sale.cpython-311.py")
+        self.write("sale_ext/sub_module/__manifest__.py", "{}")
+        self.write("sale_ext/sub_module/models/sub.py")
+        self.write("stock_ext/__manifest__.py", "{}")
+        self.write("stock_ext/models/stock.py")
+        self.write("not_a_module/script.py")
+
+    def _files(self, path=None, **kwargs):
+        return [(module, relative_path.replace(os.sep, '/'))
+                for module, _, relative_path in discovery.iter_odoo_files(path or self.root, **kwargs)]
+
+    def test_modules_and_stable_order(self):
+        self.assertEqual(self._files(), [
+            ("sale_ext", "sale_ext/__manifest__.py"),
+            ("sale_ext", "sale_ext/models/sale.py"),
+            ("sale_ext", "sale_ext/static/src/app.js"),
+            # Un module imbriqué est rattaché au module parent.
+            ("sale_ext", "sale_ext/sub_module/__manifest__.py"),
+            ("sale_ext", "sale_ext/sub_module/models/sub.py"),
+            ("sale_ext", "sale_ext/views/sale.xml"),
+            ("stock_ext", "stock_ext/__manifest__.py"),
+            ("stock_ext", "stock_ext/models/stock.py"),
+        ])
+
+    def test_extensions(self):
+        self.assertEqual([path for _, path in self._files(extensions=[".xml"])], ["sale_ext/views/sale.xml"])
+
+    def test_exclude_patterns(self):
+        files = self._files(exclude=["static/", "sub_module", "stock_ext/models/*.py"])
+        self.assertEqual([path for _, path in files], [
+            "sale_ext/__manifest__.py", "sale_ext/models/sale.py", "sale_ext/views/sale.xml",
+            "stock_ext/__manifest__.py",
+        ])
+
+    def test_gitignore_files(self):
+        self.write(".gitignore", "*.js\n")
+        self.write("sale_ext/.gitignore", "views/\n!models/\n")
+        self.write("sale_ext/models/.gitignore", "*.py\n!sale.py\n")
+        self.write("sale_ext/models/other.py")
+        paths = [path for _, path in self._files()]
+        self.assertNotIn("sale_ext/static/src/app.js", paths)
+        self.assertNotIn("sale_ext/views/sale.xml", paths)
+        self.assertNotIn("sale_ext/models/other.py", paths)
+        self.assertIn("sale_ext/models/sale.py", paths)
+        self.assertIn("sale_ext/static/src/app.js", [path for _, path in self._files(use_gitignore=False)])
+
+    def test_gitignore_above_project_path_applies_in_a_repository(self):
+        os.makedirs(os.path.join(self.root, ".git"))
+        self.write(".gitignore", "/sale_ext/models/\nstock.py\n")
+        self.assertEqual(self._files(os.path.join(self.root, "sale_ext"), extensions=[".py"]), [
+            ("sale_ext", "__manifest__.py"),
+            ("sale_ext", "sub_module/__manifest__.py"),
+            ("sale_ext", "sub_module/models/sub.py"),
+        ])
+        self.assertEqual(self._files(os.path.join(self.root, "stock_ext")), [("stock_ext", "__manifest__.py")])
+
+    def test_is_lazy_and_reports_modules(self):
+        discovered = []
+        files = discovery.iter_odoo_files(self.root, on_module=discovered.append)
+        next(files)
+        self.assertEqual(discovered, ["sale_ext"])
+        list(files)
+        self.assertEqual(discovered, ["sale_ext", "stock_ext"])
+
+
+class ChangedFilesTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("sale_ext/__manifest__.py", "{}")
+        self.write("sale_ext/models/sale.py", "a = 1\n")
+        self.write("sale_ext/models/old.py", "b = 1\n")
+        self.write("stock_ext/__manifest__.py", "{}")
+        self._git('init', '-q', '-b', 'main')
+        self._git('add', '.')
+        self._git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'base')
+
+    def _git(self, *args):
+        return subprocess.run(['git', *args], cwd=self.root, check=True, capture_output=True).stdout.decode()
+
+    def test_git_changed_files(self):
+        base = self._git('rev-parse', 'HEAD').strip()
+        self.write("sale_ext/models/sale.py", "a = 2\n")
+        os.remove(os.path.join(self.root, "sale_ext", "models", "old.py"))
+        self.write("stock_ext/models/new.py")
+        self.write(".gitignore", "*.log\n")
+        self.write("stock_ext/debug.log")
+        self.assertEqual(discovery.git_changed_files(self.root, base), [
+            ".gitignore",
+            os.path.join("sale_ext", "models", "old.py"),
+            os.path.join("sale_ext", "models", "sale.py"),
+            os.path.join("stock_ext", "models", "new.py"),
+        ])
+        # Chemins relatifs au dossier analysé, même s'il n'est pas la racine du dépôt.
+        self.assertEqual(discovery.git_changed_files(os.path.join(self.root, "stock_ext"), base),
+                         [os.path.join("models", "new.py")])
+
+    def test_git_clean_head(self):
+        head = self._git('rev-parse', 'HEAD').strip()
+        self.assertEqual(discovery.git_clean_head(self.root, [".py", ".xml"]), head)
+
+        # Les fichiers écrits par l'agent ne rendent pas l'arbre « modifié ».
+        self.write(".odoo-auditor-cache/audit-cache.sqlite3")
+        self.write(".odoo-auditor-cache/outbox/report.meta.json", "{}")
+        self.write("report.json", "{}")
+        self.write("sale_ext/static/notes.txt")
+        self.assertEqual(discovery.git_clean_head(self.root, [".py", ".xml"]), head)
+        self.assertEqual(discovery.git_clean_head(os.path.join(self.root, "sale_ext"), [".py"]), head)
+
+        # Un fichier non suivi qui serait analysé, si.
+        self.write("stock_ext/models/new.py")
+        self.assertIsNone(discovery.git_clean_head(self.root, [".py", ".xml"]))
+        self.assertEqual(discovery.git_clean_head(self.root, [".xml"]), head)
+        os.remove(os.path.join(self.root, "stock_ext", "models", "new.py"))
+
+        self.write("sale_ext/models/sale.py", "a = 2\n")
+        self.assertIsNone(discovery.git_clean_head(self.root, [".xml"]))
+        self.assertIsNone(discovery.git_clean_head(os.path.dirname(self.root)))
+
+    def test_git_errors(self):
+        with self.assertRaises(ValueError):
+            discovery.git_changed_files(self.root, "no-such-branch")
+        with self.assertRaises(ValueError):
+            discovery.git_merge_base(self.root, "--all")
+
+    def test_iter_changed_files(self):
+        self.write("notes/readme.py")
+        changed = [
+            os.path.join("sale_ext", "models", "sale.py"),
+            os.path.join("sale_ext", "models", "old.py"),
+            os.path.join("sale_ext", ".hidden", "x.py"),
+            os.path.join("sale_ext", "models", "deleted.py"),
+            os.path.join("notes", "readme.py"),
+            os.path.join("stock_ext", "__manifest__.py"),
+        ]
+        files = discovery.iter_changed_files(self.root, changed, extensions=[".py"], exclude=["old.py"])
+        self.assertEqual([(module, relative_path) for module, _, relative_path in files], [
+            ("sale_ext", os.path.join("sale_ext", "models", "sale.py")),
+            ("stock_ext", os.path.join("stock_ext", "__manifest__.py")),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+# tests/test_engine.py
+import ast
+import io
+import unittest
+from typing import List
+
+from lxml import etree
+
+from auditor.checkers.base_checker import BasePythonChecker, BaseXMLChecker
+from auditor.checkers.python_checkers import DeprecatedApiOneChecker, DirectSQLChecker
+from auditor.checkers.xml_checkers import TrackVisibilityChecker
+from auditor.engine import PythonRuleEngine, TokenPrefilter, XMLRuleEngine
+from auditor.report import Issue
+
+PYTHON_SOURCE = '''
+from odoo import api, models
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    @api.one
+    def first(self):
+        self.env.cr.execute("SELECT 1")
+
+    @api.multi
+    def second(self):
+        self._cr.execute("SELECT 2")
+        cursor.execute("SELECT 3")
+
+        def nested():
+            return self.env.cr.execute("SELECT 4")
+
+    class Inner:
+        @api.one
+        def third(self):
+            pass
+'''
+
+XML_SOURCE = b'''<odoo>
+    <record id="view" model="ir.ui.view">
+        <field name="arch" type="xml">
+            <!-- <field name="x" track_visibility="onchange"/> -->
+            <field name="a" track_visibility="onchange"/>
+            <group>
+                <field name="b"/>
+                <field name="c" track_visibility="always"/>
+            </group>
+            <button name="action" string="Go"/>
+        </field>
+    </record>
+</odoo>
+'''
+
+
+def _issue(checker, line: int, snippet: str, file_path: str, module_name: str) -> Issue:
+    return Issue(checker.ISSUE_CODE, checker.SEVERITY, module_name, file_path, line, checker.DESCRIPTION, snippet)
+
+
+class FunctionNameChecker(BasePythonChecker):
+    """Règle « par nœud » sur une classe de base AST (ast.stmt couvre FunctionDef et ClassDef)."""
+    ISSUE_CODE = "TEST-PY-STMT"
+    NODE_TYPES = (ast.stmt,)
+
+    def visit(self, node, file_path, module_name):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            return [_issue(self, node.lineno, node.name, file_path, module_name)]
+        return []
+
+
+class WholeTreeChecker(BasePythonChecker):
+    """Règle historique : surcharge `check()` et reçoit l'arbre complet."""
+    ISSUE_CODE = "TEST-PY-TREE"
+
+    def check(self, ast_tree, file_path, module_name):
+        return [_issue(self, 1, str(len(ast_tree.body)), file_path, module_name)]
+
+
+class ButtonChecker(BaseXMLChecker):
+    """Règle déclarée par une requête XPath absolue."""
+    ISSUE_CODE = "TEST-XML-XPATH"
+    XPATH = "//button[@name]"
+
+    def visit(self, element, file_path, module_name):
+        return [_issue(self, element.sourceline, element.get('name'), file_path, module_name)]
+
+
+class AnyElementChecker(BaseXMLChecker):
+    """Règle qui visite tous les éléments ('*') ; les autres balises déclarées sont redondantes."""
+    ISSUE_CODE = "TEST-XML-ANY"
+    TAGS = ('field', '*')
+
+    def visit(self, element, file_path, module_name):
+        return [_issue(self, element.sourceline, element.tag, file_path, module_name)]
+
+
+class FieldWithoutConditionChecker(BaseXMLChecker):
+    ISSUE_CODE = "TEST-XML-FIELD"
+    TAGS = ('field',)
+
+    def visit(self, element, file_path, module_name):
+        return [_issue(self, element.sourceline, element.get('name'), file_path, module_name)]
+
+
+class WholeDocumentChecker(BaseXMLChecker):
+    ISSUE_CODE = "TEST-XML-DOC"
+
+    def check(self, xml_tree, file_path, module_name):
+        return [_issue(self, 1, xml_tree.getroot().tag, file_path, module_name)]
+
+
+def _per_rule(checkers, tree) -> List[Issue]:
+    """Ancien chemin d'exécution : chaque règle parcourt l'arbre elle-même, l'une après l'autre."""
+    return [issue for checker in checkers for issue in checker.check(tree, "models/sale.py", "sale")]
+
+
+class PythonRuleEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.tree = ast.parse(PYTHON_SOURCE)
+
+    def test_single_walk_matches_per_rule_checks(self):
+        checkers = [DirectSQLChecker(), FunctionNameChecker(), WholeTreeChecker(), DeprecatedApiOneChecker()]
+        issues = PythonRuleEngine(checkers).run(self.tree, "models/sale.py", "sale")
+        self.assertEqual(issues, _per_rule(checkers, self.tree))
+
+    def test_builtin_rules_findings(self):
+        issues = PythonRuleEngine([DeprecatedApiOneChecker(), DirectSQLChecker()]).run(
+            self.tree, "models/sale.py", "sale")
+        self.assertEqual(
+            [(issue.issue_code, issue.line_number) for issue in issues],
+            [("PY001", 8), ("PY001", 21), ("PY002", 10), ("PY002", 14), ("PY002", 18)],
+        )
+
+    def test_base_class_node_types_dispatch(self):
+        engine = PythonRuleEngine([FunctionNameChecker()])
+        snippets = [issue.code_snippet for issue in engine.run(self.tree, "models/sale.py", "sale")]
+        self.assertEqual(sorted(snippets), ["Inner", "SaleOrder", "first", "nested", "second", "third"])
+        # Le cache de distribution ne retient que des types concrets.
+        self.assertIn(ast.FunctionDef, engine._handlers)
+        self.assertEqual(engine._handlers[ast.Call], ())
+
+
+class XMLRuleEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.tree = etree.parse(io.BytesIO(XML_SOURCE), parser=etree.XMLParser(recover=True))
+
+    def test_fused_walk_matches_per_rule_checks(self):
+        checkers = [TrackVisibilityChecker(), ButtonChecker(), AnyElementChecker(),
+                    FieldWithoutConditionChecker(), WholeDocumentChecker()]
+        issues = XMLRuleEngine(checkers).run(self.tree, "models/sale.py", "sale")
+        self.assertEqual(issues, _per_rule(checkers, self.tree))
+
+    def test_condition_and_comments(self):
+        issues = XMLRuleEngine([TrackVisibilityChecker()]).run(self.tree, "views/sale.xml", "sale")
+        # Le champ commenté n'est pas un élément : seuls les deux vrais champs sont signalés.
+        self.assertEqual([issue.line_number for issue in issues], [5, 8])
+
+    def test_wildcard_visits_each_element_once(self):
+        engine = XMLRuleEngine([AnyElementChecker()])
+        self.assertEqual(engine.tags, ('*',))
+        issues = engine.run(self.tree, "views/sale.xml", "sale")
+        elements = [el for el in self.tree.iter() if isinstance(el.tag, str)]
+        self.assertEqual([issue.code_snippet for issue in issues], [el.tag for el in elements])
+
+
+class TokenPrefilterTests(unittest.TestCase):
+    def test_matches_any_trigger_token(self):
+        prefilter = TokenPrefilter([DeprecatedApiOneChecker(), DirectSQLChecker()])
+        self.assertTrue(prefilter.may_match(b"@api.one\ndef f(self): pass"))
+        self.assertTrue(prefilter.may_match(b"cr.execute('x')"))
+        self.assertFalse(prefilter.may_match(b"@api.multi\ndef f(self): pass"))
+
+    def test_tokens_are_literal(self):
+        # Le '.' de "api.one" n'est pas un joker d'expression régulière.
+        self.assertFalse(TokenPrefilter([DeprecatedApiOneChecker()]).may_match(b"api_one"))
+
+    def test_disabled_when_a_rule_has_no_token(self):
+        prefilter = TokenPrefilter([DeprecatedApiOneChecker(), WholeTreeChecker()])
+        self.assertIsNone(prefilter.pattern)
+        self.assertTrue(prefilter.may_match(b"nothing relevant"))
+
+    def test_no_rule_lets_everything_through(self):
+        self.assertTrue(TokenPrefilter([]).may_match(b""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# tests/test_outbox.py
+import gzip
+import json
+import os
+import unittest
+from unittest import mock
+
+import requests
+
+from auditor import outbox
+from auditor.report import Issue, IssueSpool
+
+from .helpers import TreeTestCase
+
+API_KEY = "project-key"
+
+
+def make_issues(count: int):
+    return [Issue("PY001", "MAJOR", "mod", f"mod/file_{i}.py", i + 1, "Deprecated", f"@api.one  # {i}",
+                  migration_hop="16.0-17.0") for i in range(count)]
+
+
+def make_spool(issues) -> IssueSpool:
+    spool = IssueSpool()
+    spool.extend(issues)
+    return spool
+
+
+def http_error(status: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"HTTP {status}", response=response)
+
+
+class IssueSpoolTests(TreeTestCase):
+    def test_round_trip(self):
+        issues = make_issues(3) + [Issue("XML001", "MINOR", "mod", "mod/v.xml", 4, "é ✓", "<field/>")]
+        with make_spool(issues) as spool:
+            self.assertEqual(len(spool), 4)
+            self.assertEqual(list(spool), issues)
+            # Le spool peut être relu plusieurs fois.
+            self.assertEqual(list(spool), issues)
+            with self.assertRaises(RuntimeError):
+                spool.append(issues[0])
+
+    def test_compressed_file_is_ndjson_gzip(self):
+        issues = make_issues(2)
+        with make_spool(issues) as spool:
+            lines = gzip.decompress(spool.compressed_file().read()).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [issue.to_dict() for issue in issues])
+
+    def test_from_file(self):
+        issues = make_issues(5)
+        path = os.path.join(self.root, "report.ndjson.gz")
+        with make_spool(issues) as spool, open(path, 'wb') as f:
+            f.write(spool.compressed_file().read())
+        with IssueSpool.from_file(path) as spool:
+            self.assertEqual(len(spool), 5)
+            self.assertEqual(list(spool), issues)
+
+
+class OutboxTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outbox_dir = os.path.join(self.root, "outbox")
+        self.submitted = []
+
+    def _save(self, issues, api_key=API_KEY, metadata=None, manifest_path=None):
+        with make_spool(issues) as spool:
+            return outbox.save_report(spool, api_key, self.outbox_dir, metadata, manifest_path)
+
+    def _submit(self, issues, api_key, manifest_path=None, max_attempts=None, verbose=True, submission=None):
+        self.submitted.append((list(issues), manifest_path, submission))
+        return {"id": len(self.submitted)}
+
+    def _flush(self, side_effect=None):
+        with mock.patch("auditor.api_client.submit_report", side_effect=side_effect or self._submit):
+            return outbox.flush(self.outbox_dir, API_KEY, verbose=False)
+
+    def test_save_report_never_stores_the_api_key(self):
+        path = self._save(make_issues(2), metadata={"from_version": 16.0, "to_version": 17.0})
+        base = path[:-len(outbox.REPORT_SUFFIX)]
+        self.assertEqual(outbox.iter_reports(self.outbox_dir), [base])
+        with open(base + outbox.METADATA_SUFFIX, encoding='utf-8') as f:
+            content = f.read()
+        self.assertNotIn(API_KEY, content)
+        metadata = json.loads(content)
+        self.assertEqual(metadata["api_key_digest"], outbox.api_key_digest(API_KEY))
+        self.assertEqual((metadata["issues_count"], metadata["to_version"]), (2, 17.0))
+        self.assertEqual(os.stat(base + outbox.METADATA_SUFFIX).st_mode & 0o777, 0o600)
+
+    def test_flush_sends_reports_in_order_and_removes_them(self):
+        first, second = make_issues(2), make_issues(3)
+        submission = {"changed_files": ["mod/file_0.py"], "base_commit": "1" * 40}
+        paths = [self._save(first), self._save(second, metadata={"submission": submission})]
+
+        result = self._flush()
+        self.assertEqual(result.sent, paths)
+        self.assertEqual(([issues for issues, _, _ in self.submitted]), [first, second])
+        self.assertEqual([sent_submission for _, _, sent_submission in self.submitted], [None, submission])
+        # Chaque rapport est envoyé avec son propre manifeste, pour pouvoir reprendre l'envoi.
+        self.assertEqual([manifest for _, manifest, _ in self.submitted],
+                         [path[:-len(outbox.REPORT_SUFFIX)] + outbox.MANIFEST_SUFFIX for path in paths])
+        self.assertEqual(outbox.iter_reports(self.outbox_dir), [])
+
+    def test_manifest_follows_the_report(self):
+        manifest_path = os.path.join(self.root, "upload-manifest.json")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"run_id": 7}, f)
+        path = self._save(make_issues(1), manifest_path=manifest_path)
+        self.assertFalse(os.path.exists(manifest_path))
+        self.assertTrue(os.path.exists(path[:-len(outbox.REPORT_SUFFIX)] + outbox.MANIFEST_SUFFIX))
+
+    def test_reports_of_another_project_are_kept(self):
+        other = self._save(make_issues(1), api_key="other-key")
+        mine = self._save(make_issues(2))
+        result = self._flush()
+        self.assertEqual((result.sent, result.other_key), ([mine], [other]))
+        self.assertEqual(outbox.iter_reports(self.outbox_dir), [other[:-len(outbox.REPORT_SUFFIX)]])
+
+    def test_rejected_report_is_kept_and_next_ones_are_sent(self):
+        paths = [self._save(make_issues(1)), self._save(make_issues(2))]
+        calls = []
+
+        def submit(issues, *args, **kwargs):
+            calls.append(len(issues))
+            if len(calls) == 1:
+                raise http_error(400)
+            return {"id": 1}
+
+        result = self._flush(submit)
+        self.assertEqual((result.rejected, result.sent), ([paths[0]], [paths[1]]))
+        self.assertEqual(len(outbox.iter_reports(self.outbox_dir)), 1)
+
+    def test_server_error_stops_the_flush(self):
+        for count in (1, 2, 3):
+            self._save(make_issues(count))
+        for error in (http_error(503), requests.exceptions.ConnectionError("down")):
+            result = self._flush(mock.Mock(side_effect=error))
+            self.assertEqual((result.sent, result.remaining), ([], 3))
+        self.assertEqual(len(outbox.iter_reports(self.outbox_dir)), 3)
+
+    def test_report_without_metadata_is_ignored(self):
+        path = self._save(make_issues(1))
+        os.remove(path[:-len(outbox.REPORT_SUFFIX)] + outbox.METADATA_SUFFIX)
+        self.assertEqual(outbox.iter_reports(self.outbox_dir), [])
+        self.assertEqual(self._flush().sent, [])
+
+    def test_locked_outbox_is_not_flushed(self):
+        self._save(make_issues(1))
+        lock = outbox._acquire_lock(self.outbox_dir)
+        self.assertIsNotNone(lock)
+        try:
+            self.assertIsNone(outbox._acquire_lock(self.outbox_dir))
+            result = self._flush()
+            self.assertEqual((result.locked, result.remaining, self.submitted), (True, 1, []))
+        finally:
+            outbox._release_lock(self.outbox_dir, lock)
+        self.assertEqual(len(self._flush().sent), 1)
+
+    def test_stale_lock_is_taken_over(self):
+        self._save(make_issues(1))
+        lock_path = os.path.join(self.outbox_dir, outbox.LOCK_FILE_NAME)
+        with open(lock_path, 'w') as f:
+            f.write("12345")
+        stale = os.path.getmtime(lock_path) - outbox.STALE_LOCK_SECONDS - 1
+        os.utime(lock_path, (stale, stale))
+        self.assertEqual(len(self._flush().sent), 1)
+        self.assertFalse(os.path.exists(lock_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
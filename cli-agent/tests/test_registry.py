@@ -0,0 +1,119 @@
+# tests/test_registry.py
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+from auditor import registry
+
+from .helpers import TreeTestCase
+
+
+def _entry(code, start, end, only=None):
+    return {"module": "m", "class": code, "kind": "python", "issue_code": code, "severity": "INFO",
+            "description": "", "version": 1, "applies_from_version": start, "applies_to_version": end,
+            "applies_only_for_migration": only}
+
+
+class LoadIndexTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index_path = os.path.join(self.root, registry.INDEX_FILE_NAME)
+
+    def _read(self):
+        with open(self.index_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_missing_index_is_built_and_written(self):
+        entries = registry.load_index(self.index_path)
+        self.assertEqual(sorted(entry["issue_code"] for entry in entries), ["PY001", "PY002", "XML001"])
+        index = self._read()
+        self.assertEqual(index["schema"], registry.INDEX_SCHEMA_VERSION)
+        self.assertEqual(index["signature"], registry.checkers_signature())
+        self.assertEqual(index["checkers"], entries)
+        api_one = next(entry for entry in entries if entry["issue_code"] == "PY001")
+        self.assertEqual((api_one["module"], api_one["class"], api_one["kind"]),
+                         ("auditor.checkers.python_checkers", "DeprecatedApiOneChecker", "python"))
+
+    def test_up_to_date_index_is_read_without_importing_checkers(self):
+        registry.load_index(self.index_path)
+        index = self._read()
+        index["checkers"] = [_entry("FROM-INDEX", 8.0, 99.0)]
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        with mock.patch.object(registry, "build_index", side_effect=AssertionError("index rebuilt")):
+            self.assertEqual([entry["issue_code"] for entry in registry.load_index(self.index_path)], ["FROM-INDEX"])
+
+    def test_stale_index_is_rebuilt(self):
+        registry.load_index(self.index_path)
+        for change in ({"signature": [["python_checkers.py", 1, 1]]}, {"schema": 0}):
+            index = {**self._read(), **change, "checkers": [_entry("STALE", 8.0, 99.0)]}
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            codes = [entry["issue_code"] for entry in registry.load_index(self.index_path)]
+            self.assertNotIn("STALE", codes)
+            self.assertEqual(self._read()["signature"], registry.checkers_signature())
+
+    def test_corrupt_index_is_rebuilt(self):
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            f.write("{not json")
+        self.assertEqual(len(registry.load_index(self.index_path)), 3)
+
+    def test_load_class(self):
+        entries = registry.load_index(self.index_path)
+        for entry in entries:
+            checker = registry.load_class(entry)
+            self.assertEqual(checker.ISSUE_CODE, entry["issue_code"])
+            self.assertIs(checker, getattr(sys.modules[entry["module"]], entry["class"]))
+
+
+class MigrationHopsTests(unittest.TestCase):
+    def test_hops(self):
+        self.assertEqual(registry.migration_hops(16.0, 17.0), [(16.0, 17.0)])
+        self.assertEqual(registry.migration_hops(14.0, 17.0), [(14.0, 15.0), (15.0, 16.0), (16.0, 17.0)])
+        self.assertEqual(registry.migration_hops(15.5, 17.0), [(15.5, 16.0), (16.0, 17.0)])
+        self.assertEqual(registry.migration_hops(17.0, 17.0), [(17.0, 17.0)])
+
+    def test_rules_for_hops(self):
+        entries = [
+            _entry("ALWAYS", 8.0, 99.0),
+            _entry("OLD", 8.0, 14.0),
+            _entry("UNTIL_15", 12.0, 15.0),
+            _entry("ONLY_16_17", 16.0, 16.0, only=[16.0, 17.0]),
+            _entry("FROM_17", 17.0, 99.0),
+        ]
+        index = registry.VersionIndex(entries)
+        hops = registry.migration_hops(14.0, 17.0)
+        selected = [(entry["issue_code"], entry_hops) for entry, entry_hops in index.rules_for_hops(hops)]
+        self.assertEqual(selected, [
+            ("ALWAYS", hops),
+            ("OLD", [(14.0, 15.0)]),
+            ("UNTIL_15", [(14.0, 15.0), (15.0, 16.0)]),
+            ("ONLY_16_17", [(16.0, 17.0)]),
+        ])
+        self.assertEqual(registry.hop_tags(index.rules_for_hops(hops)), {
+            "ALWAYS": "14.0-15.0", "OLD": "14.0-15.0", "UNTIL_15": "14.0-15.0", "ONLY_16_17": "16.0-17.0",
+        })
+        # Une migration sur une seule étape ne retient que les règles de cette étape.
+        single = index.rules_for_hops(registry.migration_hops(17.0, 18.0))
+        self.assertEqual([entry["issue_code"] for entry, _ in single], ["ALWAYS", "FROM_17"])
+        self.assertEqual(index.rules_for_hops([]), [])
+
+    def test_multi_hop_selection_matches_single_hops(self):
+        index = registry.VersionIndex(registry.load_index())
+        hops = registry.migration_hops(14.0, 18.0)
+        multi = {entry["issue_code"] for entry, _ in index.rules_for_hops(hops)}
+        single = {entry["issue_code"] for hop in hops for entry, _ in index.rules_for_hops([hop])}
+        self.assertEqual(multi, single)
+        tags = registry.hop_tags(index.rules_for_hops(registry.migration_hops(16.0, 18.0)))
+        self.assertEqual(tags, {"PY001": "16.0-17.0", "PY002": "16.0-17.0", "XML001": "16.0-17.0"})
+
+    def test_rule_metadata(self):
+        metadata = registry.rule_metadata([_entry("B", 8.0, 99.0), _entry("A", 12.0, 15.0), _entry("B", 8.0, 99.0)])
+        self.assertEqual([rule["issue_code"] for rule in metadata], ["A", "B"])
+        self.assertNotIn("module", metadata[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# tests/test_run.py
+import contextlib
+import io
+import json
+import os
+import unittest
+from unittest import mock
+
+from auditor import cache, discovery, run
+from auditor.cache import AuditCache
+from auditor.checkers.python_checkers import DeprecatedApiOneChecker
+from auditor.report import IssueSpool
+
+from .helpers import TreeTestCase, add_module
+
+FROM_VERSION, TO_VERSION = 16.0, 17.0
+
+
+def _analyze(path, jobs=1, audit_cache=None, checkers=None):
+    """Analyse un dossier avec les règles de 16.0 -> 17.0, sans affichage."""
+    checkers = checkers if checkers is not None else run.load_checkers(FROM_VERSION, TO_VERSION)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return run.analyze_files(discovery.iter_odoo_files(path), checkers, FROM_VERSION, TO_VERSION,
+                                 jobs=jobs, audit_cache=audit_cache)
+
+
+class AnalyzeFileTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.python_engine, self.xml_engine = run.build_engines(run.load_checkers(FROM_VERSION, TO_VERSION))
+
+    def _analyze_file(self, relative_path, content):
+        path = self.write(relative_path, content)
+        return run.analyze_file("mod", path, relative_path, self.python_engine, self.xml_engine)
+
+    def test_file_without_trigger_token_is_not_parsed(self):
+        # Le fichier n'est même pas du Python valide : il serait signalé s'il était parsé.
+        issues, warnings, skipped = self._analyze_file("mod/broken.py", "def broken(:\n")
+        self.assertEqual((issues, warnings, skipped), ([], [], True))
+
+    def test_parse_error_is_reported_as_warning(self):
+        issues, warnings, skipped = self._analyze_file("mod/broken.py", "@api.one\ndef broken(:\n")
+        self.assertEqual(issues, [])
+        self.assertFalse(skipped)
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("parsing error", warnings[0])
+
+    def test_token_in_comment_is_parsed_without_issue(self):
+        issues, warnings, skipped = self._analyze_file("mod/ok.py", "# api.one is deprecated\nx = 1\n")
+        self.assertEqual((issues, warnings, skipped), ([], [], False))
+
+
+class AnalyzeFilesTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("module_a", "module_b", "module_c"):
+            add_module(self, name, methods=4, views=3)
+
+    def test_fake_project_findings(self):
+        issues = _analyze(self.copy_fake_project())
+        self.assertEqual(
+            [(issue.issue_code, issue.module_name, issue.file_path, issue.line_number) for issue in issues],
+            [("PY001", "my_cool_module", os.path.join("my_cool_module", "models", "sale_order.py"), 12),
+             ("PY002", "my_cool_module", os.path.join("my_cool_module", "models", "sale_order.py"), 20),
+             ("XML001", "my_cool_module", os.path.join("my_cool_module", "views", "sale_views.xml"), 9)],
+        )
+
+    def test_pool_results_follow_discovery_order(self):
+        sequential = _analyze(self.root, jobs=1)
+        # Des lots plus petits que le projet : l'ordre doit aussi être conservé d'un lot à l'autre.
+        with mock.patch.object(run, "ANALYSIS_BATCH_SIZE", 4):
+            parallel = _analyze(self.root, jobs=3)
+        self.assertEqual(len(sequential), 3 * (4 * 3 + 3))
+        self.assertEqual(parallel, sequential)
+
+        order = [relative_path for _, _, relative_path in discovery.iter_odoo_files(self.root)]
+        positions = [order.index(issue.file_path) for issue in parallel]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_issues_sink_receives_all_issues(self):
+        checkers = run.load_checkers(FROM_VERSION, TO_VERSION)
+        with IssueSpool() as spool, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            returned = run.analyze_files(discovery.iter_odoo_files(self.root), checkers, FROM_VERSION,
+                                         TO_VERSION, issues_sink=spool)
+            self.assertIs(returned, spool)
+            self.assertEqual(list(spool), _analyze(self.root))
+
+
+class AuditCacheTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        add_module(self, "module_a", methods=2)
+        add_module(self, "module_b", methods=2)
+        self.cache_dir = os.path.join(self.root, ".odoo-auditor-cache")
+        self.checkers = run.load_checkers(FROM_VERSION, TO_VERSION)
+
+    def _cached_run(self, checkers=None):
+        audit_cache = AuditCache(self.cache_dir, checkers or self.checkers)
+        try:
+            issues = _analyze(self.root, audit_cache=audit_cache, checkers=checkers)
+        finally:
+            audit_cache.close()
+        return issues, audit_cache
+
+    def test_unchanged_files_are_replayed_from_cache(self):
+        first, audit_cache = self._cached_run()
+        self.assertEqual(audit_cache.hits, 0)
+        analyzed = audit_cache.misses
+
+        with mock.patch.object(run, "analyze_file", side_effect=AssertionError("file re-analyzed")):
+            second, audit_cache = self._cached_run()
+        self.assertEqual((audit_cache.hits, audit_cache.misses), (analyzed, 0))
+        self.assertEqual(second, first)
+
+    def test_modified_file_is_reanalyzed(self):
+        first, _ = self._cached_run()
+        self.write("module_b/models/model.py", "from odoo import api\n\n@api.one\ndef only(self):\n    pass\n")
+
+        second, audit_cache = self._cached_run()
+        self.assertEqual(audit_cache.misses, 1)
+        self.assertEqual([issue for issue in second if issue.module_name == "module_a"],
+                         [issue for issue in first if issue.module_name == "module_a"])
+        self.assertEqual([(issue.issue_code, issue.line_number) for issue in second
+                          if issue.file_path == os.path.join("module_b", "models", "model.py")],
+                         [("PY001", 3)])
+
+    def test_rule_change_invalidates_cache(self):
+        _, first_cache = self._cached_run()
+
+        class NewVersion(DeprecatedApiOneChecker):
+            VERSION = DeprecatedApiOneChecker.VERSION + 1
+
+        checkers = [NewVersion() if isinstance(c, DeprecatedApiOneChecker) else c for c in self.checkers]
+        self.assertNotEqual(cache.checkers_fingerprint(checkers), cache.checkers_fingerprint(self.checkers))
+        _, audit_cache = self._cached_run(checkers)
+        self.assertEqual((audit_cache.hits, audit_cache.misses), (0, first_cache.misses))
+
+    def test_files_with_warnings_are_not_cached(self):
+        self.write("module_a/models/broken.py", "@api.one\ndef broken(:\n")
+        self._cached_run()
+        _, audit_cache = self._cached_run()
+        self.assertEqual(audit_cache.misses, 1)
+
+
+class StartAuditTests(TreeTestCase):
+    def test_writes_json_report_without_submitting(self):
+        path = self.copy_fake_project()
+        output_file = os.path.join(self.root, "report.json")
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            run.start_audit(path, None, FROM_VERSION, TO_VERSION, output_file=output_file, jobs=1,
+                            cache_dir=os.path.join(self.root, "cache"))
+        with open(output_file, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual([issue["issue_code"] for issue in report["issues"]], ["PY001", "PY002", "XML001"])
+        self.assertEqual({issue["migration_hop"] for issue in report["issues"]}, {"16.0-17.0"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# tests/test_watch.py
+import contextlib
+import io
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import requests
+
+from auditor import watch
+from auditor.watch import DeltaPusher, WatchSession
+
+from .helpers import TreeTestCase
+
+SALE_ORDER = os.path.join("my_cool_module", "models", "sale_order.py")
+SALE_VIEWS = os.path.join("my_cool_module", "views", "sale_views.xml")
+
+
+class WatchSessionTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.copy_fake_project()
+        self.session = WatchSession(self.path, 16.0, 17.0)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            self.session.scan()
+
+    def _apply(self, *relative_paths):
+        return self.session.apply_changes(os.path.join(self.path, path) for path in relative_paths)
+
+    def _codes(self, relative_path):
+        return [issue.issue_code for issue in self.session.results[relative_path][1]]
+
+    def test_scan(self):
+        self.assertEqual(self.session.module_counts, {"my_cool_module": 3})
+        self.assertEqual(self._codes(SALE_ORDER), ["PY001", "PY002"])
+        self.assertEqual({issue.migration_hop for issue in self.session.all_issues()}, {"16.0-17.0"})
+        self.assertEqual(self.session.all_issues([SALE_VIEWS]), self.session.results[SALE_VIEWS][1])
+
+    def test_modified_file_is_rechecked(self):
+        path = os.path.join(self.path, SALE_ORDER)
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content.replace("@api.one", "@api.multi"))
+
+        update = self._apply(SALE_ORDER)
+        self.assertEqual([(relative_path, len(issues), previous) for relative_path, issues, previous in update.files],
+                         [(SALE_ORDER, 1, 2)])
+        self.assertEqual(update.module_deltas, {"my_cool_module": -1})
+        self.assertEqual(self.session.module_counts, {"my_cool_module": 2})
+        self.assertEqual(self._codes(SALE_ORDER), ["PY002"])
+        # Les autres fichiers ne sont pas ré-analysés.
+        self.assertEqual(self._codes(SALE_VIEWS), ["XML001"])
+
+    def test_deleted_file_and_unrelated_change(self):
+        os.remove(os.path.join(self.path, SALE_VIEWS))
+        update = self._apply(SALE_VIEWS, os.path.join("my_cool_module", "README.md"))
+        self.assertEqual(update.files, [(SALE_VIEWS, None, 1)])
+        self.assertNotIn(SALE_VIEWS, self.session.results)
+        self.assertEqual(self.session.module_counts, {"my_cool_module": 2})
+        self.assertIn("removed (-1 issue(s))", watch.format_update(update, self.session))
+
+    def test_new_module_directory_is_discovered(self):
+        module = os.path.join(self.path, "new_module")
+        shutil.copytree(os.path.join(self.path, "my_cool_module"), module)
+        update = self._apply("new_module")
+        self.assertEqual(update.module_deltas, {"new_module": 3})
+        self.assertEqual(self.session.module_counts, {"my_cool_module": 3, "new_module": 3})
+
+        shutil.rmtree(module)
+        update = self._apply("new_module")
+        self.assertEqual(update.module_deltas, {"new_module": -3})
+        self.assertEqual(self.session.module_counts, {"my_cool_module": 3})
+        self.assertIn("new_module: module removed", watch.format_update(update, self.session))
+
+    def test_manifest_change_moves_files_between_modules(self):
+        # Un manifest ajouté dans `views` n'en fait pas un module : il reste rattaché au module parent.
+        with open(os.path.join(self.path, "my_cool_module", "views", "__manifest__.py"), 'w') as f:
+            f.write("{}")
+        update = self._apply(os.path.join("my_cool_module", "views", "__manifest__.py"))
+        self.assertEqual(update.module_deltas, {})
+
+        os.remove(os.path.join(self.path, "my_cool_module", "__manifest__.py"))
+        update = self._apply(os.path.join("my_cool_module", "__manifest__.py"))
+        # Sans manifest à la racine, seul le dossier `views` reste un module.
+        self.assertEqual(update.module_deltas, {"my_cool_module": -3, "views": 1})
+        self.assertEqual(self.session.module_counts, {"views": 1})
+        self.assertEqual(self.session.results[SALE_VIEWS][0], "views")
+
+    def test_root_event_rediscovers_everything(self):
+        update = self.session.apply_changes([self.path])
+        self.assertEqual(update.files, [])
+        self.assertEqual(self.session.module_counts, {"my_cool_module": 3})
+
+    def test_polling_watcher(self):
+        watcher = watch.make_watcher(self.session, polling=True, poll_interval=0)
+        path = os.path.join(self.path, SALE_ORDER)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("\n# changed\n")
+        self.assertEqual(watcher.wait(0), {path})
+        self.assertEqual(watcher.wait(0), set())
+
+
+class DeltaPusherTests(TreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.copy_fake_project()
+        self.session = WatchSession(self.path, 16.0, 17.0)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            self.session.scan()
+        self.pusher = DeltaPusher(self.session, "key", interval=0)
+        self.submitted = []
+        self.base_status = "COMPLETED"
+
+    def _submit(self, issues, api_key, manifest_path=None, max_attempts=None, verbose=True, submission=None):
+        self.submitted.append(([issue.issue_code for issue in issues], submission))
+        return {"id": len(self.submitted)}
+
+    def _get_submission(self, run_id, api_key, max_attempts=None):
+        return {"id": run_id, "status": self.base_status}
+
+    def _push(self, submit=None):
+        with mock.patch("auditor.api_client.submit_report", side_effect=submit or self._submit), \
+                mock.patch("auditor.api_client.get_submission", side_effect=self._get_submission), \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.pusher.push_if_due()
+
+    def test_full_report_then_changes(self):
+        self._push()
+        self.assertEqual(self.submitted, [(["PY001", "PY002", "XML001"], None)])
+        self.assertIsNone(self.pusher.timeout())
+
+        self.pusher.add([SALE_VIEWS])
+        self._push()
+        self.assertEqual(self.submitted[1], (["XML001"], {"changed_files": [SALE_VIEWS], "base_run": 1}))
+        self.assertEqual((self.pusher.last_run_id, self.pusher.pending), (2, set()))
+
+    def test_failed_base_restarts_from_full_report(self):
+        self._push()
+        self.pusher.add([SALE_VIEWS])
+        self.base_status = "FAILED"
+        self._push()
+        self.assertEqual(self.submitted[1], (["PY001", "PY002", "XML001"], None))
+
+    def test_failed_push_keeps_pending_changes(self):
+        self._push()
+        self.pusher.add([SALE_VIEWS])
+        self._push(mock.Mock(side_effect=requests.exceptions.ConnectionError("down")))
+        self.assertEqual((self.pusher.last_run_id, self.pusher.pending), (1, {SALE_VIEWS}))
+        self._push()
+        self.assertEqual(self.submitted[1][1], {"changed_files": [SALE_VIEWS], "base_run": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()